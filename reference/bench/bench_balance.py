@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Benchmark: balance lookup cost vs. UTXO set size.
+
+Fills a `UtxoSet` with coins spread over many addresses and times a
+balance lookup through the address index against the old full scan of
+the set. Also checks that the index still matches the set after
+connecting and disconnecting blocks.
+
+Usage: python reference/bench/bench_balance.py [--sizes 10000,100000,1000000] [--addresses 1000]
+"""
+import argparse
+import time
+
+from chaingen import make_chain
+from model import OutPoint, TxOut
+from utxo import MemoryBackend, UtxoSet
+
+LOOKUPS = 1000
+
+def scan_balance(utxo, address):
+    return sum(c.amount for _, c in utxo.items() if c.pubkey_hash == address)
+
+def index_balance(utxo, address):
+    return sum(c.amount for _, c in utxo.address_coins(address))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--addresses", type=int, default=1000)
+    args = ap.parse_args()
+
+    # index stays in sync through connect/disconnect
+    utxo = UtxoSet()
+    undos = [utxo.connect_block(e["block"]) for e in make_chain(500)]
+    for undo in reversed(undos[250:]):
+        utxo.disconnect_block(undo)
+    assert MemoryBackend(dict(utxo.backend.coins)).by_address == utxo.backend.by_address
+
+    print(f"{'utxos':>9} {'index us':>10} {'scan us':>12}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        utxo = UtxoSet()
+        utxo.update({OutPoint("%064x" % i, 0): TxOut(1, "%040x" % (i % args.addresses)) for i in range(size)})
+        probes = ["%040x" % (i % args.addresses) for i in range(LOOKUPS)]
+        t0 = time.perf_counter()
+        for a in probes:
+            index_balance(utxo, a)
+        t1 = time.perf_counter()
+        scans = min(LOOKUPS, max(1, 10_000_000 // size))  # full scans get slow
+        for a in probes[:scans]:
+            scan_balance(utxo, a)
+        t2 = time.perf_counter()
+        assert scan_balance(utxo, probes[0]) == index_balance(utxo, probes[0])
+        print(f"{size:>9} {(t1 - t0) / LOOKUPS * 1e6:>10.1f} {(t2 - t1) / scans * 1e6:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Benchmark: batch signature verification throughput vs. worker processes.
+
+Verifies `--sigs` distinct (pubkey, sig, sighash) triples with
+`verify_batch` for each worker count, with the signature cache cleared
+before every run so every item reaches ecdsa.
+
+Usage: python reference/bench/bench_batch_verify.py [--sigs 2000] [--workers 1,2,4]
+"""
+import argparse
+import os
+import time
+
+from chaingen import make_wallets, make_signed_txs
+from primitives import signing_message
+import sigverify
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sigs", type=int, default=2000)
+    ap.add_argument("--wallets", type=int, default=100)
+    ap.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, os.cpu_count() or 1})))
+    args = ap.parse_args()
+    print(f"signing {args.sigs} txs...")
+    _coins, txs = make_signed_txs(args.sigs, make_wallets(args.wallets))
+    items = []
+    for tx in txs:
+        digest = sigverify.sighash(signing_message(tx))
+        items.extend((inp["pubkey"], inp["sig"], digest) for inp in tx["inputs"])
+
+    print(f"{'workers':>8} {'sigs/sec':>10}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        if workers > 1:
+            sigverify.verify_batch(items[:sigverify.PARALLEL_MIN_BATCH], workers)  # start the pool
+        sigverify.clear_caches()
+        t0 = time.perf_counter()
+        results = sigverify.verify_batch(items, workers)
+        elapsed = time.perf_counter() - t0
+        assert all(results)
+        print(f"{workers:>8} {len(items) / elapsed:>10.0f}")
+
+if __name__ == "__main__":
+    main()
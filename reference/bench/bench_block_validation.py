@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Benchmark: cost of rejecting invalid blocks at each validation stage.
+
+Builds a block of `--txs` signed txs on an in-process node (target: one
+leading hex zero, no retargeting), then variants that break one rule
+each, ordered by the stage that catches them:
+
+1. header: proof of work (a nonce whose hash misses the target) and a
+   timestamp at the median time past;
+2. structure: a tx altered after the merkle root was computed;
+3. signatures: one corrupted input signature;
+4. UTXO: a coinbase claiming one coin more than reward plus fees;
+
+and times `validate_block()` on each, plus on the valid block. The
+signature cache is cleared before every call, as for a block whose txs
+were never seen, so the valid block and the late rejections pay for every
+signature check.
+
+Usage: python reference/bench/bench_block_validation.py [--txs 100] [--repeat 10]
+"""
+import argparse
+import copy
+import time
+
+from chaingen import make_wallets, make_signed_txs
+from primitives import header_hash, merkle_root
+from target import zeros_target, target_from_bits, hash_meets_target
+from utxo import coins_from_json
+import pmvp_node
+import sigverify
+
+def mined(header, txs):
+    stats = pmvp_node.mine_header(header, target_from_bits(header["bits"]), 1)
+    header = dict(header, nonce=stats["nonce"])
+    return {"hash": stats["hash"], "block": {"header": header, "txs": txs}}
+
+def remined(entry, **changes):
+    # the block with header fields changed and a valid proof of work again
+    txs = entry["block"]["txs"]
+    return mined(dict(entry["block"]["header"], merkle_root=merkle_root(txs), **changes), txs)
+
+def variants(valid):
+    header = valid["block"]["header"]
+    nonce = header["nonce"] + 1
+    while hash_meets_target(header_hash(dict(header, nonce=nonce)), target_from_bits(header["bits"])):
+        nonce += 1
+    bad_pow = {"hash": header_hash(dict(header, nonce=nonce)), "block": {"header": dict(header, nonce=nonce),
+                                                                         "txs": valid["block"]["txs"]}}
+    mtp = pmvp_node.BLOCK_INDEX.get(pmvp_node.CHAIN[-1]["hash"]).median_time_past()
+    bad_time = remined(valid, timestamp=mtp)
+    bad_merkle = copy.deepcopy(valid)
+    bad_merkle["block"]["txs"][-1]["outputs"][0]["amount"] -= 1
+    bad_sig = copy.deepcopy(valid)
+    sig = bad_sig["block"]["txs"][-1]["inputs"][0]["sig"]
+    bad_sig["block"]["txs"][-1]["inputs"][0]["sig"] = sig[:-2] + ("00" if sig[-2:] != "00" else "01")
+    bad_sig = remined(bad_sig)
+    bad_coinbase = copy.deepcopy(valid)
+    bad_coinbase["block"]["txs"][0]["outputs"][0]["amount"] += 1
+    bad_coinbase = remined(bad_coinbase)
+    return [("proof of work", bad_pow), ("timestamp", bad_time), ("merkle root", bad_merkle),
+            ("signature", bad_sig), ("coinbase amount", bad_coinbase), ("valid", valid)]
+
+def time_validation(entry, repeat):
+    total = 0.0
+    error = "accepted"
+    for _ in range(repeat):
+        sigverify.clear_caches()
+        t0 = time.perf_counter()
+        try:
+            pmvp_node.validate_block(entry)
+        except pmvp_node.BlockError as exc:
+            error = str(exc)
+        total += time.perf_counter() - t0
+    return total / repeat, error
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--txs", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    pmvp_node.POW_LIMIT = zeros_target(1)
+    pmvp_node.BLOCK_TIME = 0
+    pmvp_node.MAX_BLOCK_TXS, pmvp_node.MAX_BLOCK_BYTES = args.txs, 1 << 30
+    pmvp_node.mk_genesis()
+    coins, txs = make_signed_txs(args.txs, make_wallets(10))
+    pmvp_node.UTXO_SET.update(coins_from_json(coins))
+    for tx in txs:
+        pmvp_node.MEMPOOL.add(tx, fee=pmvp_node.tx_fee(tx))
+    template = pmvp_node.build_template("ab" * 20)
+    valid = mined(template["header"], template["txs"])
+
+    print(f"block of {args.txs} signed txs, signature cache cleared before each validation")
+    print(f"{'broken rule':>16} {'us/block':>10}  rejected with")
+    for name, entry in variants(valid):
+        elapsed, error = time_validation(entry, args.repeat)
+        print(f"{name:>16} {elapsed * 1e6:>10.0f}  {error}")
+
+if __name__ == "__main__":
+    main()
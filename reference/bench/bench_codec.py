@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Benchmark: binary codec vs. JSON for transactions and blocks.
+
+Compares encoded size and encode/decode time of `codec.py` against the
+JSON serialization the node used before (compact sorted JSON, as written
+by `serialize_tx()` and the block store), for signed transactions and for
+full block entries holding them. Every object is checked to round-trip.
+
+Usage: python reference/bench/bench_codec.py [--txs 2000] [--block-txs 100] [--inputs 2]
+"""
+import argparse
+import json
+import time
+
+from chaingen import make_wallets, make_signed_txs
+from codec import encode_tx, decode_tx, encode_entry, decode_entry
+from primitives import header_hash, merkle_root, serialize_tx
+
+def json_encode(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+def timed(fn, items):
+    t0 = time.perf_counter()
+    out = [fn(x) for x in items]
+    return out, (time.perf_counter() - t0) / len(items)
+
+def report(name, objs, encode, decode):
+    encoded, enc_t = timed(encode, objs)
+    decoded, dec_t = timed(decode, encoded)
+    assert decoded == objs
+    size = sum(len(b) for b in encoded) / len(objs)
+    print(f"{name:>14} {size:>10.0f} {enc_t * 1e6:>10.1f} {dec_t * 1e6:>10.1f}")
+    return size
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--txs", type=int, default=2000)
+    ap.add_argument("--block-txs", type=int, default=100)
+    ap.add_argument("--inputs", type=int, default=2, help="inputs per tx")
+    args = ap.parse_args()
+
+    _, txs = make_signed_txs(args.txs, make_wallets(8), inputs_per_tx=args.inputs)
+    entries = []
+    for i in range(0, len(txs), args.block_txs):
+        block_txs = txs[i:i + args.block_txs]
+        header = {"prev_hash": "%064x" % i, "merkle_root": merkle_root(block_txs), "timestamp": i, "nonce": i * 7919, "bits": 0x1effffff}
+        entries.append({"hash": header_hash(header), "block": {"header": header, "txs": block_txs}})
+
+    print(f"{'':>14} {'bytes':>10} {'encode us':>10} {'decode us':>10}")
+    tx_json = report("tx json", txs, serialize_tx, json.loads)
+    tx_bin = report("tx binary", txs, encode_tx, decode_tx)
+    block_json = report("block json", entries, json_encode, json.loads)
+    block_bin = report("block binary", entries, encode_entry, decode_entry)
+    print(f"size ratio binary/json: tx {tx_bin / tx_json:.2f}, block {block_bin / block_json:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Benchmark: node cold start time vs. chain height, with and without UTXO snapshots.
+
+For each height a synthetic chain is written to a temporary block store.
+Cold start = open the store + bring the UTXO set up to the tip, either by
+full replay (`rebuild_utxo`) or from a snapshot taken `--tail` blocks below
+the tip followed by replay of the remaining blocks (`load_utxo`).
+
+Usage: python reference/bench/bench_cold_start.py [--heights 1000,10000,50000] [--tail 50]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from chaingen import make_chain
+from blockstore import BlockStore
+from snapshot import write_snapshot
+from utxo import UtxoSet
+import pmvp_node
+
+def cold_start(datadir, use_snapshot):
+    t0 = time.perf_counter()
+    pmvp_node.open_chain(datadir)
+    if use_snapshot:
+        pmvp_node.load_utxo()
+    else:
+        pmvp_node.rebuild_utxo()
+    elapsed = time.perf_counter() - t0
+    size = len(pmvp_node.UTXO_SET)
+    pmvp_node.CHAIN.close()
+    return elapsed, size
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--heights", default="1000,10000,50000")
+    ap.add_argument("--tail", type=int, default=50, help="blocks between the snapshot and the tip")
+    args = ap.parse_args()
+
+    print(f"{'height':>8} {'utxo size':>10} {'full replay s':>14} {'snapshot s':>11}")
+    for height in [int(h) for h in args.heights.split(",")]:
+        datadir = tempfile.mkdtemp(prefix="pmvp-bench-")
+        try:
+            store = BlockStore(datadir)
+            utxo = UtxoSet()
+            for h, entry in enumerate(make_chain(height)):
+                store.append(entry)
+                utxo.connect_block(entry["block"])
+                if h == max(0, height - args.tail):
+                    write_snapshot(datadir, utxo.to_json(), entry["hash"], h)
+            store.close()
+            full, size_full = cold_start(datadir, use_snapshot=False)
+            snap, size_snap = cold_start(datadir, use_snapshot=True)
+            assert size_full == size_snap
+            print(f"{height:>8} {size_full:>10} {full:>14.3f} {snap:>11.3f}")
+        finally:
+            shutil.rmtree(datadir)
+
+if __name__ == "__main__":
+    main()
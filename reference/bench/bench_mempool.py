@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Benchmark: mempool insert/remove/conflict-check cost vs. mempool size.
+
+Compares the indexed `Mempool` with the old plain-list approach
+(`list.append`, `list.remove`, and a linear scan for conflicting spends) at
+several mempool sizes. Transactions are synthetic and unsigned; the
+mempool does not verify.
+
+Usage: python reference/bench/bench_mempool.py [--sizes 1000,10000,100000] [--ops 1000]
+"""
+import argparse
+import hashlib
+import time
+
+import chaingen  # noqa: F401  (puts reference/ on sys.path)
+from mempool import Mempool
+from primitives import txid_of
+
+def make_tx(i):
+    return {
+        "inputs": [{"txid": hashlib.sha256(b"%d" % i).hexdigest(), "index": 0, "sig": "", "pubkey": ""}],
+        "outputs": [{"amount": 1, "pubkey_hash": "%040x" % i}],
+        "timestamp": i,
+    }
+
+def list_conflicts(pool, tx):
+    spent = {(i["txid"], i["index"]) for i in tx["inputs"]}
+    return [p for p in pool if any((i["txid"], i["index"]) in spent for i in p["inputs"])]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--ops", type=int, default=1000)
+    args = ap.parse_args()
+    print(f"{'size':>8} {'impl':>8} {'insert us':>10} {'conflict us':>12} {'remove us':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        base = [make_tx(i) for i in range(size)]
+        extra = [make_tx(size + i) for i in range(args.ops)]
+        extra_ids = [txid_of(tx) for tx in extra]
+        probes = [base[i * (size // args.ops or 1) % size] for i in range(args.ops)]
+
+        pool = Mempool()
+        for tx in base:
+            pool.add(tx)
+        t0 = time.perf_counter()
+        for tx, txid in zip(extra, extra_ids):
+            pool.add(tx, txid)
+        t1 = time.perf_counter()
+        for tx in probes:
+            assert pool.conflicts(tx)
+        t2 = time.perf_counter()
+        for txid in extra_ids:
+            pool.remove(txid)
+        t3 = time.perf_counter()
+        n = args.ops
+        print(f"{size:>8} {'indexed':>8} {(t1 - t0) / n * 1e6:>10.2f} {(t2 - t1) / n * 1e6:>12.2f} {(t3 - t2) / n * 1e6:>10.2f}")
+
+        lst = list(base)
+        ops = min(n, 100)  # the list version is too slow for many ops at 100k
+        t0 = time.perf_counter()
+        for tx in extra[:ops]:
+            lst.append(tx)
+        t1 = time.perf_counter()
+        for tx in probes[:ops]:
+            assert list_conflicts(lst, tx)
+        t2 = time.perf_counter()
+        for tx in extra[:ops]:
+            lst.remove(tx)
+        t3 = time.perf_counter()
+        print(f"{size:>8} {'list':>8} {(t1 - t0) / ops * 1e6:>10.2f} {(t2 - t1) / ops * 1e6:>12.2f} {(t3 - t2) / ops * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
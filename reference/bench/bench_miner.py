@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Benchmark: mining throughput vs. worker process count.
+
+Mines a few headers at a fixed target (`--zeros` leading hex zeros) with
+1..N workers and prints the aggregate hashrate (sum over workers) and
+wall-clock hashrate.
+
+Usage: python reference/bench/bench_miner.py [--workers 1,2,4] [--zeros 5] [--blocks 3]
+"""
+import argparse
+import os
+import time
+
+import chaingen  # noqa: F401  (puts reference/ on sys.path)
+from mining import mine_header
+from target import zeros_target, bits_from_target
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, os.cpu_count() or 1})))
+    ap.add_argument("--zeros", type=int, default=5)
+    ap.add_argument("--blocks", type=int, default=3)
+    args = ap.parse_args()
+    target = zeros_target(args.zeros)
+
+    print(f"{'workers':>8} {'hashes':>10} {'wall H/s':>12} {'sum worker H/s':>15}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        hashes = 0
+        rates = []
+        t0 = time.perf_counter()
+        for i in range(args.blocks):
+            header = {"prev_hash": "%064x" % i, "merkle_root": "", "timestamp": int(time.time()), "nonce": 0,
+                      "bits": bits_from_target(target)}
+            res = mine_header(header, target, workers)
+            hashes += sum(w["hashes"] for w in res["workers"])
+            rates.append(res["hashrate"])
+        wall = time.perf_counter() - t0
+        print(f"{workers:>8} {hashes:>10} {hashes / wall:>12.0f} {sum(rates) / len(rates):>15.0f}")
+
+if __name__ == "__main__":
+    main()
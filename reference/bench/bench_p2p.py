@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark: block propagation latency and tx relay throughput between peers.
+
+Starts `--nodes` reference nodes on localhost (see cluster.py), links them
+in the given topology and measures:
+
+- block propagation: node 0 mines a block; time until every node's tip is
+  that block (the last hop dominates on a line);
+- tx relay: `--txs` signed txs are submitted to node 0 in one `POST /txs`;
+  time until every node's mempool holds all of them, reported as txs/sec.
+
+Funding coins for the txs are mined to fresh wallets on node 0 and split by
+fan-out txs first, so the measured txs are independent one-input txs. The
+nodes run without retargeting so back-to-back blocks stay at the easiest
+target.
+
+Usage: python reference/bench/bench_p2p.py [--nodes 4] [--topology line] [--blocks 10] [--txs 500]
+"""
+import argparse
+import statistics
+import time
+
+from cluster import Cluster, TOPOLOGIES
+from ecdsa import SigningKey, SECP256k1
+from primitives import address_from_pubkey_hex, serialize_tx, txid_of
+
+FANOUT = 40  # outputs per fan-out tx (coinbase 50 leaves a fee of 10)
+
+def sign(tx, sk):
+    sig = sk.sign(serialize_tx(tx)).hex()  # inputs carry sig "" while signing
+    for inp in tx["inputs"]:
+        inp["sig"] = sig
+    return tx
+
+def mine_and_propagate(cluster, miner):
+    # mine on node 0; seconds until all nodes have the block
+    block_hash = cluster.post(0, "/mine", {"miner": miner, "wait": True})["block_hash"]
+    t0 = time.perf_counter()
+    cluster.wait_for(lambda: all(h == block_hash for h in cluster.tips()))
+    return block_hash, time.perf_counter() - t0
+
+def new_wallet():
+    sk = SigningKey.generate(curve=SECP256k1)
+    pub = sk.get_verifying_key().to_string().hex()
+    return sk, pub, address_from_pubkey_hex(pub)
+
+def fund(cluster, coins):
+    # `coins` outputs of amount 1, confirmed on every node; each funding
+    # block pays a fresh wallet (coinbases to the same address within the
+    # same second would have the same txid)
+    fanouts = []
+    for n in range((coins + FANOUT - 1) // FANOUT):
+        sk, pub, address = new_wallet()
+        block_hash, _ = mine_and_propagate(cluster, address)
+        coinbase = cluster.get(0, "/block/" + block_hash)["block"]["txs"][0]
+        tx = {"inputs": [{"txid": txid_of(coinbase), "index": 0, "sig": "", "pubkey": pub}],
+              "outputs": [{"amount": 1, "pubkey_hash": address} for _ in range(FANOUT)], "timestamp": n}
+        fanouts.append((sign(tx, sk), sk, pub))
+    result = cluster.post(0, "/txs", {"txs": [tx for tx, _, _ in fanouts]})
+    assert result["ok"], result
+    mine_and_propagate(cluster, "00" * 20)
+    return [(txid_of(tx), i, sk, pub) for tx, sk, pub in fanouts for i in range(FANOUT)][:coins]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, default=4)
+    ap.add_argument("--topology", choices=TOPOLOGIES, default="line")
+    ap.add_argument("--blocks", type=int, default=10)
+    ap.add_argument("--txs", type=int, default=500)
+    ap.add_argument("--base-port", type=int, default=5101)
+    args = ap.parse_args()
+
+    with Cluster(args.nodes, args.base_port, env={"PMVP_BLOCK_TIME": "0"}) as cluster:
+        cluster.connect(args.topology)
+        latencies = [mine_and_propagate(cluster, "00" * 20)[1] for _ in range(args.blocks)]
+        print(f"{args.nodes} nodes, {args.topology} topology")
+        print(f"block propagation to all nodes: mean {statistics.mean(latencies) * 1e3:.1f} ms, "
+              f"median {statistics.median(latencies) * 1e3:.1f} ms, max {max(latencies) * 1e3:.1f} ms")
+
+        coins = fund(cluster, args.txs)
+        txs = [sign({"inputs": [{"txid": txid, "index": i, "sig": "", "pubkey": pub}],
+                     "outputs": [{"amount": 1, "pubkey_hash": "%040x" % n}], "timestamp": n}, sk)
+               for n, (txid, i, sk, pub) in enumerate(coins)]
+        base = [cluster.get(i, "/stats")["mempool"] for i in range(args.nodes)]
+        t0 = time.perf_counter()
+        result = cluster.post(0, "/txs", {"txs": txs})
+        admitted = time.perf_counter() - t0
+        assert result["ok"], [r for r in result["results"] if not r["ok"]][:3]
+        cluster.wait_for(lambda: all(cluster.get(i, "/stats")["mempool"] >= base[i] + len(txs) for i in range(args.nodes)),
+                         timeout=120)
+        elapsed = time.perf_counter() - t0
+        print(f"tx relay: {len(txs)} txs in all mempools after {elapsed:.2f} s ({len(txs) / elapsed:.0f} tx/s; "
+              f"admission at node 0 took {admitted:.2f} s)")
+        peers = cluster.get(0, "/peers")["peers"]
+        print("node 0 inventory sent/received: " + ", ".join(f"{p['url']} {p['inv_sent']}/{p['inv_received']}" for p in peers))
+
+if __name__ == "__main__":
+    main()
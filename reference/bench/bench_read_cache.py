@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Benchmark: cost of polling GET /chain with and without the response cache.
+
+Loads a synthetic chain into the node's in-memory CHAIN and times requests
+through Flask's test client: encoding the full chain on every request (the
+old behaviour), serving the cached pre-encoded body, and a conditional
+request answered with 304 Not Modified.
+
+Usage: python reference/bench/bench_read_cache.py [--blocks 2000] [--requests 50]
+"""
+import argparse
+import time
+
+from chaingen import make_chain
+import pmvp_node
+from flask import jsonify
+
+def timed(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--blocks", type=int, default=2000)
+    ap.add_argument("--requests", type=int, default=50)
+    args = ap.parse_args()
+
+    pmvp_node.CHAIN[:] = list(make_chain(args.blocks))
+    client = pmvp_node.app.test_client()
+
+    @pmvp_node.app.route("/bench/chain_uncached")
+    def chain_uncached():
+        with pmvp_node.STATE_LOCK:
+            chain = pmvp_node.CHAIN[:]
+        return jsonify({"chain": chain})
+
+    etag = client.get("/chain").headers["ETag"]
+    size = len(client.get("/chain").data)
+    uncached = timed(lambda: client.get("/bench/chain_uncached"), args.requests)
+    cached = timed(lambda: client.get("/chain"), args.requests)
+    not_modified = timed(lambda: client.get("/chain", headers={"If-None-Match": etag}), args.requests)
+    assert client.get("/chain", headers={"If-None-Match": etag}).status_code == 304
+    print(f"chain: {args.blocks + 1} blocks, {size / 1e6:.1f} MB per full response")
+    print(f"{'jsonify every request':>24}: {uncached * 1e3:8.2f} ms/request")
+    print(f"{'cached body':>24}: {cached * 1e3:8.2f} ms/request")
+    print(f"{'If-None-Match -> 304':>24}: {not_modified * 1e3:8.2f} ms/request")
+
+if __name__ == "__main__":
+    main()
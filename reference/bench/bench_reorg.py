@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark: chain reorganization by undo data vs. full UTXO replay.
+
+An in-process node (block store in a temporary directory, easiest PoW
+target, no retargeting) opens a synthetic base chain of `--base` blocks (see chaingen.py)
+and mines funding blocks on it, then for each depth d:
+
+- mines d blocks on the active chain, each with `--txs` signed one-input
+  spends taken from the mempool;
+- builds a competing branch of d + 1 coinbase-only blocks from the block
+  below them and hands it to `accept_block()`: the first d blocks are only
+  stored (less or equal work), the last one triggers the reorg, which is
+  timed: d blocks disconnected with their undo data, d + 1 validated and
+  connected, and the d * txs spends re-admitted to the mempool;
+- times `rebuild_utxo()` on the resulting chain, i.e. what switching
+  branches by replaying the UTXO set from genesis would cost on top of
+  validating the new blocks.
+
+Usage: python reference/bench/bench_reorg.py [--depths 1,10,100] [--txs 10] [--base 20000]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from ecdsa import SigningKey, SECP256k1
+from chaingen import make_chain, solve
+from blockstore import BlockStore
+from primitives import address_from_pubkey_hex, serialize_tx, txid_of, merkle_root
+from target import MAX_TARGET
+import pmvp_node
+
+FANOUT = 40  # outputs per fan-out tx (coinbase 50 leaves a fee of 10)
+
+def sign(tx, sk):
+    sig = sk.sign(serialize_tx(tx)).hex()  # inputs carry sig "" while signing
+    for inp in tx["inputs"]:
+        inp["sig"] = sig
+    return tx
+
+def submit(tx):
+    ok, reason = pmvp_node.verify_tx(tx, pmvp_node.MEMPOOL)
+    assert ok, reason
+    pmvp_node.add_to_mempool(pmvp_node.as_transaction(tx))
+
+def fund(coins, counter):
+    # `coins` confirmed outputs of amount 1, each with its signing key; each
+    # funding coinbase pays a fresh wallet
+    fanouts = []
+    for _ in range((coins + FANOUT - 1) // FANOUT):
+        sk = SigningKey.generate(curve=SECP256k1)
+        pub = sk.get_verifying_key().to_string().hex()
+        coinbase = pmvp_node.mine_block(address_from_pubkey_hex(pub))["block"]["txs"][0]
+        tx = {"inputs": [{"txid": txid_of(coinbase), "index": 0, "sig": "", "pubkey": pub}],
+              "outputs": [{"amount": 1, "pubkey_hash": address_from_pubkey_hex(pub)} for _ in range(FANOUT)],
+              "timestamp": next(counter)}
+        fanouts.append((sign(tx, sk), sk, pub))
+    for tx, _, _ in fanouts:
+        submit(tx)
+    pmvp_node.mine_block("%040x" % next(counter))
+    return [(txid_of(tx), i, sk, pub) for tx, sk, pub in fanouts for i in range(FANOUT)][:coins]
+
+def branch_block(prev, height, counter):
+    n = next(counter)
+    txs = [{"inputs": [], "outputs": [{"amount": 50, "pubkey_hash": "%040x" % n}], "timestamp": n, "height": height}]
+    # one second after the parent keeps the branch past the median time past
+    header = {"prev_hash": prev["hash"], "merkle_root": merkle_root(txs),
+              "timestamp": prev["block"]["header"]["timestamp"] + 1, "nonce": 0, "bits": prev["block"]["header"]["bits"]}
+    return {"hash": solve(header), "block": {"header": header, "txs": txs}}
+
+def run_depth(depth, txs_per_block, coins, counter):
+    fork, fork_height = pmvp_node.CHAIN[-1], pmvp_node.current_height()
+    spent = 0
+    for _ in range(depth):
+        for txid, index, sk, pub in coins[spent:spent + txs_per_block]:
+            submit(sign({"inputs": [{"txid": txid, "index": index, "sig": "", "pubkey": pub}],
+                         "outputs": [{"amount": 1, "pubkey_hash": "%040x" % next(counter)}], "timestamp": 0}, sk))
+        spent += txs_per_block
+        pmvp_node.mine_block("%040x" % next(counter), max_txs=txs_per_block)
+    branch = []
+    for i in range(depth + 1):
+        branch.append(branch_block(branch[-1] if branch else fork, fork_height + 1 + i, counter))
+    for entry in branch[:-1]:
+        pmvp_node.accept_block(entry)
+    t0 = time.perf_counter()
+    pmvp_node.accept_block(branch[-1])
+    reorg = time.perf_counter() - t0
+    assert pmvp_node.CHAIN[-1]["hash"] == branch[-1]["hash"]
+    readmitted = len(pmvp_node.MEMPOOL)
+    t0 = time.perf_counter()
+    pmvp_node.rebuild_utxo()
+    replay = time.perf_counter() - t0
+    pmvp_node.MEMPOOL.clear()  # each depth spends its own coins
+    return reorg, replay, readmitted, coins[spent:]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--depths", default="1,10,100")
+    ap.add_argument("--txs", type=int, default=10, help="signed spends per block on the abandoned branch")
+    ap.add_argument("--base", type=int, default=20_000, help="synthetic blocks below the reorgs")
+    args = ap.parse_args()
+    depths = [int(d) for d in args.depths.split(",")]
+
+    pmvp_node.POW_LIMIT = MAX_TARGET
+    pmvp_node.BLOCK_TIME = 0
+    pmvp_node.HALVING_INTERVAL = 1 << 62
+    pmvp_node.SNAPSHOT_INTERVAL = 0
+    pmvp_node.MINER_WORKERS = 1
+    counter = iter(range(1, 1 << 62))
+    datadir = tempfile.mkdtemp(prefix="pmvp-reorg-")
+    try:
+        store = BlockStore(datadir)
+        for entry in make_chain(args.base):
+            store.append(entry)
+        store.close()
+        pmvp_node.open_chain(datadir)
+        pmvp_node.load_utxo()
+        coins = fund(sum(depths) * args.txs, counter)
+        print(f"chain {len(pmvp_node.CHAIN)} blocks, {len(pmvp_node.UTXO_SET)} coins, "
+              f"{args.txs} signed txs per abandoned block")
+        print(f"{'depth':>6} {'reorg ms':>9} {'ms/block':>9} {'txs back':>9} {'full replay ms':>15}")
+        for depth in depths:
+            reorg, replay, readmitted, coins = run_depth(depth, args.txs, coins, counter)
+            print(f"{depth:>6} {reorg * 1e3:>9.1f} {reorg * 1e3 / (2 * depth + 1):>9.2f} {readmitted:>9} {replay * 1e3:>15.1f}")
+        assert pmvp_node.utxo_consistent()
+        pmvp_node.CHAIN.close()
+    finally:
+        shutil.rmtree(datadir)
+
+if __name__ == "__main__":
+    main()
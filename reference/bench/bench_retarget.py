@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Benchmark: block intervals under retargeting as mining grows from 1 to 64 cores.
+
+Simulates `--blocks` blocks without hashing: each block's solve time is
+drawn from an exponential distribution with mean work / hashrate, where
+work is the block's expected hash count (`target_work()`) and the hashrate
+is `--rate` hashes/s per core. The core count doubles every `--step`
+blocks, 1, 2, 4, ... up to 64, then holds. Timestamps are whole seconds,
+as in headers. Three difficulty rules, all starting from the target that
+gives `--spacing` seconds on one core:
+
+- fixed: the starting target for every block;
+- window: a per-window retarget (Bitcoin style), every `--window` blocks
+  the target is scaled by the window's actual / wanted duration, at most 4x;
+- lwma: the node's `next_target()` over the last `--window` blocks, with
+  every target rounded through its compact bits.
+
+Prints the mean, standard deviation, 95th percentile and maximum of the
+intervals, the mean over the `--window` blocks after each doubling (how
+far a rule lags a hashrate jump), and the mean interval at each core count.
+
+Usage: python reference/bench/bench_retarget.py [--blocks 3000] [--spacing 10] [--window 30]
+"""
+import argparse
+import random
+import statistics
+
+import chaingen  # noqa: F401  (puts reference/ on sys.path)
+from target import MAX_TARGET, bits_from_target, target_from_bits, target_work, next_target
+
+MAX_CORES = 64
+
+def cores_at(height, step):
+    return min(1 << (height // step), MAX_CORES)
+
+def fixed_rule(targets, timestamps, spacing, window):
+    return targets[-1]
+
+def window_rule(targets, timestamps, spacing, window):
+    height = len(targets)
+    if height % window or height < window + 1:
+        return targets[-1]
+    actual = timestamps[-1] - timestamps[-1 - window]
+    actual = min(max(actual, spacing * window // 4), spacing * window * 4)
+    return min(targets[-1] * actual // (spacing * window), MAX_TARGET)
+
+def lwma_rule(targets, timestamps, spacing, window):
+    n = min(window, len(targets) - 1)
+    if n < 1:
+        return targets[-1]
+    target = next_target(targets[-n:], timestamps[-n - 1:], spacing)
+    return target_from_bits(bits_from_target(target))
+
+def simulate(rule, args, start):
+    rng = random.Random(args.seed)
+    targets, timestamps = [start], [0]
+    clock = 0.0
+    intervals = []
+    for height in range(1, args.blocks + 1):
+        target = rule(targets, timestamps, args.spacing, args.window)
+        hashrate = args.rate * cores_at(height, args.step)
+        clock += rng.expovariate(hashrate / target_work(target))
+        targets.append(target)
+        timestamps.append(int(clock))
+        intervals.append(timestamps[-1] - timestamps[-2])
+    return intervals
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--blocks", type=int, default=3000)
+    ap.add_argument("--spacing", type=int, default=10, help="wanted seconds per block")
+    ap.add_argument("--window", type=int, default=30)
+    ap.add_argument("--step", type=int, default=200, help="blocks between core count doublings")
+    ap.add_argument("--rate", type=float, default=800_000, help="hashes/s per core")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    start = target_from_bits(bits_from_target(int((1 << 256) / (args.rate * args.spacing))))
+    phases = sorted({cores_at(h, args.step) for h in range(1, args.blocks + 1)})
+    print(f"{args.blocks} blocks, spacing {args.spacing} s, window {args.window}, "
+          f"cores doubling every {args.step} blocks up to {MAX_CORES}")
+    print(f"{'rule':>7} {'mean s':>8} {'stdev s':>8} {'p95 s':>7} {'max s':>7} {'after jump s':>13}  mean s at "
+          + " ".join("%dc" % c for c in phases))
+    for name, rule in (("fixed", fixed_rule), ("window", window_rule), ("lwma", lwma_rule)):
+        intervals = simulate(rule, args, start)
+        by_phase = {c: [] for c in phases}
+        for height, interval in enumerate(intervals, 1):
+            by_phase[cores_at(height, args.step)].append(interval)
+        p95 = sorted(intervals)[int(len(intervals) * 0.95)]
+        after_jump = [interval for height, interval in enumerate(intervals, 1)
+                      if height >= args.step and height % args.step < args.window
+                      and cores_at(height, args.step) > cores_at(height - args.window, args.step)]
+        print(f"{name:>7} {statistics.mean(intervals):>8.2f} {statistics.pstdev(intervals):>8.2f} "
+              f"{p95:>7} {max(intervals):>7} {statistics.mean(after_jump):>13.2f}  "
+              + " ".join("%.1f" % statistics.mean(by_phase[c]) for c in phases))
+
+if __name__ == "__main__":
+    main()
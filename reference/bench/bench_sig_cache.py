@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Benchmark: block assembly latency with a large mempool, with and without the signature cache.
+
+Loads `--txs` signed transactions into the node's mempool (each verified
+once at admission, as POST /tx does) and then times building a block
+template that includes all of them, plus mining it at a trivial
+difficulty. "before" runs with the signature cache disabled, which is the
+old behaviour of re-verifying every signature at assembly.
+
+Usage: python reference/bench/bench_sig_cache.py [--txs 5000] [--wallets 50]
+"""
+import argparse
+import time
+
+from chaingen import make_wallets, make_signed_txs
+import pmvp_node
+from target import zeros_target
+from utxo import coins_from_json
+import sigverify
+
+def assemble(txs, coins):
+    pmvp_node.UTXO_SET.clear()
+    pmvp_node.UTXO_SET.update(coins_from_json(coins))
+    pmvp_node.MEMPOOL.clear()
+    for tx in txs:
+        ok, reason = pmvp_node.verify_tx(tx)  # admission, as in POST /tx
+        assert ok, reason
+        pmvp_node.MEMPOOL.add(tx, fee=pmvp_node.tx_fee(tx))
+    t0 = time.perf_counter()
+    template = pmvp_node.build_template("ab" * 20, max_txs=len(txs))
+    stats = pmvp_node.mine_header(template["header"], zeros_target(1), 1)
+    assert len(template["txs"]) == len(txs) + 1 and stats["nonce"] is not None
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--txs", type=int, default=5000)
+    ap.add_argument("--wallets", type=int, default=50)
+    args = ap.parse_args()
+    print(f"signing {args.txs} txs...")
+    coins, txs = make_signed_txs(args.txs, make_wallets(args.wallets))
+    pmvp_node.mk_genesis()
+
+    size = sigverify.SIG_CACHE.maxsize
+    sigverify.clear_caches()
+    sigverify.SIG_CACHE.maxsize = 0
+    before = assemble(txs, coins)
+    sigverify.clear_caches()
+    sigverify.SIG_CACHE.maxsize = size
+    after = assemble(txs, coins)
+    print(f"assembly latency, no signature cache: {before * 1e3:10.1f} ms")
+    print(f"assembly latency, signature cache:    {after * 1e3:10.1f} ms  ({before / after:.0f}x)")
+    print("cache stats:", sigverify.cache_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark: chain sync speed, headers-first parallel download vs. sequential.
+
+A synthetic `--blocks` chain (coinbase-only blocks without proof of work,
+see chaingen.py) is written to a block store and served by up to
+`--peers` local nodes (see cluster.py). An empty in-process node then
+syncs it:
+
+- sequential: `/blocks` pages in JSON from one peer, each block validated
+  and connected before the next page is requested (the catch-up the node
+  did before `sync.py`);
+- headers-first: `ChainSync` with 1..N peers, bodies in the binary codec
+  fetched in parallel within the download window.
+
+Every run ends at the served tip. The generated blocks use the easiest
+target and always pay a 50 coinbase, so the node's PoW limit is raised,
+retargeting and halving disabled for the run; everything else, UTXO
+snapshots included, runs with the default config.
+
+Usage: python reference/bench/bench_sync.py [--blocks 50000] [--peers 1,2,4] [--window 1024]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from chaingen import make_chain
+from cluster import Cluster, http_get
+from blockstore import BlockStore
+import pmvp_node
+from target import MAX_TARGET
+
+def make_store(datadir, entries):
+    store = BlockStore(datadir)
+    for entry in entries:
+        store.append(entry)
+    store.close()
+
+def sequential_sync(url):
+    while True:
+        reply = http_get("%s/blocks?from=%d" % (url, len(pmvp_node.CHAIN)))
+        for b in reply["blocks"]:
+            pmvp_node.accept_block({"hash": b["hash"], "block": b["block"]})
+        if not reply["blocks"] or reply["to"] >= reply["height"]:
+            return
+
+def timed_sync(genesis, run):
+    datadir = tempfile.mkdtemp(prefix="pmvp-sync-")
+    try:
+        make_store(datadir, [genesis])
+        pmvp_node.open_chain(datadir)
+        pmvp_node.load_utxo()
+        t0 = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - t0
+        if pmvp_node.SNAPSHOT_WRITER is not None:
+            pmvp_node.SNAPSHOT_WRITER.join()  # before the data dir goes
+        tip = pmvp_node.CHAIN[-1]["hash"]
+        pmvp_node.CHAIN.close()
+        return elapsed, tip
+    finally:
+        shutil.rmtree(datadir)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--blocks", type=int, default=50_000)
+    ap.add_argument("--peers", default="1,2,4")
+    ap.add_argument("--window", type=int, default=1024)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--base-port", type=int, default=5301)
+    args = ap.parse_args()
+    peer_counts = [int(p) for p in args.peers.split(",")]
+
+    chain = list(make_chain(args.blocks, spends=0))
+    template = tempfile.mkdtemp(prefix="pmvp-sync-src-")
+    make_store(template, chain)
+    datadirs = []
+    for i in range(max(peer_counts)):
+        datadirs.append(template + "-%d" % i)
+        shutil.copytree(template, datadirs[-1])
+    shutil.rmtree(template)
+
+    pmvp_node.POW_LIMIT = MAX_TARGET
+    pmvp_node.BLOCK_TIME = 0
+    pmvp_node.HALVING_INTERVAL = 1 << 62
+    sync = pmvp_node.SYNC
+    sync.window, sync.workers = args.window, args.workers
+    with Cluster(len(datadirs), args.base_port, datadirs=datadirs) as cluster:
+        print(f"{args.blocks} blocks, window {args.window}, {args.workers} workers")
+        print(f"{'mode':>22} {'seconds':>8} {'blocks/s':>9} {'headers s':>10}")
+        elapsed, tip = timed_sync(chain[0], lambda: sequential_sync(cluster.urls[0]))
+        assert tip == chain[-1]["hash"]
+        print(f"{'sequential, 1 peer':>22} {elapsed:>8.2f} {args.blocks / elapsed:>9.0f} {'-':>10}")
+        for n in peer_counts:
+            elapsed, tip = timed_sync(chain[0], lambda: sync.sync(cluster.urls[:n]))
+            assert tip == chain[-1]["hash"], sync.last
+            print(f"{'headers-first, %d peer%s' % (n, 's' if n > 1 else ''):>22} {elapsed:>8.2f} "
+                  f"{args.blocks / elapsed:>9.0f} {sync.last['headers_time']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
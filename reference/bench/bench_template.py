@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Benchmark: fee-rate block template selection on a large mempool.
+
+Fills a `Mempool` with `--txs` synthetic transactions with random fees,
+a fraction of them forming parent/child chains, then times
+`Mempool.select()` under the default tx-count and byte budgets and checks
+that parents always precede their children.
+
+Usage: python reference/bench/bench_template.py [--txs 50000] [--max-txs 5000]
+"""
+import argparse
+import hashlib
+import random
+import time
+
+import chaingen  # noqa: F401  (puts reference/ on sys.path)
+from mempool import Mempool
+from primitives import txid_of
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--txs", type=int, default=50_000)
+    ap.add_argument("--max-txs", type=int, default=5000)
+    ap.add_argument("--max-bytes", type=int, default=1_000_000)
+    ap.add_argument("--chain-frac", type=float, default=0.3, help="fraction of txs spending a pending tx")
+    args = ap.parse_args()
+    rng = random.Random(1)
+    pool = Mempool()
+    recent = []
+    t0 = time.perf_counter()
+    for i in range(args.txs):
+        if recent and rng.random() < args.chain_frac:
+            parent = recent.pop(rng.randrange(len(recent)))
+            src = (parent, 0)
+        else:
+            src = (hashlib.sha256(b"%d" % i).hexdigest(), 0)
+        tx = {
+            "inputs": [{"txid": src[0], "index": src[1], "sig": "", "pubkey": ""}],
+            "outputs": [{"amount": 1000, "pubkey_hash": "%040x" % i}],
+            "timestamp": i,
+        }
+        txid = txid_of(tx)
+        try:
+            pool.add(tx, txid, fee=rng.randint(1, 500))
+        except Exception:
+            continue
+        recent.append(txid)
+        if len(recent) > 200:
+            recent.pop(0)
+    fill = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    picked = pool.select(args.max_txs, args.max_bytes)
+    elapsed = time.perf_counter() - t0
+    position = {t: i for i, t in enumerate(picked)}
+    for t in picked:
+        assert all(position[p] < position[t] for p in pool.entry(t).parents)
+    fees = sum(pool.entry(t).fee for t in picked)
+    size = sum(pool.entry(t).size for t in picked)
+    print(f"mempool: {len(pool)} txs (filled in {fill:.2f}s)")
+    print(f"template: {len(picked)} txs, {size} bytes, {fees} fees, selected in {elapsed * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Benchmark: per-block UTXO apply cost vs. chain height.
+
+Builds a synthetic chain (coinbase + a few spends per block, no signatures)
+and times `UtxoSet.connect_block` around each checkpoint height. For
+comparison it also times the old behaviour, a full replay from genesis
+after every block, at the smaller checkpoints.
+
+Usage: python reference/bench/bench_utxo_apply.py [--blocks 100000]
+"""
+import argparse
+import time
+
+from chaingen import make_chain
+from utxo import UtxoSet
+
+WINDOW = 50  # blocks timed around each checkpoint
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--blocks", type=int, default=100_000)
+    ap.add_argument("--replay-max", type=int, default=2_000, help="largest height at which to time full replay")
+    args = ap.parse_args()
+
+    checkpoints = [h for h in (100, 1_000, 10_000, 100_000) if h <= args.blocks]
+    utxo = UtxoSet()
+    chain = []
+    print(f"{'height':>8} {'utxo size':>10} {'incremental us/block':>22} {'full replay ms/block':>22}")
+    for height, entry in enumerate(make_chain(args.blocks)):
+        block = entry["block"]
+        if height <= args.replay_max:
+            chain.append(block)
+        if any(cp - WINDOW < height <= cp for cp in checkpoints):
+            if height in [cp - WINDOW + 1 for cp in checkpoints]:
+                window_start, elapsed = height, 0.0
+            t0 = time.perf_counter()
+            utxo.connect_block(block)
+            elapsed += time.perf_counter() - t0
+        else:
+            utxo.connect_block(block)
+        if height in checkpoints:
+            per_block = elapsed / (height - window_start + 1)
+            replay = "-"
+            if height <= args.replay_max:
+                scratch = UtxoSet()
+                t0 = time.perf_counter()
+                for b in chain:
+                    scratch.connect_block(b)
+                replay = "%.2f" % ((time.perf_counter() - t0) * 1e3)
+                assert scratch.backend.coins == utxo.backend.coins
+            print(f"{height:>8} {len(utxo):>10} {per_block * 1e6:>22.1f} {replay:>22}")
+
+if __name__ == "__main__":
+    main()
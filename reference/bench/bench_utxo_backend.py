@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Benchmark: in-memory vs. sqlite UTXO backend.
+
+Connects the same synthetic chain to a `UtxoSet` over `MemoryBackend` and
+over `utxodb.SqliteBackend` (committing after every block, so the sqlite
+set flushes every `--flush` blocks), then times coin lookups: recently
+created coins (served by the write-back cache) and random coins from the
+whole set (a cache miss reads sqlite unless the cache holds the set).
+Both sets are checked to hold the same coins.
+
+Usage: python reference/bench/bench_utxo_backend.py [--blocks 20000] [--cache 10000] [--flush 10]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from chaingen import make_chain
+from utxo import UtxoSet, unpack_outpoint
+from utxodb import SqliteBackend
+
+LOOKUPS = 20_000
+
+def apply_chain(utxo, chain):
+    t0 = time.perf_counter()
+    for height, entry in enumerate(chain):
+        utxo.connect_block(entry["block"])
+        utxo.commit(entry["hash"], height)
+    utxo.commit(chain[-1]["hash"], len(chain) - 1, force=True)
+    return (time.perf_counter() - t0) / len(chain)
+
+def time_lookups(utxo, outpoints):
+    t0 = time.perf_counter()
+    for outpoint in outpoints:
+        assert utxo.get(outpoint) is not None
+    return (time.perf_counter() - t0) / len(outpoints)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--blocks", type=int, default=20_000)
+    ap.add_argument("--cache", type=int, default=10_000, help="sqlite clean-entry cache size")
+    ap.add_argument("--flush", type=int, default=10, help="blocks per sqlite flush")
+    args = ap.parse_args()
+
+    chain = list(make_chain(args.blocks))
+    datadir = tempfile.mkdtemp(prefix="pmvp-bench-")
+    try:
+        memory = UtxoSet()
+        sqlite = UtxoSet(SqliteBackend(os.path.join(datadir, "utxo.sqlite"), args.cache, args.flush))
+        apply_mem = apply_chain(memory, chain)
+        apply_db = apply_chain(sqlite, chain)
+        assert dict(sqlite.backend.items()) == memory.backend.coins
+
+        keys = list(memory.backend.coins)
+        recent = [unpack_outpoint(k) for k in keys[-min(len(keys), args.cache // 2):]]
+        rng = random.Random(1)
+        scattered = [unpack_outpoint(rng.choice(keys)) for _ in range(LOOKUPS)]
+        recent = [rng.choice(recent) for _ in range(LOOKUPS)]
+        db_size = os.path.getsize(os.path.join(datadir, "utxo.sqlite"))
+
+        print(f"{len(chain)} blocks, {len(memory)} coins, sqlite file {db_size / 1e6:.1f} MB, cache {args.cache}, flush every {args.flush}")
+        print(f"{'backend':>8} {'apply us/block':>15} {'recent get us':>14} {'random get us':>14}")
+        for name, utxo, apply_t in (("memory", memory, apply_mem), ("sqlite", sqlite, apply_db)):
+            print(f"{name:>8} {apply_t * 1e6:>15.1f} {time_lookups(utxo, recent) * 1e6:>14.2f} {time_lookups(utxo, scattered) * 1e6:>14.2f}")
+        sqlite.backend.close()
+    finally:
+        shutil.rmtree(datadir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Benchmark: memory of a large UTXO set in different layouts.
+
+Builds the same set of coins several times and measures the heap it takes
+with tracemalloc: the original layout ("txid:index" string keys,
+{"amount", "pubkey_hash"} dict values), `model` objects (OutPoint keys
+sharing their tx's txid string, slotted TxOut values), the packed entries
+`UtxoSet` stores (36-byte key, 28-byte value), and a full `UtxoSet`
+including its address index. Coins come two per tx, as in a typical
+payment + change chain.
+
+Usage: python reference/bench/bench_utxo_memory.py [--coins 1000000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import chaingen  # noqa: F401  (puts reference/ on sys.path)
+from model import OutPoint, TxOut
+from utxo import UtxoSet, pack_coin, pack_outpoint
+
+OUTPUTS_PER_TX = 2
+
+def build_dicts(n):
+    coins = {}
+    for i in range(n):
+        txid = "%064x" % (i // OUTPUTS_PER_TX)
+        coins[f"{txid}:{i % OUTPUTS_PER_TX}"] = {"amount": 1000 + i, "pubkey_hash": "%040x" % i}
+    return coins
+
+def build_model(n):
+    coins = {}
+    txid = None
+    for i in range(n):
+        if i % OUTPUTS_PER_TX == 0:
+            txid = "%064x" % (i // OUTPUTS_PER_TX)
+        coins[OutPoint(txid, i % OUTPUTS_PER_TX)] = TxOut(1000 + i, "%040x" % i)
+    return coins
+
+def build_packed(n):
+    coins = {}
+    for i in range(n):
+        txid = "%064x" % (i // OUTPUTS_PER_TX)
+        coins[pack_outpoint(txid, i % OUTPUTS_PER_TX)] = pack_coin(TxOut(1000 + i, "%040x" % i))
+    return coins
+
+def build_utxo_set(n):
+    utxo = UtxoSet()
+    for i in range(n):
+        txid = "%064x" % (i // OUTPUTS_PER_TX)
+        utxo.backend.put(pack_outpoint(txid, i % OUTPUTS_PER_TX), pack_coin(TxOut(1000 + i, "%040x" % i)))
+    return utxo
+
+def measure(build, n):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    coins = build(n)
+    elapsed = time.perf_counter() - t0
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del coins
+    return size, elapsed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--coins", type=int, default=1_000_000)
+    args = ap.parse_args()
+    print(f"{'layout':>22} {'MB':>8} {'bytes/coin':>11} {'build s':>8}")
+    results = {}
+    layouts = (
+        ("dict key + dict value", build_dicts),
+        ("OutPoint + TxOut", build_model),
+        ("packed bytes", build_packed),
+        ("UtxoSet (with index)", build_utxo_set),
+    )
+    for name, build in layouts:
+        size, elapsed = measure(build, args.coins)
+        results[name] = size
+        print(f"{name:>22} {size / 1e6:>8.1f} {size / args.coins:>11.0f} {elapsed:>8.2f}")
+    base = results["dict key + dict value"]
+    print("vs. dict layout: " + ", ".join(f"{name} {size / base:.2f}" for name, size in results.items()))
+
+if __name__ == "__main__":
+    main()
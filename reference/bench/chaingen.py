@@ -0,0 +1,93 @@
+"""Synthetic chain generator shared by the benchmark scripts.
+
+Blocks carry a coinbase plus a few unsigned spends of earlier outputs; they
+are consistent for UTXO purposes (every input exists) but carry no
+signatures, so they are only suitable for storage/UTXO benchmarks. Headers
+use the easiest compact target (EASY_BITS, met by all but one hash in 2**24);
+a node accepting them needs POW_LIMIT raised to MAX_TARGET and
+retargeting off (BLOCK_TIME = 0).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from primitives import txid_of, header_hash, merkle_root  # noqa: E402
+from target import MAX_TARGET, bits_from_target, target_from_bits, hash_meets_target  # noqa: E402
+
+SPENDS_PER_BLOCK = 4
+EASY_BITS = bits_from_target(MAX_TARGET)
+
+def solve(header):
+    """Set the header's nonce so its hash meets its target (for easy targets); returns the hash."""
+    target = target_from_bits(header["bits"])
+    while not hash_meets_target(header_hash(header), target):
+        header["nonce"] += 1
+    return header_hash(header)
+
+def make_block(height, prev_hash, spendable, spends=SPENDS_PER_BLOCK):
+    coinbase = {"inputs": [], "outputs": [{"amount": 50, "pubkey_hash": "%040x" % height}], "timestamp": height,
+                "height": height}
+    txs = [coinbase]
+    for j in range(min(spends, len(spendable))):
+        txid, index, amount = spendable.pop()
+        tx = {
+            "inputs": [{"txid": txid, "index": index, "sig": "", "pubkey": ""}],
+            "outputs": [{"amount": amount // 2, "pubkey_hash": "%040x" % j}, {"amount": amount - amount // 2, "pubkey_hash": "%040x" % (j + 1)}],
+            "timestamp": height,
+        }
+        txs.append(tx)
+    # newly created outputs become spendable in later blocks
+    new = []
+    for tx in txs:
+        tid = txid_of(tx)
+        for i, out in enumerate(tx["outputs"]):
+            new.append((tid, i, out["amount"]))
+    spendable[:0] = new[:1]  # keep most coins unspent so the set grows
+    spendable.extend(new[1:])
+    header = {"prev_hash": prev_hash, "merkle_root": merkle_root(txs), "timestamp": height, "nonce": 0, "bits": EASY_BITS}
+    return {"hash": solve(header), "block": {"header": header, "txs": txs}}
+
+def make_chain(n, spends=SPENDS_PER_BLOCK):
+    """Yield n+1 chain entries {"hash", "block"} starting at a genesis block."""
+    spendable = []
+    prev = "0" * 64
+    for height in range(n + 1):
+        entry = make_block(height, prev, spendable, spends)
+        prev = entry["hash"]
+        yield entry
+
+def make_wallets(n):
+    """n (SigningKey, pubkey_hex, address) triples."""
+    from ecdsa import SigningKey, SECP256k1
+    from primitives import address_from_pubkey_hex
+    wallets = []
+    for _ in range(n):
+        sk = SigningKey.generate(curve=SECP256k1)
+        pub = sk.get_verifying_key().to_string().hex()
+        wallets.append((sk, pub, address_from_pubkey_hex(pub)))
+    return wallets
+
+def make_signed_txs(n, wallets, inputs_per_tx=1, amount=100, fee=1):
+    """Signed txs spending fresh fake outpoints; returns (coins, txs).
+
+    `coins` maps "txid:index" -> {amount, pubkey_hash} and must be loaded
+    into the node's UTXO set for the txs to verify.
+    """
+    import hashlib
+    from primitives import serialize_tx
+    coins = {}
+    txs = []
+    for i in range(n):
+        sk, pub, addr = wallets[i % len(wallets)]
+        inputs = []
+        for j in range(inputs_per_tx):
+            fake_txid = hashlib.sha256(b"fund:%d:%d" % (i, j)).hexdigest()
+            coins[f"{fake_txid}:0"] = {"amount": amount, "pubkey_hash": addr}
+            inputs.append({"txid": fake_txid, "index": 0, "sig": "", "pubkey": pub})
+        tx = {"inputs": inputs, "outputs": [{"amount": amount * inputs_per_tx - fee, "pubkey_hash": addr}], "timestamp": i}
+        sig = sk.sign(serialize_tx(tx)).hex()
+        for inp in tx["inputs"]:
+            inp["sig"] = sig
+        txs.append(tx)
+    return coins, txs
@@ -0,0 +1,115 @@
+"""Local multi-node harness shared by the network benchmark scripts.
+
+`Cluster` starts N reference nodes as subprocesses on consecutive localhost
+ports, each with its own temporary data directory and a shared
+`PMVP_API_KEY` (sent with every POST, so /peer is allowed), connects them
+as peers in a given topology and stops them (removing the data) on exit:
+
+    with Cluster(4, base_port=5101) as cluster:
+        cluster.connect("line")
+        cluster.post(0, "/mine", {"miner": "ab" * 20, "wait": True})
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+REFERENCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REFERENCE_DIR)
+
+TOPOLOGIES = ("line", "ring", "star", "mesh")
+
+def http_get(url, timeout=10):
+    with urllib.request.urlopen(url, timeout=timeout) as r:
+        return json.loads(r.read().decode())
+
+def http_post(url, data, timeout=60, api_key=None):
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["X-API-Key"] = api_key
+    req = urllib.request.Request(url, data=json.dumps(data).encode(), headers=headers)
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        return json.loads(r.read().decode())
+
+def topology_edges(n, topology):
+    """(i, j) peer links between n nodes."""
+    if topology == "line":
+        return [(i, i + 1) for i in range(n - 1)]
+    if topology == "ring":
+        return [(i, (i + 1) % n) for i in range(n)] if n > 2 else topology_edges(n, "line")
+    if topology == "star":
+        return [(0, i) for i in range(1, n)]
+    if topology == "mesh":
+        return [(i, j) for i in range(n) for j in range(i + 1, n)]
+    raise ValueError("unknown topology %r" % topology)
+
+
+class Cluster:
+    def __init__(self, n, base_port=5101, env=None, datadirs=None):
+        self.n = n
+        self.ports = [base_port + i for i in range(n)]
+        self.urls = ["http://127.0.0.1:%d" % p for p in self.ports]
+        self.env = dict({"PMVP_API_KEY": os.urandom(8).hex()}, **(env or {}))
+        self.datadirs = datadirs or [tempfile.mkdtemp(prefix="pmvp-node%d-" % i) for i in range(n)]
+        self.procs = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        for i in range(self.n):
+            env = dict(os.environ, PMVP_PORT=str(self.ports[i]), PMVP_DATA_DIR=self.datadirs[i], **self.env)
+            self.procs.append(subprocess.Popen([sys.executable, os.path.join(REFERENCE_DIR, "pmvp_node.py")], env=env,
+                                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        for i in range(self.n):
+            self.wait_up(i)
+
+    def wait_up(self, i, timeout=30):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                return self.get(i, "/tip")
+            except OSError:
+                if time.time() > deadline or self.procs[i].poll() is not None:
+                    raise RuntimeError("node %d did not start" % i)
+                time.sleep(0.1)
+
+    def stop(self):
+        for p in self.procs:
+            p.terminate()
+        for p in self.procs:
+            p.wait()
+        self.procs = []
+        for d in self.datadirs:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def get(self, i, path):
+        return http_get(self.urls[i] + path)
+
+    def post(self, i, path, data):
+        return http_post(self.urls[i] + path, data, api_key=self.env["PMVP_API_KEY"])
+
+    def connect(self, topology="line"):
+        for i, j in topology_edges(self.n, topology):
+            self.post(i, "/peer", {"url": self.urls[j]})
+        # the handshake (j adding i back) runs in the background
+        for i, j in topology_edges(self.n, topology):
+            self.wait_for(lambda: any(p["url"] == self.urls[i] for p in self.get(j, "/peers")["peers"]))
+
+    def wait_for(self, predicate, timeout=30, interval=0.005):
+        deadline = time.time() + timeout
+        while not predicate():
+            if time.time() > deadline:
+                raise RuntimeError("timed out waiting for the cluster")
+            time.sleep(interval)
+
+    def tips(self):
+        return [self.get(i, "/tip")["hash"] for i in range(self.n)]
@@ -0,0 +1,185 @@
+"""Block index: every block the node knows, as a tree, for fork choice.
+
+The active chain (CHAIN) is one path through the tree. Each `BlockNode`
+links to its parent and carries the cumulative work of the chain ending at
+it; the node with the most work is the best tip (the first one seen wins a
+tie, so equal-work branches do not make the node flip between them).
+Blocks off the active chain keep their entry in memory (`node.entry`, set
+with `hold()`), since the block store only holds the active chain, until a
+reorg connects them. `prune()` bounds that memory: side-branch blocks with
+too little work, and the least-work ones over a count, are dropped from
+the index together with their descendants (they can be fetched again).
+Side branches are not persisted: after a restart only the active chain is
+indexed.
+
+A block found invalid while being connected is marked, together with every
+block built on it, and is never chosen as best again. Nodes also keep the
+block timestamp and compact target (`bits`) for the median-time-past rule
+and retargeting.
+"""
+
+from typing import Dict, Any, List, Optional, Iterator
+
+# Blocks whose timestamps make up the median time past
+MEDIAN_TIME_SPAN = 11
+
+
+class BlockNode:
+    __slots__ = ("hash", "prev", "height", "timestamp", "bits", "chain_work", "entry", "invalid")
+
+    def __init__(self, block_hash: str, prev: Optional["BlockNode"], timestamp: int, bits: int, work: int,
+                 entry: Optional[Dict[str, Any]] = None):
+        self.hash = block_hash
+        self.prev = prev
+        self.timestamp = timestamp
+        self.bits = bits
+        self.height = prev.height + 1 if prev is not None else 0
+        self.chain_work = (prev.chain_work if prev is not None else 0) + work
+        self.entry = entry  # held while the block is not on the active chain
+        self.invalid = prev is not None and prev.invalid
+
+    def ancestor(self, height: int) -> "BlockNode":
+        node = self
+        while node.height > height:
+            node = node.prev
+        return node
+
+    def window(self, n: int) -> List["BlockNode"]:
+        """This node and up to n - 1 ancestors, oldest first."""
+        nodes = []
+        node = self
+        while node is not None and len(nodes) < n:
+            nodes.append(node)
+            node = node.prev
+        nodes.reverse()
+        return nodes
+
+    def median_time_past(self) -> int:
+        """Median timestamp of this block and up to MEDIAN_TIME_SPAN - 1 ancestors."""
+        times = sorted(node.timestamp for node in self.window(MEDIAN_TIME_SPAN))
+        return times[len(times) // 2]
+
+    def __repr__(self):
+        return "BlockNode(%s, height=%d, work=%d)" % (self.hash[:16], self.height, self.chain_work)
+
+
+class BlockIndex:
+    def __init__(self):
+        self._nodes: Dict[str, BlockNode] = {}
+        self._children: Dict[str, List[BlockNode]] = {}
+        self._held: Dict[str, BlockNode] = {}  # side-branch nodes holding their entry
+        self.best: Optional[BlockNode] = None  # most-work valid node
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self._nodes
+
+    def __iter__(self) -> Iterator[BlockNode]:
+        return iter(self._nodes.values())
+
+    def get(self, block_hash: str) -> Optional[BlockNode]:
+        return self._nodes.get(block_hash)
+
+    def clear(self):
+        self._nodes.clear()
+        self._children.clear()
+        self._held.clear()
+        self.best = None
+
+    @property
+    def held(self) -> int:
+        """Number of side-branch blocks kept in memory."""
+        return len(self._held)
+
+    def hold(self, node: BlockNode, entry: Dict[str, Any]):
+        # keep the entry of a block that is not on the active chain
+        node.entry = entry
+        self._held[node.hash] = node
+
+    def release(self, node: BlockNode):
+        # the block is on the active chain (or invalid): its entry is not needed
+        node.entry = None
+        self._held.pop(node.hash, None)
+
+    def add(self, block_hash: str, header: Dict[str, Any], work: int, entry: Optional[Dict[str, Any]] = None) -> BlockNode:
+        """Index a block whose parent is known (or the genesis block, into an empty index)."""
+        node = self._nodes.get(block_hash)
+        if node is not None:
+            return node
+        prev_hash = header["prev_hash"]
+        prev = self._nodes.get(prev_hash)
+        if prev is None and self._nodes:
+            raise KeyError("unknown parent %s" % prev_hash)
+        node = self._nodes[block_hash] = BlockNode(block_hash, prev, header["timestamp"], header["bits"], work)
+        if entry is not None:
+            self.hold(node, entry)
+        if prev is not None:
+            self._children.setdefault(prev_hash, []).append(node)
+        if not node.invalid and (self.best is None or node.chain_work > self.best.chain_work):
+            self.best = node
+        return node
+
+    def invalidate(self, node: BlockNode):
+        """Mark `node` and its descendants invalid and pick the best remaining tip."""
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            n.invalid = True
+            self.release(n)
+            stack.extend(self._children.get(n.hash, ()))
+        if self.best is not None and self.best.invalid:
+            self._rescan_best()
+
+    def _rescan_best(self):
+        # rare: scan for the most-work valid node (ties: first indexed)
+        self.best = None
+        for n in self._nodes.values():
+            if not n.invalid and (self.best is None or n.chain_work > self.best.chain_work):
+                self.best = n
+
+    def remove(self, node: BlockNode):
+        """Drop a node that is not on the active chain, and its descendants, from the index."""
+        siblings = self._children.get(node.prev.hash, []) if node.prev is not None else []
+        if node in siblings:
+            siblings.remove(node)
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            self._nodes.pop(n.hash, None)
+            self.release(n)
+            stack.extend(self._children.pop(n.hash, ()))
+        if self.best is not None and self.best.hash not in self._nodes:
+            self._rescan_best()
+
+    def prune(self, min_work: int, max_held: int) -> int:
+        """Drop held side-branch blocks with less than `min_work` chain work,
+        then the least-work ones until at most `max_held` remain (each with
+        its descendants). Returns the number of blocks dropped."""
+        before = len(self._nodes)
+        for node in sorted(self._held.values(), key=lambda n: n.chain_work):
+            if node.hash not in self._held:
+                continue  # already dropped with an ancestor
+            if node.chain_work >= min_work and len(self._held) <= max_held:
+                break
+            self.remove(node)
+        return before - len(self._nodes)
+
+    @staticmethod
+    def fork_point(a: BlockNode, b: BlockNode) -> BlockNode:
+        """Last common ancestor of two nodes."""
+        a, b = a.ancestor(b.height), b.ancestor(a.height)
+        while a is not b:
+            a, b = a.prev, b.prev
+        return a
+
+    @staticmethod
+    def branch(ancestor: BlockNode, tip: BlockNode) -> List[BlockNode]:
+        """Nodes after `ancestor` up to `tip`, in height order."""
+        nodes = []
+        while tip is not ancestor:
+            nodes.append(tip)
+            tip = tip.prev
+        nodes.reverse()
+        return nodes
@@ -0,0 +1,315 @@
+"""Append-only block store for the PMVP reference node.
+
+Blocks are appended to segment files (`blk00000.dat`, `blk00001.dat`, ...)
+as length-prefixed records:
+
+    magic "PMVB" | format (1 byte) | block hash (32 bytes) | length (u32 LE) | payload
+
+Format 1 payloads are the entry in the compact binary encoding of
+`codec.py`; format 0 (compact JSON) is still read, and written for entries
+the codec rejects. `pop()` appends a format 2 record with an empty payload
+(a tombstone) naming the dropped block. A separate index file
+(`index.dat`) holds one fixed-width record per height pointing at the block's
+segment/offset/length, so opening the store only reads the small index and
+never parses block bodies. If the index is missing it is rebuilt from the
+segments (`reindex`).
+
+Every append is fsynced before it returns. Bulk writers (chain sync) can
+wrap a run of appends in `batch()`, which keeps the files open and fsyncs
+once at the end of the run instead of twice per block.
+
+The store implements the parts of the list protocol the node uses for
+`CHAIN` (len, indexing, slicing, iteration, append, pop); entries are read
+lazily from disk through a small LRU cache, so memory use does not grow
+with chain height.
+"""
+
+import os
+import json
+import struct
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple, Optional, Iterator, Union
+
+from codec import CodecError, encode_entry, decode_entry, decode_entry_header
+
+MAGIC = b"PMVB"
+FORMAT_JSON = 0
+FORMAT_BINARY = 1
+FORMAT_POP = 2  # tombstone: the named block was popped off the tip
+RECORD_HEADER = struct.Struct("<4sB32sI")
+INDEX_RECORD = struct.Struct("<32sIQI")  # hash, segment, offset, length
+SEGMENT_SIZE = 16 * 1024 * 1024
+HEADER_READ = 256  # bytes read to decode just the header of a binary record
+CACHE_SIZE = 256
+
+Location = Tuple[int, int, int]  # segment, payload offset, payload length
+
+
+class BlockStoreError(Exception):
+    pass
+
+
+class BlockStore:
+    """Segmented append-only block files with hash and height indexes."""
+
+    def __init__(self, datadir: str, segment_size: int = SEGMENT_SIZE, cache_size: int = CACHE_SIZE):
+        self.datadir = datadir
+        self.segment_size = segment_size
+        self.cache_size = cache_size
+        os.makedirs(datadir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._heights: List[str] = []  # height -> block hash
+        self._locations: Dict[str, Location] = {}  # block hash -> location
+        self._height_index: Dict[str, int] = {}  # block hash -> height
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._fds: Dict[int, int] = {}
+        self._batch_depth = 0
+        self._batch_files: Dict[str, Any] = {}  # path -> file kept open by batch()
+        self._index_path = os.path.join(datadir, "index.dat")
+        if os.path.exists(self._index_path):
+            self._load_index()
+        else:
+            self.reindex()
+        # append to the last segment file, even if it only holds tombstones
+        self._segment = 0
+        while os.path.exists(self._segment_path(self._segment + 1)):
+            self._segment += 1
+
+    # -- paths / low-level io -------------------------------------------
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.datadir, "blk%05d.dat" % segment)
+
+    def _read_fd(self, segment: int) -> int:
+        fd = self._fds.get(segment)
+        if fd is None:
+            fd = os.open(self._segment_path(segment), os.O_RDONLY)
+            self._fds[segment] = fd
+        return fd
+
+    def _load_index(self):
+        with open(self._index_path, "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        for (raw_hash, segment, offset, length) in INDEX_RECORD.iter_unpack(data[:usable]):
+            block_hash = raw_hash.hex()
+            self._height_index[block_hash] = len(self._heights)
+            self._heights.append(block_hash)
+            self._locations[block_hash] = (segment, offset, length)
+        if usable != len(data):
+            # torn trailing record from an interrupted write
+            with open(self._index_path, "r+b") as f:
+                f.truncate(usable)
+
+    def reindex(self):
+        """Rebuild the height/hash index by replaying the segment records.
+
+        Recovery path only. Appends and tombstones are replayed in order, and
+        each block must extend the one below it: a block whose parent is
+        lower in the chain drops the blocks above the parent (a reorg
+        written before tombstones existed), one whose parent is unknown is
+        skipped.
+        """
+        self._heights.clear()
+        self._locations.clear()
+        self._height_index.clear()
+        records = []  # the chain being rebuilt: (raw hash, segment, offset, length)
+        heights: Dict[bytes, int] = {}
+        segment = 0
+        while os.path.exists(self._segment_path(segment)):
+            with open(self._segment_path(segment), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                pos = 0
+                while pos + RECORD_HEADER.size <= size:
+                    f.seek(pos)
+                    magic, fmt, raw_hash, length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                    if magic != MAGIC or pos + RECORD_HEADER.size + length > size:
+                        break
+                    rec = (raw_hash, segment, pos + RECORD_HEADER.size, length)
+                    pos += RECORD_HEADER.size + length
+                    if fmt == FORMAT_POP:
+                        if records and records[-1][0] == raw_hash:
+                            del heights[records.pop()[0]]
+                        continue
+                    if records:
+                        try:
+                            prev = bytes.fromhex(self._read_header(rec[1:])["prev_hash"])
+                        except (BlockStoreError, CodecError, ValueError, KeyError, TypeError):
+                            continue
+                        if prev not in heights:
+                            continue
+                        for dropped in records[heights[prev] + 1:]:
+                            del heights[dropped[0]]
+                        del records[heights[prev] + 1:]
+                    heights[raw_hash] = len(records)
+                    records.append(rec)
+            segment += 1
+        with open(self._index_path, "wb") as f:
+            for rec in records:
+                f.write(INDEX_RECORD.pack(*rec))
+                block_hash = rec[0].hex()
+                self._height_index[block_hash] = len(self._heights)
+                self._heights.append(block_hash)
+                self._locations[block_hash] = rec[1:]
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_entry(self, loc: Location) -> Dict[str, Any]:
+        # one read for record header + payload; the header says how to decode
+        segment, offset, length = loc
+        data = os.pread(self._read_fd(segment), RECORD_HEADER.size + length, offset - RECORD_HEADER.size)
+        fmt = data[len(MAGIC)]
+        payload = memoryview(data)[RECORD_HEADER.size:]
+        if fmt == FORMAT_BINARY:
+            return decode_entry(payload)
+        if fmt == FORMAT_JSON:
+            return json.loads(bytes(payload))
+        raise BlockStoreError("unknown record format %d" % fmt)
+
+    def _read_header(self, loc: Location) -> Dict[str, Any]:
+        # header only: for binary records read just the start of the payload
+        segment, offset, length = loc
+        fd = self._read_fd(segment)
+        data = os.pread(fd, RECORD_HEADER.size + min(length, HEADER_READ), offset - RECORD_HEADER.size)
+        if data[len(MAGIC)] == FORMAT_BINARY:
+            try:
+                return decode_entry_header(memoryview(data)[RECORD_HEADER.size:])[1]
+            except CodecError:
+                pass  # header longer than HEADER_READ (JSON fallback): read it all
+        return self._read_entry(loc)["block"]["header"]
+
+    # -- lookups --------------------------------------------------------
+
+    def get(self, block_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the entry {"hash", "block"} for a block hash, or None."""
+        with self._lock:
+            entry = self._cache.get(block_hash)
+            if entry is not None:
+                self._cache.move_to_end(block_hash)
+                return entry
+            loc = self._locations.get(block_hash)
+            if loc is None:
+                return None
+            entry = self._read_entry(loc)
+            self._cache[block_hash] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return entry
+
+    def hash_at(self, height: int) -> str:
+        return self._heights[height]
+
+    def height_of(self, block_hash: str) -> Optional[int]:
+        return self._height_index.get(block_hash)
+
+    def headers(self, start: int = 0) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(hash, header) from height `start` up, without decoding block bodies."""
+        for height in range(start, len(self._heights)):
+            block_hash = self._heights[height]
+            entry = self._cache.get(block_hash)
+            yield block_hash, entry["block"]["header"] if entry else self._read_header(self._locations[block_hash])
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self._locations
+
+    def __len__(self) -> int:
+        return len(self._heights)
+
+    def __getitem__(self, item: Union[int, slice]):
+        if isinstance(item, slice):
+            return [self.get(h) for h in self._heights[item]]
+        return self.get(self._heights[item])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for height in range(len(self._heights)):
+            yield self.get(self._heights[height])
+
+    # -- mutation -------------------------------------------------------
+
+    def append(self, entry: Dict[str, Any]):
+        block_hash = entry["hash"]
+        try:
+            fmt, payload = FORMAT_BINARY, encode_entry(entry)
+        except CodecError:
+            fmt, payload = FORMAT_JSON, json.dumps(entry, sort_keys=True, separators=(",", ":")).encode()
+        raw_hash = bytes.fromhex(block_hash)
+        with self._lock:
+            path = self._segment_path(self._segment)
+            if os.path.exists(path) and os.path.getsize(path) + RECORD_HEADER.size + len(payload) > self.segment_size:
+                self._segment += 1
+                path = self._segment_path(self._segment)
+            f = self._open_append(path)
+            offset = f.tell() + RECORD_HEADER.size
+            f.write(RECORD_HEADER.pack(MAGIC, fmt, raw_hash, len(payload)))
+            f.write(payload)
+            self._close_append(f)
+            loc = (self._segment, offset, len(payload))
+            f = self._open_append(self._index_path)
+            f.write(INDEX_RECORD.pack(raw_hash, *loc))
+            self._close_append(f)
+            self._height_index[block_hash] = len(self._heights)
+            self._heights.append(block_hash)
+            self._locations[block_hash] = loc
+            self._cache[block_hash] = entry
+
+    def _open_append(self, path: str):
+        # caller holds _lock; inside batch() files stay open until it ends
+        f = self._batch_files.get(path)
+        if f is None:
+            f = open(path, "ab")
+            if self._batch_depth:
+                self._batch_files[path] = f
+        return f
+
+    def _close_append(self, f):
+        f.flush()  # readers pread the file, so the bytes must reach it now
+        if self._batch_depth:
+            return  # fsynced when the batch ends
+        os.fsync(f.fileno())
+        f.close()
+
+    @contextmanager
+    def batch(self):
+        """Defer fsync of the appends made inside the block to its end."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    # data before index, so the index never points past the data
+                    files = sorted(self._batch_files.items(), key=lambda item: item[0] == self._index_path)
+                    for _path, f in files:
+                        os.fsync(f.fileno())
+                        f.close()
+                    self._batch_files.clear()
+
+    def pop(self) -> Dict[str, Any]:
+        """Drop the tip from the height index (its bytes stay in the segment).
+
+        A tombstone record is appended so `reindex()` drops the block too.
+        """
+        if not self._heights:
+            raise BlockStoreError("pop from empty block store")
+        entry = self.get(self._heights[-1])
+        with self._lock:
+            block_hash = self._heights.pop()
+            del self._locations[block_hash]
+            del self._height_index[block_hash]
+            self._cache.pop(block_hash, None)
+            f = self._open_append(self._segment_path(self._segment))
+            f.write(RECORD_HEADER.pack(MAGIC, FORMAT_POP, bytes.fromhex(block_hash), 0))
+            self._close_append(f)
+            with open(self._index_path, "r+b") as f:
+                f.truncate(len(self._heights) * INDEX_RECORD.size)
+        return entry
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
@@ -13,6 +13,7 @@ The script:
 """
 import json
 import sys
+import time
 import urllib.request
 from ecdsa import SigningKey, SECP256k1
 
@@ -28,6 +29,19 @@ def http_post(path, data):
     with urllib.request.urlopen(req, timeout=20) as r:
         return json.loads(r.read().decode())
 
+def mine(miner):
+    # /mine returns a job id immediately; poll the job until it finishes
+    job = http_post("/mine", {"miner": miner})
+    if not job.get("ok"):
+        return job
+    while True:
+        st = http_get(f"/mine/{job['job_id']}")["job"]
+        if st["status"] == "done":
+            return {"ok": True, "block_hash": st["result"]["block_hash"]}
+        if st["status"] in ("failed", "cancelled"):
+            return {"ok": False, "job": st}
+        time.sleep(0.2)
+
 def from_priv_hex(hexstr: str) -> SigningKey:
     return SigningKey.from_string(bytes.fromhex(hexstr), curve=SECP256k1)
 
@@ -41,7 +55,7 @@ def main():
     print("B address:", wb["address"])
 
     print("Mining a block to A to get funds...")
-    m = http_post("/mine", {"miner": wa["address"]})
+    m = mine(wa["address"])
     if not m.get("ok"):
         print("Mine failed:", m)
         sys.exit(1)
@@ -66,7 +80,7 @@ def main():
     tx = {
         "inputs": [{"txid": txid, "index": idx, "sig": "", "pubkey": wa["pubkey"]}],
         "outputs": [{"amount": send_amount, "pubkey_hash": wb["address"]}],
-        "timestamp": int(__import__("time").time()),
+        "timestamp": int(time.time()),
     }
 
     # prepare message to sign (server verifies signature over tx with empty sigs)
@@ -85,7 +99,7 @@ def main():
     print("tx submitted, txid:", r.get("txid"))
 
     print("Mining to include the tx...")
-    m2 = http_post("/mine", {"miner": wa["address"]})
+    m2 = mine(wa["address"])
     if not m2.get("ok"):
         print("mine failed:", m2)
         sys.exit(1)
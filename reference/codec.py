@@ -0,0 +1,334 @@
+"""Compact binary encoding of PMVP transactions and blocks.
+
+Consensus hashes (txids, block hashes, merkle roots) stay defined over the
+JSON serializations in `primitives.py`; this codec is only a denser way to
+store and transfer the same objects, and decoding must give back exactly
+the dict that was encoded. Every encoded value starts with a version byte
+(CODEC_VERSION). Layout (little-endian):
+
+    tx      = kind (u8) | body
+      kind 0: timestamp i64 | varint n_in | input* | varint n_out | output*
+              input  = txid (32) | index u32 | varint len | pubkey | varint len | sig
+              output = amount u64 | pubkey_hash (20)
+      kind 1: varint len | compact sorted JSON of the tx
+      kind 2: varint height | kind 0 body, a coinbase carrying its block height
+    header  = kind (u8) | body
+      kind 2: prev_hash (32) | varint len | merkle_root (0 or 32) | timestamp i64 |
+              nonce u64 | bits u32
+      kind 0: as kind 2 but ending in varint len | difficulty (utf-8), the
+              leading-zeros header of blocks stored before targets had bits
+      kind 1: varint len | compact sorted JSON of the header
+    entry   = hash (32) | header | varint n_tx | tx*
+
+Hex strings become raw bytes and numbers fixed-width integers, so a
+signed tx shrinks to under half its JSON size. Values the binary form
+cannot reproduce exactly (uppercase hex, addresses that are not 40 hex
+digits, extra keys, floats or out-of-range numbers...) fall back to kind
+1 for that tx or header, so any object the node accepts round-trips.
+
+Decoding works on a `memoryview` of the input and reads fields in place
+with `struct.unpack_from`; hashes and keys are converted to hex straight
+from slices of the view, without intermediate byte copies.
+"""
+
+import json
+import struct
+from typing import Dict, Any, List, Tuple
+
+CODEC_VERSION = 1
+KIND_BINARY = 0
+KIND_JSON = 1
+KIND_BITS = 2
+KIND_COINBASE = 2  # tx kind; headers use kind 2 for KIND_BITS
+BINARY_MIMETYPE = "application/octet-stream"
+
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_U64 = struct.Struct("<Q")
+_TX_KEYS = {"inputs", "outputs", "timestamp"}
+_COINBASE_KEYS = {"inputs", "outputs", "timestamp", "height"}
+_INPUT_KEYS = {"txid", "index", "sig", "pubkey"}
+_OUTPUT_KEYS = {"amount", "pubkey_hash"}
+_HEADER_KEYS = {"prev_hash", "merkle_root", "timestamp", "nonce", "bits"}
+_LEGACY_HEADER_KEYS = {"prev_hash", "merkle_root", "timestamp", "nonce", "difficulty"}
+_ENTRY_KEYS = {"hash", "block"}
+_BLOCK_KEYS = {"header", "txs"}
+
+
+class CodecError(Exception):
+    pass
+
+
+class _NonCanonical(Exception):
+    # a value the binary layout cannot reproduce exactly
+    pass
+
+
+# -- primitives ---------------------------------------------------------
+
+def _write_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _read_varint(buf: memoryview, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        try:
+            b = buf[pos]
+        except IndexError:
+            raise CodecError("truncated varint")
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+def _raw_hex(s: Any, size: int = -1) -> bytes:
+    if type(s) is not str:
+        raise _NonCanonical()
+    try:
+        raw = bytes.fromhex(s)
+    except ValueError:
+        raise _NonCanonical()
+    if raw.hex() != s or (size >= 0 and len(raw) != size):
+        raise _NonCanonical()  # uppercase, whitespace or wrong width
+    return raw
+
+def _int(v: Any, lo: int, hi: int) -> int:
+    if type(v) is not int or not lo <= v <= hi:
+        raise _NonCanonical()
+    return v
+
+def _keys(d: Any, keys) -> Dict[str, Any]:
+    if type(d) is not dict or d.keys() != keys:
+        raise _NonCanonical()
+    return d
+
+def _write_bytes(out: bytearray, raw: bytes):
+    _write_varint(out, len(raw))
+    out += raw
+
+def _read_slice(buf: memoryview, pos: int, n: int) -> Tuple[memoryview, int]:
+    if pos + n > len(buf):
+        raise CodecError("truncated data")
+    return buf[pos:pos + n], pos + n
+
+def _read_bytes(buf: memoryview, pos: int) -> Tuple[memoryview, int]:
+    n, pos = _read_varint(buf, pos)
+    return _read_slice(buf, pos, n)
+
+def _unpack(st: struct.Struct, buf: memoryview, pos: int) -> Tuple[int, int]:
+    try:
+        return st.unpack_from(buf, pos)[0], pos + st.size
+    except struct.error:
+        raise CodecError("truncated data")
+
+def _write_json(out: bytearray, obj: Any):
+    out.append(KIND_JSON)
+    _write_bytes(out, json.dumps(obj, sort_keys=True, separators=(",", ":")).encode())
+
+def _read_json(buf: memoryview, pos: int) -> Tuple[Any, int]:
+    data, pos = _read_bytes(buf, pos)
+    try:
+        return json.loads(bytes(data)), pos
+    except ValueError as exc:
+        raise CodecError("bad JSON payload: %s" % exc)
+
+# -- transactions -------------------------------------------------------
+
+def _write_tx(out: bytearray, tx: Dict[str, Any]):
+    start = len(out)
+    try:
+        if isinstance(tx, dict) and "height" in tx:
+            _keys(tx, _COINBASE_KEYS)
+            out.append(KIND_COINBASE)
+            _write_varint(out, _int(tx["height"], 0, (1 << 63) - 1))
+        else:
+            _keys(tx, _TX_KEYS)
+            out.append(KIND_BINARY)
+        out += _I64.pack(_int(tx["timestamp"], -(1 << 63), (1 << 63) - 1))
+        inputs, outputs = tx["inputs"], tx["outputs"]
+        if type(inputs) is not list or type(outputs) is not list:
+            raise _NonCanonical()
+        _write_varint(out, len(inputs))
+        for inp in inputs:
+            _keys(inp, _INPUT_KEYS)
+            out += _raw_hex(inp["txid"], 32)
+            out += _U32.pack(_int(inp["index"], 0, 0xFFFFFFFF))
+            _write_bytes(out, _raw_hex(inp["pubkey"]))
+            _write_bytes(out, _raw_hex(inp["sig"]))
+        _write_varint(out, len(outputs))
+        for o in outputs:
+            _keys(o, _OUTPUT_KEYS)
+            out += _U64.pack(_int(o["amount"], 0, (1 << 64) - 1))
+            out += _raw_hex(o["pubkey_hash"], 20)
+    except _NonCanonical:
+        del out[start:]
+        _write_json(out, tx)
+
+def _read_tx(buf: memoryview, pos: int) -> Tuple[Dict[str, Any], int]:
+    kind, pos = _read_slice(buf, pos, 1)
+    if kind[0] == KIND_JSON:
+        return _read_json(buf, pos)
+    height = None
+    if kind[0] == KIND_COINBASE:
+        height, pos = _read_varint(buf, pos)
+    elif kind[0] != KIND_BINARY:
+        raise CodecError("unknown tx kind %d" % kind[0])
+    timestamp, pos = _unpack(_I64, buf, pos)
+    n, pos = _read_varint(buf, pos)
+    inputs = []
+    for _ in range(n):
+        txid, pos = _read_slice(buf, pos, 32)
+        index, pos = _unpack(_U32, buf, pos)
+        pubkey, pos = _read_bytes(buf, pos)
+        sig, pos = _read_bytes(buf, pos)
+        inputs.append({"txid": txid.hex(), "index": index, "sig": sig.hex(), "pubkey": pubkey.hex()})
+    n, pos = _read_varint(buf, pos)
+    outputs = []
+    for _ in range(n):
+        amount, pos = _unpack(_U64, buf, pos)
+        pubkey_hash, pos = _read_slice(buf, pos, 20)
+        outputs.append({"amount": amount, "pubkey_hash": pubkey_hash.hex()})
+    tx = {"inputs": inputs, "outputs": outputs, "timestamp": timestamp}
+    if height is not None:
+        tx["height"] = height
+    return tx, pos
+
+# -- headers and block entries ------------------------------------------
+
+def _write_header(out: bytearray, header: Dict[str, Any]):
+    start = len(out)
+    try:
+        legacy = isinstance(header, dict) and "difficulty" in header
+        _keys(header, _LEGACY_HEADER_KEYS if legacy else _HEADER_KEYS)
+        out.append(KIND_BINARY if legacy else KIND_BITS)
+        out += _raw_hex(header["prev_hash"], 32)
+        merkle = _raw_hex(header["merkle_root"])
+        if len(merkle) not in (0, 32):
+            raise _NonCanonical()
+        _write_bytes(out, merkle)
+        out += _I64.pack(_int(header["timestamp"], -(1 << 63), (1 << 63) - 1))
+        out += _U64.pack(_int(header["nonce"], 0, (1 << 64) - 1))
+        if not legacy:
+            out += _U32.pack(_int(header["bits"], 0, (1 << 32) - 1))
+        elif type(header["difficulty"]) is not str:
+            raise _NonCanonical()
+        else:
+            _write_bytes(out, header["difficulty"].encode("utf-8", "surrogatepass"))
+    except _NonCanonical:
+        del out[start:]
+        _write_json(out, header)
+
+def _read_header(buf: memoryview, pos: int) -> Tuple[Dict[str, Any], int]:
+    kind, pos = _read_slice(buf, pos, 1)
+    if kind[0] == KIND_JSON:
+        return _read_json(buf, pos)
+    if kind[0] not in (KIND_BITS, KIND_BINARY):
+        raise CodecError("unknown header kind %d" % kind[0])
+    prev_hash, pos = _read_slice(buf, pos, 32)
+    merkle, pos = _read_bytes(buf, pos)
+    timestamp, pos = _unpack(_I64, buf, pos)
+    nonce, pos = _unpack(_U64, buf, pos)
+    header = {
+        "prev_hash": prev_hash.hex(),
+        "merkle_root": merkle.hex(),
+        "timestamp": timestamp,
+        "nonce": nonce,
+    }
+    if kind[0] == KIND_BITS:
+        header["bits"], pos = _unpack(_U32, buf, pos)
+    else:
+        difficulty, pos = _read_bytes(buf, pos)
+        header["difficulty"] = bytes(difficulty).decode("utf-8", "surrogatepass")
+    return header, pos
+
+def _write_entry(out: bytearray, entry: Dict[str, Any]):
+    _keys(entry, _ENTRY_KEYS)
+    block = _keys(entry["block"], _BLOCK_KEYS)
+    if type(block["txs"]) is not list:
+        raise _NonCanonical()
+    out += _raw_hex(entry["hash"], 32)
+    _write_header(out, block["header"])
+    _write_varint(out, len(block["txs"]))
+    for tx in block["txs"]:
+        _write_tx(out, tx)
+
+def _read_entry(buf: memoryview, pos: int) -> Tuple[Dict[str, Any], int]:
+    block_hash, pos = _read_slice(buf, pos, 32)
+    header, pos = _read_header(buf, pos)
+    n, pos = _read_varint(buf, pos)
+    txs = []
+    for _ in range(n):
+        tx, pos = _read_tx(buf, pos)
+        txs.append(tx)
+    return {"hash": block_hash.hex(), "block": {"header": header, "txs": txs}}, pos
+
+# -- public API ---------------------------------------------------------
+
+def _start(data) -> memoryview:
+    buf = memoryview(data)
+    if not len(buf):
+        raise CodecError("empty data")
+    if buf[0] != CODEC_VERSION:
+        raise CodecError("unsupported codec version %d" % buf[0])
+    return buf
+
+def _finish(buf: memoryview, pos: int):
+    if pos != len(buf):
+        raise CodecError("%d trailing bytes" % (len(buf) - pos))
+
+def encode_tx(tx: Dict[str, Any]) -> bytes:
+    out = bytearray([CODEC_VERSION])
+    _write_tx(out, tx)
+    return bytes(out)
+
+def decode_tx(data) -> Dict[str, Any]:
+    buf = _start(data)
+    tx, pos = _read_tx(buf, 1)
+    _finish(buf, pos)
+    return tx
+
+def encode_entry(entry: Dict[str, Any]) -> bytes:
+    """Encode a chain entry {"hash", "block"}; raises CodecError if it is malformed."""
+    out = bytearray([CODEC_VERSION])
+    try:
+        _write_entry(out, entry)
+    except _NonCanonical:
+        raise CodecError("not a block entry")
+    return bytes(out)
+
+def decode_entry(data) -> Dict[str, Any]:
+    buf = _start(data)
+    entry, pos = _read_entry(buf, 1)
+    _finish(buf, pos)
+    return entry
+
+def decode_entry_header(data) -> Tuple[str, Dict[str, Any]]:
+    """(hash, header) of an encoded chain entry; `data` may stop after the header."""
+    buf = _start(data)
+    block_hash, pos = _read_slice(buf, 1, 32)
+    header, _ = _read_header(buf, pos)
+    return block_hash.hex(), header
+
+def encode_entries(entries: List[Dict[str, Any]]) -> bytes:
+    out = bytearray([CODEC_VERSION])
+    _write_varint(out, len(entries))
+    try:
+        for entry in entries:
+            _write_entry(out, entry)
+    except _NonCanonical:
+        raise CodecError("not a block entry")
+    return bytes(out)
+
+def decode_entries(data) -> List[Dict[str, Any]]:
+    buf = _start(data)
+    n, pos = _read_varint(buf, 1)
+    entries = []
+    for _ in range(n):
+        entry, pos = _read_entry(buf, pos)
+        entries.append(entry)
+    _finish(buf, pos)
+    return entries
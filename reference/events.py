@@ -0,0 +1,83 @@
+"""Node event log for push-style API clients.
+
+The node publishes an event whenever it connects or disconnects a block,
+admits a transaction to the mempool or evicts one, and receives an
+unsigned proposal. Events get increasing sequence numbers and are kept in
+a bounded ring buffer, so a client that remembers the last number it saw
+can catch up after a reconnect with only the events it missed. A client
+that fell further behind than the buffer reaches is told to reset (refetch
+its full state) instead.
+
+Sequence numbers restart with the node, so event ids carry a per-process
+epoch as well: "<epoch>:<seq>". A cursor from another epoch (the node
+restarted since the client last saw it) always gets a reset, even when
+its number happens to be lower than ours.
+
+Readers block in `wait()` on a condition variable until something newer
+than their cursor is published, which backs both the long-poll
+`GET /events` endpoint and the server-sent-events stream.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+# Events kept for catching-up clients
+EVENT_BUFFER = int(os.environ.get("PMVP_EVENT_BUFFER", "1000"))
+
+Event = Dict[str, Any]  # {"id", "seq", "type", "time", "data"}
+
+
+class EventLog:
+    """Bounded, sequence-numbered event buffer with blocking readers."""
+
+    def __init__(self, maxlen: int = EVENT_BUFFER):
+        self._events: deque = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.epoch = os.urandom(4).hex()
+        self.last_seq = 0
+
+    def event_id(self, seq: int) -> str:
+        return "%s:%d" % (self.epoch, seq)
+
+    def parse_id(self, event_id: str) -> Optional[int]:
+        """Sequence number of an event id from this process; None if from another epoch."""
+        epoch, _, seq = event_id.partition(":")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> int:
+        with self._cond:
+            self.last_seq += 1
+            self._events.append({"id": self.event_id(self.last_seq), "seq": self.last_seq, "type": event_type,
+                                 "time": time.time(), "data": data})
+            self._cond.notify_all()
+            return self.last_seq
+
+    def since(self, seq: Optional[int]) -> Tuple[List[Event], bool]:
+        """Events after `seq` and whether the client missed some (must reset).
+
+        `seq` is None for a cursor from another epoch (see parse_id()).
+        """
+        with self._cond:
+            return self._since(seq)
+
+    def _since(self, seq: Optional[int]) -> Tuple[List[Event], bool]:
+        if seq is None:
+            return [], True
+        if seq >= self.last_seq:
+            return [], seq > self.last_seq  # a cursor from the future: node restarted
+        oldest = self._events[0]["seq"] if self._events else self.last_seq + 1
+        missed = seq + 1 < oldest
+        # sequence numbers are contiguous, so the position is arithmetic
+        start = max(0, seq + 1 - oldest)
+        return list(self._events)[start:], missed
+
+    def wait(self, seq: Optional[int], timeout: Optional[float] = None) -> Tuple[List[Event], bool]:
+        """Like since(), but blocks up to `timeout` seconds for a new event."""
+        with self._cond:
+            self._cond.wait_for(lambda: seq is None or self.last_seq != seq, timeout)
+            return self._since(seq)
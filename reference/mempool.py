@@ -0,0 +1,277 @@
+"""Indexed mempool for the PMVP reference node.
+
+Pending transactions are kept in arrival order keyed by txid, next to an
+index from every outpoint spent by a pending tx to that tx's id. Insert,
+lookup and removal are O(1) in the mempool size, a new tx that spends an
+outpoint already claimed by a pending tx is detected at admission
+(first-seen wins), and when a block is connected its transactions and
+anything conflicting with them are evicted by outpoint lookups instead of
+list scans.
+
+Pending txs may spend outputs of other pending txs. Each entry records its
+fee, serialized size and in-mempool parents/children, plus its ancestor
+set and ancestor fee/size totals. A heap of (ancestor fee rate, txid) is
+maintained as txs come and go (stale entries are skipped lazily), and
+`select()` walks a copy of it to build block templates by ancestor fee
+rate: a low-fee parent is mined when its
+high-fee child makes the pair worth it (child-pays-for-parent), and
+parents always precede their children.
+
+`generation` increases on every change so callers (block templates,
+response caches) can tell cheaply whether the contents moved.
+
+Entries hold `model.Transaction` objects, so a pending tx's serialization,
+txid and sighash are computed once and reused by block assembly; `get()`
+and iteration return the tx in its JSON form.
+"""
+
+import heapq
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Set, Union
+
+from model import OutPoint, Transaction, TxOut
+
+# Longest chain of unconfirmed ancestors a pending tx may have
+MAX_ANCESTORS = 25
+# select() gives up after this many packages in a row did not fit while
+# the block is within BLOCK_FULL_MARGIN bytes of its budget
+MAX_CONSECUTIVE_FAILURES = 1000
+BLOCK_FULL_MARGIN = 4000
+
+
+class MempoolError(Exception):
+    pass
+
+
+class MempoolEntry:
+    __slots__ = ("tx", "txid", "fee", "size", "parents", "children", "ancestors", "ancestor_fee", "ancestor_size")
+
+    def __init__(self, tx: Transaction, txid: str, fee: int, size: int):
+        self.tx = tx
+        self.txid = txid
+        self.fee = fee
+        self.size = size
+        self.parents: Set[str] = set()
+        self.children: Set[str] = set()
+        self.ancestors: Set[str] = set()  # in-mempool ancestors, excluding self
+        self.ancestor_fee = fee  # including self
+        self.ancestor_size = size
+
+    @property
+    def fee_rate(self) -> float:
+        return self.fee / self.size
+
+
+def as_transaction(tx: Union[Transaction, Dict[str, Any]]) -> Transaction:
+    return tx if isinstance(tx, Transaction) else Transaction.from_json(tx)
+
+
+class Mempool:
+    """Pending txs by txid with a spent-outpoint -> txid conflict index."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, MempoolEntry]" = OrderedDict()
+        self._spends: Dict[OutPoint, str] = {}  # outpoint -> spending mempool txid
+        self._heap: List = []  # (-ancestor fee rate, txid), may hold stale entries
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, txid: str) -> bool:
+        return txid in self._entries
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter([e.tx.to_json() for e in self._entries.values()])
+
+    def get(self, txid: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(txid)
+        return entry.tx.to_json() if entry else None
+
+    def transaction(self, txid: str) -> Optional[Transaction]:
+        entry = self._entries.get(txid)
+        return entry.tx if entry else None
+
+    def entry(self, txid: str) -> Optional[MempoolEntry]:
+        return self._entries.get(txid)
+
+    def txids(self) -> List[str]:
+        return list(self._entries)
+
+    def spender_of(self, key: OutPoint) -> Optional[str]:
+        return self._spends.get(key)
+
+    def output(self, txid: str, index: int) -> Optional[TxOut]:
+        """Output `index` of pending tx `txid` as a coin, or None."""
+        entry = self._entries.get(txid)
+        if entry is None or not 0 <= index < len(entry.tx.outputs):
+            return None
+        return entry.tx.outputs[index]
+
+    def conflicts(self, tx: Union[Transaction, Dict[str, Any]]) -> Set[str]:
+        """Ids of pending txs spending any outpoint `tx` spends."""
+        found = set()
+        for inp in as_transaction(tx).inputs:
+            spender = self._spends.get(inp.prevout)
+            if spender is not None:
+                found.add(spender)
+        return found
+
+    def descendants(self, txid: str) -> Set[str]:
+        return self._descendants(self._entries[txid])
+
+    def _descendants(self, entry: MempoolEntry) -> Set[str]:
+        found: Set[str] = set()
+        stack = [c for c in entry.children if c in self._entries]
+        found.update(stack)
+        while stack:
+            for child in self._entries[stack.pop()].children:
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        return found
+
+    def add(self, tx: Union[Transaction, Dict[str, Any]], txid: Optional[str] = None, fee: int = 0,
+            size: Optional[int] = None) -> str:
+        """Insert a tx; raises MempoolError on duplicates, conflicts or long chains."""
+        tx = as_transaction(tx)
+        txid = txid or tx.txid
+        if txid in self._entries:
+            raise MempoolError("tx already in mempool")
+        conflicts = self.conflicts(tx)
+        if conflicts:
+            raise MempoolError("conflicts with mempool tx %s" % sorted(conflicts)[0])
+        entry = MempoolEntry(tx, txid, fee, size if size is not None else tx.size)
+        for inp in tx.inputs:
+            parent = self._entries.get(inp.txid)
+            if parent is not None:
+                entry.parents.add(parent.txid)
+                entry.ancestors.add(parent.txid)
+                entry.ancestors |= parent.ancestors
+        if len(entry.ancestors) > MAX_ANCESTORS:
+            raise MempoolError("too many unconfirmed ancestors")
+        for anc in entry.ancestors:
+            entry.ancestor_fee += self._entries[anc].fee
+            entry.ancestor_size += self._entries[anc].size
+        self._entries[txid] = entry
+        for parent in entry.parents:
+            self._entries[parent].children.add(txid)
+        for inp in tx.inputs:
+            self._spends[inp.prevout] = txid
+        self._push(entry)
+        self.generation += 1
+        return txid
+
+    def _push(self, entry: MempoolEntry):
+        heapq.heappush(self._heap, (-entry.ancestor_fee / entry.ancestor_size, entry.txid))
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            # drop stale entries once they dominate
+            self._heap = [(-e.ancestor_fee / e.ancestor_size, t) for t, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _unlink(self, txid: str) -> Optional[MempoolEntry]:
+        entry = self._entries.pop(txid, None)
+        if entry is None:
+            return None
+        for inp in entry.tx.inputs:
+            key = inp.prevout
+            if self._spends.get(key) == txid:
+                del self._spends[key]
+        for parent in entry.parents:
+            if parent in self._entries:
+                self._entries[parent].children.discard(txid)
+        for child in entry.children:
+            if child in self._entries:
+                self._entries[child].parents.discard(txid)
+        self.generation += 1
+        return entry
+
+    def remove(self, txid: str) -> List[str]:
+        """Remove a tx and everything spending its outputs; returns removed ids."""
+        if txid not in self._entries:
+            return []
+        doomed = [txid] + list(self.descendants(txid))
+        for t in doomed:
+            self._unlink(t)
+        return doomed
+
+    def _confirm(self, txid: str):
+        # tx is now in the chain: its children lose it as an ancestor
+        entry = self._unlink(txid)
+        if entry is None:
+            return
+        for desc in self._descendants(entry):
+            d = self._entries[desc]
+            if txid in d.ancestors:
+                d.ancestors.discard(txid)
+                d.ancestor_fee -= entry.fee
+                d.ancestor_size -= entry.size
+                self._push(d)
+
+    def remove_for_block(self, block_txs: Iterable[Union[Transaction, Dict[str, Any]]]) -> List[str]:
+        """Evict txs confirmed by a block and txs (plus descendants) conflicting with it."""
+        removed = []
+        for tx in block_txs:
+            tx = as_transaction(tx)
+            txid = tx.txid
+            if txid in self._entries:
+                self._confirm(txid)
+                removed.append(txid)
+            for spender in self.conflicts(tx):
+                removed.extend(self.remove(spender))
+        return removed
+
+    def clear(self):
+        self._entries.clear()
+        self._spends.clear()
+        self._heap = []
+        self.generation += 1
+
+    def select(self, max_txs: int, max_bytes: int) -> List[str]:
+        """Txids for a block template, best ancestor fee rate first.
+
+        Each pick includes the tx's not-yet-selected ancestors as a package;
+        packages that would exceed the tx-count or byte budget are skipped.
+        The result is in dependency order (parents before children).
+        """
+        entries = self._entries
+        heap = list(self._heap)  # a copy of a heap is still a heap
+        # package totals of txs whose ancestors were picked in this call
+        modified: Dict[str, List[int]] = {}
+        selected: List[str] = []
+        chosen: Set[str] = set()
+        failed: Set[str] = set()
+        n_bytes = 0
+        failures = 0
+        while heap and len(selected) < max_txs:
+            neg_rate, txid = heapq.heappop(heap)
+            e = entries.get(txid)
+            if e is None or txid in chosen or txid in failed:
+                continue
+            fee, size = modified.get(txid) or (e.ancestor_fee, e.ancestor_size)
+            if -neg_rate != fee / size:
+                continue  # stale heap entry; a fresher one was pushed
+            package = [a for a in e.ancestors if a not in chosen] + [txid]
+            if len(selected) + len(package) > max_txs or n_bytes + size > max_bytes:
+                failed.add(txid)
+                failures += 1
+                if failures > MAX_CONSECUTIVE_FAILURES and n_bytes > max_bytes - BLOCK_FULL_MARGIN:
+                    break
+                continue
+            failures = 0
+            # ancestors have strictly smaller ancestor sets: sort = topological order
+            package.sort(key=lambda t: len(entries[t].ancestors))
+            for t in package:
+                chosen.add(t)
+                selected.append(t)
+                p = entries[t]
+                n_bytes += p.size
+                for desc in self._descendants(p):
+                    if desc in chosen:
+                        continue
+                    d = entries[desc]
+                    totals = modified.setdefault(desc, [d.ancestor_fee, d.ancestor_size])
+                    totals[0] -= p.fee
+                    totals[1] -= p.size
+                    heapq.heappush(heap, (-totals[0] / totals[1], desc))
+        return selected
@@ -0,0 +1,318 @@
+"""Proof-of-work mining engine for the PMVP reference node.
+
+The nonce space is split into contiguous ranges, one per worker process.
+Workers hash their range until one of them finds a header hash meeting the
+target (see target.py); a shared stop event then ends the others. Each worker reports
+how many hashes it did and for how long, so the caller gets a per-worker
+and total hashrate. With a single worker the search runs in-process to
+avoid process start-up cost. Workers are started with forkserver (spawn
+where it is missing) rather than forked from the threaded node.
+
+Hashing in the inner loop uses `HeaderHasher`: the header JSON is
+serialized once, split around the nonce, and the sha256 state of the fixed
+prefix is copied per attempt. Hashes are bit-identical to `header_hash()`;
+the raw digest is compared with the target as 32 big-endian bytes, which
+orders exactly like the integers.
+
+`MiningScheduler` runs mining jobs on a background thread so HTTP handlers
+only enqueue work. One-shot jobs mine a single block; continuous jobs keep
+mining blocks from fresh templates until cancelled. Work is abandoned and
+restarted from a new template when the tip changes (and, for continuous
+jobs, when the mempool template changes).
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import hashlib
+import threading
+import multiprocessing as mp
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from target import target_from_bits
+
+# Nonces each worker hashes between checks of the shared stop event
+CHECK_INTERVAL = 2048
+# Width of the nonce range assigned to each worker
+RANGE_SIZE = 1 << 40
+# Start method for worker processes (as for the sigverify pool)
+MP_CONTEXT = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+MINER_WORKERS = int(os.environ.get("PMVP_MINER_WORKERS", "1"))
+# Finished jobs kept for /mine/<job_id> lookups
+JOB_HISTORY = 100
+# Minimum age of a continuous job's template before a mempool change restarts it
+TEMPLATE_MIN_AGE = 2.0
+
+
+# Placeholder nonce used to locate the nonce inside the serialized header
+_NONCE_MARK = 987654321987654321987654321
+
+
+class HeaderHasher:
+    """Fast `header_hash(header)` for many nonces of the same header."""
+
+    def __init__(self, header: Dict[str, Any]):
+        probe = dict(header)
+        probe["nonce"] = _NONCE_MARK
+        text = json.dumps(probe, sort_keys=True)
+        mark = str(_NONCE_MARK)
+        if text.count(mark) != 1:
+            raise ValueError("cannot locate nonce in serialized header")
+        prefix, suffix = text.split(mark)
+        self._prefix_state = hashlib.sha256(prefix.encode())
+        self._suffix = suffix.encode()
+
+    def hash(self, nonce: int) -> str:
+        return self.digest(nonce).hex()
+
+    def digest(self, nonce: int) -> bytes:
+        h = self._prefix_state.copy()
+        h.update(b"%d" % nonce + self._suffix)
+        return h.digest()
+
+
+def search_range(header: Dict[str, Any], target: int, start: int, stop: int, stop_event=None) -> Dict[str, Any]:
+    """Hash nonces in [start, stop) until one meets `target` or `stop_event` is set."""
+    digest_nonce = HeaderHasher(header).digest
+    limit = target.to_bytes(32, "big")
+    t0 = time.perf_counter()
+    nonce = start
+    found = None
+    while nonce < stop:
+        end = min(nonce + CHECK_INTERVAL, stop)
+        while nonce < end:
+            d = digest_nonce(nonce)
+            if d <= limit:
+                found = (nonce, d.hex())
+                break
+            nonce += 1
+        if found or (stop_event is not None and stop_event.is_set()):
+            break
+    hashes = nonce - start + (1 if found else 0)
+    result = {"hashes": hashes, "seconds": time.perf_counter() - t0, "nonce": None, "hash": None}
+    if found:
+        result["nonce"], result["hash"] = found
+    return result
+
+
+def _worker(worker_id: int, header, target, start, stop, stop_event, results):
+    res = search_range(header, target, start, stop, stop_event)
+    res["worker"] = worker_id
+    if res["nonce"] is not None:
+        stop_event.set()
+    results.put(res)
+
+
+def _summary(per_worker: List[Dict[str, Any]]) -> Dict[str, Any]:
+    winner = next((r for r in per_worker if r["nonce"] is not None), None)
+    workers = []
+    for r in sorted(per_worker, key=lambda r: r["worker"]):
+        rate = r["hashes"] / r["seconds"] if r["seconds"] > 0 else 0.0
+        workers.append({"worker": r["worker"], "hashes": r["hashes"], "seconds": r["seconds"], "hashrate": rate})
+    return {
+        "nonce": winner["nonce"] if winner else None,
+        "hash": winner["hash"] if winner else None,
+        "workers": workers,
+        "hashrate": sum(w["hashrate"] for w in workers),
+    }
+
+
+class _StopCheck:
+    # adapts a should_stop() predicate to the Event.is_set() interface
+    def __init__(self, should_stop: Callable[[], bool]):
+        self.is_set = should_stop
+
+
+def mine_header(header: Dict[str, Any], target: int, workers: Optional[int] = None, start_nonce: int = 1,
+                should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """Find a nonce for `header`; returns {"nonce", "hash", "workers", "hashrate"}.
+
+    The header dict is not modified; the caller sets header["nonce"] from
+    the result. If `should_stop` returns True the search is abandoned and
+    the result has nonce None.
+    """
+    workers = max(1, workers or MINER_WORKERS)
+    if workers == 1:
+        check = _StopCheck(should_stop) if should_stop else None
+        res = search_range(header, target, start_nonce, start_nonce + RANGE_SIZE, check)
+        res["worker"] = 0
+        return _summary([res])
+    stop_event = MP_CONTEXT.Event()
+    results = MP_CONTEXT.Queue()
+    procs = []
+    for i in range(workers):
+        start = start_nonce + i * RANGE_SIZE
+        p = MP_CONTEXT.Process(target=_worker, args=(i, header, target, start, start + RANGE_SIZE, stop_event, results), daemon=True)
+        p.start()
+        procs.append(p)
+    per_worker = []
+    while len(per_worker) < len(procs):
+        try:
+            per_worker.append(results.get(timeout=0.1))
+        except queue.Empty:
+            if should_stop and should_stop():
+                stop_event.set()
+    for p in procs:
+        p.join()
+    return _summary(per_worker)
+
+
+class MiningScheduler:
+    """Background mining jobs driven by node-supplied callbacks.
+
+    build_template(miner) -> {"header", "height", "version", ...} builds a
+    block template; submit_block(template, stats) connects a solved template and
+    returns the chain entry (None if it went stale); template_version()
+    returns the node's current (tip hash, mempool generation).
+    """
+
+    def __init__(self, build_template: Callable[[str], Dict[str, Any]],
+                 submit_block: Callable[[Dict[str, Any], Dict[str, Any]], Optional[Dict[str, Any]]],
+                 template_version: Callable[[], Tuple[str, int]], workers: Optional[int] = None):
+        self.build_template = build_template
+        self.submit_block = submit_block
+        self.template_version = template_version
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending: deque = deque()  # one-shot job ids, FIFO
+        self._continuous: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, miner: str, continuous: bool = False) -> Dict[str, Any]:
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "miner": miner,
+            "continuous": continuous,
+            "status": "queued",
+            "created": time.time(),
+            "hashrate": 0.0,
+            "workers": [],
+            "attempts": 0,
+            "blocks": [],
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+            if continuous:
+                # one continuous job at a time; a new one replaces the old
+                if self._continuous:
+                    self._finish(self._jobs[self._continuous], "cancelled")
+                self._continuous = job["job_id"]
+            else:
+                self._pending.append(job["job_id"])
+            self._trim()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pmvp-miner", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+            return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] not in ("queued", "running"):
+                return False
+            self._finish(job, "cancelled")
+            return True
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until a one-shot job leaves the queued/running states."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] not in ("queued", "running"):
+                    return dict(job) if job else None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return dict(job)
+                self._wake.wait(remaining)
+
+    # -- internals (callers hold self._lock unless noted) ---------------
+
+    def _finish(self, job: Dict[str, Any], status: str):
+        job["status"] = status
+        job["finished"] = time.time()
+        if self._continuous == job["job_id"]:
+            self._continuous = None
+        if job["job_id"] in self._pending:
+            self._pending.remove(job["job_id"])
+        self._wake.notify_all()
+
+    def _trim(self):
+        done = [jid for jid, j in self._jobs.items() if j["status"] not in ("queued", "running")]
+        for jid in done[:max(0, len(self._jobs) - JOB_HISTORY)]:
+            del self._jobs[jid]
+
+    def _next_job(self) -> Dict[str, Any]:
+        with self._lock:
+            while True:
+                jid = self._pending[0] if self._pending else self._continuous
+                if jid:
+                    job = self._jobs[jid]
+                    job["status"] = "running"
+                    return job
+                self._wake.wait()
+
+    def _run(self):
+        # mining thread; takes self._lock only around job bookkeeping
+        while True:
+            job = self._next_job()
+            try:
+                self._mine(job)
+            except Exception as exc:  # keep the mining thread alive
+                with self._lock:
+                    job["error"] = str(exc)
+                    if job["status"] in ("queued", "running"):
+                        self._finish(job, "failed")
+
+    def _mine(self, job: Dict[str, Any]):
+        # one template for `job`: build, mine, submit, update the job
+        template = self.build_template(job["miner"])
+        started = time.time()
+        version = template["version"]
+
+        def should_stop():
+            if job["status"] != "running":
+                return True
+            current = self.template_version()
+            if current[0] != version[0]:
+                return True  # tip moved: template is stale
+            if job["continuous"] and current != version and time.time() - started > TEMPLATE_MIN_AGE:
+                return True  # refresh template with new mempool txs
+            if job["continuous"] and self._pending:
+                return True  # let queued one-shot jobs run
+            return False
+
+        header = template["header"]
+        stats = mine_header(header, target_from_bits(header["bits"]), self.workers, should_stop=should_stop)
+        entry = self.submit_block(template, stats) if stats["nonce"] is not None else None
+        with self._lock:
+            job["attempts"] += 1
+            job["hashrate"] = stats["hashrate"]
+            job["workers"] = stats["workers"]
+            if job["status"] != "running":
+                return  # cancelled while mining
+            if entry is None:
+                job["status"] = "queued"  # stale template: retry
+                return
+            found = {"block_hash": entry["hash"], "height": template["height"]}
+            job["blocks"].append(found)
+            if job["continuous"]:
+                job["status"] = "queued"
+                del job["blocks"][:-JOB_HISTORY]
+            else:
+                job["result"] = found
+                self._finish(job, "done")
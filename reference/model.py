@@ -0,0 +1,212 @@
+"""Typed core objects for the PMVP reference node.
+
+Transactions and blocks travel through the API and the block store as
+JSON-shaped dicts; inside the node they are wrapped in small `__slots__`
+classes instead:
+
+- `OutPoint(txid, index)` names a transaction output. It is a NamedTuple,
+  so it hashes and compares by value and works as a dict key without
+  building "txid:index" strings.
+- `TxOut`, `TxIn` hold the fields of outputs and inputs.
+- `Transaction` caches its serialization, txid and sighash the first
+  time they are needed, so a tx that is admitted, re-verified at block
+  assembly, mined and evicted is serialized and hashed once.
+- `BlockHeader` caches its hash; `Block` pairs it with its transactions.
+
+The JSON adapters (`from_json()`, `to_json()`) keep the API shape
+unchanged. Objects built from JSON keep the original dict, so `to_json()`
+returns exactly what was received and txids/hashes are computed over the
+same bytes as `primitives.txid_of()`/`header_hash()`, even for objects
+with extra keys. The objects are treated as immutable once built.
+"""
+
+from typing import Dict, Any, List, Optional, NamedTuple
+
+from primitives import sha256, is_address, serialize_tx, signing_message, header_hash, outpoint_key, merkle_root_from_txids
+from sigverify import sighash
+
+
+class OutPoint(NamedTuple):
+    txid: str
+    index: int
+
+    def __str__(self) -> str:
+        return outpoint_key(self.txid, self.index)
+
+    @classmethod
+    def parse(cls, key: str) -> "OutPoint":
+        txid, _, index = key.rpartition(":")
+        return cls(txid, int(index))
+
+
+class TxOut:
+    __slots__ = ("amount", "pubkey_hash")
+
+    def __init__(self, amount: int, pubkey_hash: str):
+        self.amount = amount
+        self.pubkey_hash = pubkey_hash
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TxOut) and self.amount == other.amount and self.pubkey_hash == other.pubkey_hash
+
+    def __repr__(self) -> str:
+        return "TxOut(%r, %r)" % (self.amount, self.pubkey_hash)
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "TxOut":
+        out = cls(d["amount"], d["pubkey_hash"])
+        if not is_address(out.pubkey_hash):
+            raise ValueError("malformed transaction output")
+        return out
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"amount": self.amount, "pubkey_hash": self.pubkey_hash}
+
+
+class TxIn:
+    __slots__ = ("txid", "index", "sig", "pubkey")
+
+    def __init__(self, txid: str, index: int, sig: str = "", pubkey: str = ""):
+        self.txid = txid
+        self.index = index
+        self.sig = sig
+        self.pubkey = pubkey
+
+    @property
+    def prevout(self) -> OutPoint:
+        return OutPoint(self.txid, self.index)
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "TxIn":
+        inp = cls(d["txid"], d["index"], d.get("sig", ""), d.get("pubkey", ""))
+        if not (type(inp.txid) is str and type(inp.index) is int and type(inp.sig) is str and type(inp.pubkey) is str):
+            raise ValueError("malformed transaction input")
+        return inp
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"txid": self.txid, "index": self.index, "sig": self.sig, "pubkey": self.pubkey}
+
+
+class Transaction:
+    __slots__ = ("inputs", "outputs", "timestamp", "_json", "_serialized", "_txid", "_sighash")
+
+    def __init__(self, inputs: List[TxIn], outputs: List[TxOut], timestamp: int, _json: Optional[Dict[str, Any]] = None):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.timestamp = timestamp
+        self._json = _json
+        self._serialized: Optional[bytes] = None
+        self._txid: Optional[str] = None
+        self._sighash: Optional[bytes] = None
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "Transaction":
+        """Wrap a tx dict; raises ValueError if it lacks the tx fields."""
+        try:
+            inputs = [TxIn.from_json(i) for i in d.get("inputs", [])]
+            outputs = [TxOut.from_json(o) for o in d.get("outputs", [])]
+        except (KeyError, TypeError, AttributeError, ValueError):
+            raise ValueError("malformed transaction")
+        return cls(inputs, outputs, d.get("timestamp"), d)
+
+    def to_json(self) -> Dict[str, Any]:
+        if self._json is None:
+            self._json = {
+                "inputs": [i.to_json() for i in self.inputs],
+                "outputs": [o.to_json() for o in self.outputs],
+                "timestamp": self.timestamp,
+            }
+        return self._json
+
+    @property
+    def serialized(self) -> bytes:
+        if self._serialized is None:
+            self._serialized = serialize_tx(self.to_json())
+        return self._serialized
+
+    @property
+    def size(self) -> int:
+        return len(self.serialized)
+
+    @property
+    def txid(self) -> str:
+        if self._txid is None:
+            self._txid = sha256(self.serialized)
+        return self._txid
+
+    @property
+    def sighash(self) -> bytes:
+        # digest every input signs (see sigverify); b"" for coinbase txs
+        if self._sighash is None:
+            self._sighash = sighash(signing_message(self.to_json())) if self.inputs else b""
+        return self._sighash
+
+    def is_coinbase(self) -> bool:
+        return not self.inputs
+
+
+class BlockHeader:
+    __slots__ = ("prev_hash", "merkle_root", "timestamp", "nonce", "bits", "_json", "_hash")
+
+    def __init__(self, prev_hash: str, merkle_root: str, timestamp: int, nonce: int, bits: int,
+                 _json: Optional[Dict[str, Any]] = None):
+        self.prev_hash = prev_hash
+        self.merkle_root = merkle_root
+        self.timestamp = timestamp
+        self.nonce = nonce
+        self.bits = bits
+        self._json = _json
+        self._hash: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "BlockHeader":
+        return cls(d["prev_hash"], d["merkle_root"], d["timestamp"], d["nonce"], d["bits"], d)
+
+    def to_json(self) -> Dict[str, Any]:
+        if self._json is None:
+            self._json = {
+                "prev_hash": self.prev_hash,
+                "merkle_root": self.merkle_root,
+                "timestamp": self.timestamp,
+                "nonce": self.nonce,
+                "bits": self.bits,
+            }
+        return self._json
+
+    @property
+    def hash(self) -> str:
+        if self._hash is None:
+            self._hash = header_hash(self.to_json())
+        return self._hash
+
+
+class Block:
+    __slots__ = ("header", "txs")
+
+    def __init__(self, header: BlockHeader, txs: List[Transaction]):
+        self.header = header
+        self.txs = txs
+
+    @property
+    def hash(self) -> str:
+        return self.header.hash
+
+    def compute_merkle_root(self) -> str:
+        return merkle_root_from_txids([tx.txid for tx in self.txs])
+
+    @classmethod
+    def from_json(cls, d: Dict[str, Any]) -> "Block":
+        return cls(BlockHeader.from_json(d["header"]), [Transaction.from_json(tx) for tx in d["txs"]])
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"header": self.header.to_json(), "txs": [tx.to_json() for tx in self.txs]}
+
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any]) -> "Block":
+        """Chain entry {"hash", "block"}; the stored hash is trusted."""
+        block = cls.from_json(entry["block"])
+        block.header._hash = entry["hash"]
+        return block
+
+    def to_entry(self) -> Dict[str, Any]:
+        return {"hash": self.hash, "block": self.to_json()}
@@ -0,0 +1,287 @@
+"""Peer-to-peer relay for the PMVP reference node.
+
+Peers are other nodes' HTTP base URLs. Relay follows the inventory model:
+
+- A node that connects a block or admits a tx *announces* it by hash to
+  its peers (`POST /inv` with `{"from": <its url>, "inv": [{"type", "hash"}]}`).
+  Announcements are queued and sent in batches, one request per peer, so a
+  burst of txs costs a handful of requests rather than one per tx.
+- A node receiving an announcement asks for the items it does not have
+  yet (`POST /getdata` with the same inventory list) and hands the answer
+  (`{"blocks": [...], "txs": [...]}`) to the node, which validates it and,
+  if accepted, announces it onward.
+- Every item seen is remembered in a bounded LRU together with the peers
+  known to have it, so an item is fetched once, and never announced back
+  to a peer that announced it or that we already told.
+
+`PeerManager` implements the transport and dedup; the node supplies
+`have(kind, hash)` and `receive(peer, data)` callbacks (and optionally
+`on_connect(peer)`) and exposes the HTTP endpoints. Sending and fetching
+run on background threads started with the first peer, so request
+handlers and the miner never wait on the network.
+"""
+
+import os
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Tuple, Set
+
+from codec import BINARY_MIMETYPE, CodecError, decode_entries
+
+# Seconds before a request to a peer is abandoned
+PEER_TIMEOUT = float(os.environ.get("PMVP_PEER_TIMEOUT", "5"))
+MAX_PEERS = int(os.environ.get("PMVP_MAX_PEERS", "32"))
+# Consecutive failed requests after which a peer is dropped
+MAX_FAILURES = 5
+# Inventory items remembered for dedup
+SEEN_INVENTORY = 100_000
+# Items per /inv or /getdata message
+MAX_INV_PER_MESSAGE = 1000
+INV_TYPES = ("block", "tx")
+
+Inv = Tuple[str, str]  # (type, hash)
+
+
+class PeerError(Exception):
+    pass
+
+
+def normalize_url(url: Any) -> str:
+    if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+        raise PeerError("peer url must be http(s)://host:port")
+    return url.rstrip("/")
+
+def parse_inv(items: Any) -> List[Inv]:
+    """[{"type", "hash"}] message body -> [(type, hash)]; raises PeerError."""
+    if not isinstance(items, list) or len(items) > MAX_INV_PER_MESSAGE:
+        raise PeerError("inv must be a list of at most %d items" % MAX_INV_PER_MESSAGE)
+    inv = []
+    for item in items:
+        if not isinstance(item, dict) or item.get("type") not in INV_TYPES or not isinstance(item.get("hash"), str):
+            raise PeerError("bad inventory item")
+        inv.append((item["type"], item["hash"]))
+    return inv
+
+def inv_json(inv: List[Inv]) -> List[Dict[str, str]]:
+    return [{"type": kind, "hash": h} for kind, h in inv]
+
+def http_json(url: str, data: Any = None, timeout: float = PEER_TIMEOUT, headers: Optional[Dict[str, str]] = None) -> Any:
+    """GET (or POST `data` as JSON) and decode the JSON reply; raises PeerError."""
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers=dict(headers or {}, **{"Content-Type": "application/json"}))
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return json.loads(r.read().decode())
+    except (urllib.error.URLError, OSError, ValueError) as exc:
+        raise PeerError("%s: %s" % (url, exc))
+
+def http_entries(url: str, timeout: float = PEER_TIMEOUT) -> List[Dict[str, Any]]:
+    """GET chain entries in the binary codec (e.g. /blocks); raises PeerError."""
+    req = urllib.request.Request(url, headers={"Accept": BINARY_MIMETYPE})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return decode_entries(r.read())
+    except (urllib.error.URLError, OSError, CodecError) as exc:
+        raise PeerError("%s: %s" % (url, exc))
+
+
+class PeerManager:
+    """Peer list, batched inventory announcements and getdata fetches.
+
+    `api_key`, if set, is sent (as X-API-Key) with the handshake asking a new
+    peer to add us back, since nodes only take POST /peer from authorized
+    clients or for their configured seeds.
+    """
+
+    def __init__(self, self_url: str, have: Callable[[str, str], bool], receive: Callable[[str, Dict[str, Any]], None],
+                 on_connect: Optional[Callable[[str], None]] = None, timeout: float = PEER_TIMEOUT,
+                 api_key: Optional[str] = None):
+        self.self_url = self_url
+        self.timeout = timeout
+        self._handshake_headers = {"X-API-Key": api_key} if api_key else {}
+        self._have = have
+        self._receive = receive
+        self._on_connect = on_connect
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._peers: Dict[str, Dict[str, Any]] = {}  # url -> stats
+        self._seen: "OrderedDict[Inv, Set[str]]" = OrderedDict()  # item -> peers known to have it
+        self._outbox: Dict[str, List[Inv]] = {}  # url -> items to announce
+        self._inbox: deque = deque()  # (url, items) to fetch, or (None, callable)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._threads: List[threading.Thread] = []
+
+    def _start(self):
+        # caller holds _lock
+        if self._threads:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="peer-send")
+        for target in (self._send_loop, self._fetch_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _known(self, item: Inv) -> Set[str]:
+        # caller holds _lock; peers known to have `item` (marks it seen)
+        known = self._seen.get(item)
+        if known is None:
+            known = self._seen[item] = set()
+            if len(self._seen) > SEEN_INVENTORY:
+                self._seen.popitem(last=False)
+        else:
+            self._seen.move_to_end(item)
+        return known
+
+    # -- peer list -------------------------------------------------------
+
+    def add(self, url: str, handshake: bool = True) -> bool:
+        """Add a peer (and ask it to add us back); False if already known."""
+        url = normalize_url(url)
+        if url == self.self_url:
+            raise PeerError("cannot peer with self")
+        with self._lock:
+            if url in self._peers:
+                return False
+            if len(self._peers) >= MAX_PEERS:
+                raise PeerError("peer limit reached")
+            self._peers[url] = {"url": url, "added": time.time(), "last_seen": None, "failures": 0,
+                                "inv_sent": 0, "inv_received": 0}
+            self._start()
+            if handshake:
+                self._inbox.append((None, lambda: self.request(url, "/peer", {"url": self.self_url}, self._handshake_headers)))
+            if self._on_connect is not None:
+                self._inbox.append((None, lambda: self._on_connect(url)))
+            self._wake.notify_all()
+        return True
+
+    def remove(self, url: str) -> bool:
+        with self._lock:
+            self._outbox.pop(url, None)
+            return self._peers.pop(url, None) is not None
+
+    def peers(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(p) for p in self._peers.values()]
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    def request(self, url: str, path: str, data: Any = None, headers: Optional[Dict[str, str]] = None) -> Any:
+        """JSON request to a peer, tracking its health; raises PeerError."""
+        return self._tracked(url, lambda: http_json(url + path, data, self.timeout, headers))
+
+    def fetch_blocks(self, url: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """Chain entries at heights start..end (inclusive) from a peer, in the binary codec."""
+        return self._tracked(url, lambda: http_entries("%s/blocks?from=%d&to=%d" % (url, start, end), self.timeout))
+
+    def _tracked(self, url: str, call: Callable[[], Any]) -> Any:
+        # run a request to `url`, counting failures and dropping dead peers
+        try:
+            reply = call()
+        except PeerError:
+            with self._lock:
+                peer = self._peers.get(url)
+                if peer is not None:
+                    peer["failures"] += 1
+                    if peer["failures"] >= MAX_FAILURES:
+                        del self._peers[url]
+                        self._outbox.pop(url, None)
+            raise
+        with self._lock:
+            peer = self._peers.get(url)
+            if peer is not None:
+                peer["failures"] = 0
+                peer["last_seen"] = time.time()
+        return reply
+
+    # -- inventory -------------------------------------------------------
+
+    def announce(self, kind: str, h: str):
+        """Queue an announcement of a new block/tx to peers not known to have it."""
+        item = (kind, h)
+        with self._lock:
+            known = self._known(item)
+            for url in self._peers:
+                if url not in known:
+                    known.add(url)
+                    self._outbox.setdefault(url, []).append(item)
+            if self._outbox:
+                self._wake.notify_all()
+
+    def on_inv(self, url: str, inv: List[Inv]) -> int:
+        """Handle an announcement from peer `url`; queues a getdata, returns items wanted.
+
+        Raises PeerError if `url` is not one of our peers: the getdata goes
+        to the sender, so anyone else could make us request arbitrary URLs.
+        """
+        url = normalize_url(url)
+        wanted = []
+        with self._lock:
+            if url not in self._peers:
+                raise PeerError("not a peer: %s" % url)
+            self._peers[url]["inv_received"] += len(inv)
+            for item in inv:
+                fresh = item not in self._seen
+                self._known(item).add(url)
+                if fresh:
+                    wanted.append(item)
+        # the node may have the item from before it was tracked (e.g. mined here)
+        wanted = [item for item in wanted if not self._have(*item)]
+        if wanted:
+            with self._lock:
+                self._start()
+                self._inbox.append((url, wanted))
+                self._wake.notify_all()
+        return len(wanted)
+
+    def _forget(self, inv: List[Inv]):
+        # a fetch failed: let a later announcement trigger it again
+        with self._lock:
+            for item in inv:
+                self._seen.pop(item, None)
+
+    # -- background loops ------------------------------------------------
+
+    def _send_loop(self):
+        while True:
+            with self._lock:
+                while not self._outbox:
+                    self._wake.wait()
+                outbox, self._outbox = self._outbox, {}
+                for url, items in outbox.items():
+                    if url in self._peers:
+                        self._peers[url]["inv_sent"] += len(items)
+            for url, items in outbox.items():
+                for i in range(0, len(items), MAX_INV_PER_MESSAGE):
+                    self._pool.submit(self._send_inv, url, items[i:i + MAX_INV_PER_MESSAGE])
+
+    def _send_inv(self, url: str, items: List[Inv]):
+        try:
+            self.request(url, "/inv", {"from": self.self_url, "inv": inv_json(items)})
+        except PeerError:
+            pass
+
+    def _fetch_loop(self):
+        # one fetch at a time, so blocks are received in announcement order
+        while True:
+            with self._lock:
+                while not self._inbox:
+                    self._wake.wait()
+                url, work = self._inbox.popleft()
+            try:
+                if url is None:
+                    work()
+                    continue
+                try:
+                    data = self.request(url, "/getdata", {"inv": inv_json(work)})
+                except PeerError:
+                    self._forget(work)
+                    continue
+                self._receive(url, data)
+            except Exception:  # keep the fetch thread alive (bad peer data, peer gone)
+                pass
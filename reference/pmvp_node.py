@@ -7,8 +7,9 @@ Features:
 - keypair generation (secp256k1)
 - UTXO model
 - transaction creation/verification
-- simple PoW mining with adjustable difficulty
-- minimal Flask API: /new_wallet, /tx, /mine, /chain, /balance
+- PoW mining against a 256-bit target, retargeted every block
+- minimal Flask API: /new_wallet, /tx, /mine, /chain, /blocks, /headers, /tip, /balance
+- block/tx relay between peers (/peer, /inv, /getdata)
 
 This is a learning reference, not production software.
 """
@@ -16,12 +17,28 @@ This is a learning reference, not production software.
 import time
 import os
 import json
-import hashlib
 import threading
-from typing import List, Dict, Any
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Optional, Tuple, Callable
 
-from ecdsa import SigningKey, SECP256k1, VerifyingKey
-from flask import Flask, request, jsonify
+from ecdsa import SigningKey, SECP256k1
+from flask import Flask, Response, request, jsonify
+
+from primitives import sha256, address_from_pubkey_hex, is_address, serialize_tx, signing_message, txid_of, header_hash, merkle_root, merkle_root_from_txids
+from model import OutPoint, TxOut, Transaction, Block
+from utxo import UtxoSet, BlockUndo, coins_from_json, packed_to_json
+from utxodb import SqliteBackend
+from blockstore import BlockStore
+from blockindex import BlockIndex, BlockNode
+from snapshot import list_snapshots, read_snapshot, write_snapshot
+from mining import mine_header, MiningScheduler, MINER_WORKERS
+from target import target_from_bits, bits_from_target, zeros_target, hash_meets_target, target_work, next_target
+from mempool import Mempool, MempoolError, as_transaction
+from sigverify import verify_batch, cache_stats
+from events import EventLog
+from codec import CodecError, BINARY_MIMETYPE, encode_entry, encode_entries, decode_tx
+from peers import PeerManager, PeerError, normalize_url, parse_inv
+from sync import ChainSync, SyncError
 
 app = Flask(__name__)
 
@@ -29,6 +46,16 @@ app = Flask(__name__)
 # By default allow the local UI ports used in the demo. Configure via env or edit.
 ALLOWED_ORIGINS = set(["http://127.0.0.1:8002", "http://localhost:8002"])
 API_KEY = os.environ.get("PMVP_API_KEY")
+# Block store location; blocks are appended here and survive restarts
+DATA_DIR = os.environ.get("PMVP_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+# Write a UTXO snapshot every N blocks (0 disables) so startup can skip replay
+SNAPSHOT_INTERVAL = int(os.environ.get("PMVP_SNAPSHOT_INTERVAL", "100"))
+# UTXO storage: "memory" (dict, rebuilt at startup) or "sqlite" (<datadir>/utxo.sqlite)
+UTXO_BACKEND = os.environ.get("PMVP_UTXO_BACKEND", "memory")
+# HTTP port, the URL peers reach us at, and peers to connect to at startup (comma-separated URLs)
+API_PORT = int(os.environ.get("PMVP_PORT", "5001"))
+NODE_URL = os.environ.get("PMVP_NODE_URL", "http://127.0.0.1:%d" % API_PORT)
+BOOTSTRAP_PEERS = [u for u in os.environ.get("PMVP_PEERS", "").split(",") if u]
 
 
 @app.after_request
@@ -47,114 +74,367 @@ def add_cors_headers(response):
     response.headers['Access-Control-Allow-Methods'] = 'GET,POST,OPTIONS'
     return response
 
+def check_authorized():
+    # for routes that change node state on a client's behalf (POST /unsigned,
+    # POST /peer): require either valid API key header (if API_KEY configured)
+    # or request Origin in ALLOWED_ORIGINS. None if allowed, else the 403 reply
+    origin = request.headers.get('Origin')
+    key = request.headers.get('X-API-Key')
+    if API_KEY:
+        if not key or key != API_KEY:
+            return jsonify({"ok": False, "reason": "missing or invalid API key"}), 403
+    else:
+        # no API key configured: allow only from allowed origins
+        if origin not in ALLOWED_ORIGINS:
+            return jsonify({"ok": False, "reason": "origin not allowed"}), 403
+    return None
+
 # Protocol params (small for demo)
 REWARD_INITIAL = 50
 HALVING_INTERVAL = 100  # small for demo
-DIFFICULTY_PREFIX = "0000"  # simple leading-zeros target
+POW_LIMIT = zeros_target(4)  # easiest target allowed (hashes starting "0000"), also the genesis target
+# Wanted seconds between blocks (0 keeps the genesis target) and the number
+# of blocks the retarget averages over
+BLOCK_TIME = int(os.environ.get("PMVP_BLOCK_TIME", "10"))
+RETARGET_WINDOW = int(os.environ.get("PMVP_RETARGET_WINDOW", "30"))
+GENESIS_TIMESTAMP = 1700000000  # fixed, so every node starts from the same genesis block
+# Seconds a block timestamp may be ahead of our clock
+MAX_FUTURE_BLOCK_TIME = int(os.environ.get("PMVP_MAX_FUTURE_BLOCK_TIME", "7200"))
+# Side-branch blocks are kept only within this many tip blocks' worth of
+# work below the tip (deeper forks are not followed), and at most this many
+SIDE_BRANCH_MARGIN = int(os.environ.get("PMVP_SIDE_BRANCH_MARGIN", "144"))
+MAX_SIDE_BRANCH_BLOCKS = int(os.environ.get("PMVP_MAX_SIDE_BRANCH_BLOCKS", "1000"))
+MAX_BLOCK_TXS = 100  # non-coinbase txs per block
+MAX_BLOCK_BYTES = 1_000_000  # serialized size budget of those txs
+# Page size limits of the chain retrieval endpoints
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_HEADERS_PER_REQUEST = 2000
+# Longest /events long-poll wait and SSE keepalive interval, seconds
+EVENTS_LONG_POLL = 30.0
+EVENTS_KEEPALIVE = 15.0
 
-# In-memory state (persists only while process runs)
+# Node state. CHAIN is an in-memory list until open_chain() swaps in the
+# on-disk BlockStore (same list-like interface, blocks read lazily).
 CHAIN: List[Dict[str, Any]] = []
-MEMPOOL: List[Dict[str, Any]] = []
+MEMPOOL = Mempool()  # pending txs by txid + spent-outpoint conflict index
 UNSIGNED_MEMPOOL: List[Dict[str, Any]] = []  # unsigned tx proposals from UI
-UTXO: Dict[str, Dict[str, Any]] = {}  # key: txid:index -> {amount, pubkey_hash}
-
-def sha256(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
-
-def address_from_pubkey_hex(pubkey_hex: str) -> str:
-    # Address = first 40 chars of sha256(pubkey_hex)
-    return sha256(bytes.fromhex(pubkey_hex))[:40]
-
-def serialize_tx(tx: Dict[str, Any]) -> bytes:
-    # deterministic JSON serialization
-    return json.dumps(tx, sort_keys=True, separators=(",", ":")).encode()
-
-def txid_of(tx: Dict[str, Any]) -> str:
-    return sha256(serialize_tx(tx))
+UTXO_SET = UtxoSet()  # incremental connect/disconnect; open_chain() may swap the backend
+BLOCK_UNDO: Dict[str, BlockUndo] = {}  # block hash -> undo record for disconnect
+BLOCK_INDEX = BlockIndex()  # every known block with its cumulative work (fork choice)
+# Guards CHAIN/UTXO/MEMPOOL: request threads and the background miner share them
+STATE_LOCK = threading.RLock()
+# Recent block/mempool events for /events (long-poll) and /events/stream (SSE)
+EVENTS = EventLog()
+# Background thread writing the latest UTXO snapshot, if any; while a sync
+# run defers snapshots, whether one fell due
+SNAPSHOT_WRITER: Optional[threading.Thread] = None
+SNAPSHOTS_DEFERRED = 0
+SNAPSHOT_DUE = False
+# Pre-encoded read responses: endpoint -> (etag, body bytes)
+RESPONSE_CACHE: Dict[str, Tuple[str, bytes]] = {}
+# Part of every ETag: versions such as the mempool generation restart from
+# 0 with the process, so an ETag from before a restart must not match
+ETAG_NONCE = os.urandom(8).hex()
 
 def mk_genesis():
     genesis = {
         "header": {
             "prev_hash": "0" * 64,
             "merkle_root": "",
-            "timestamp": int(time.time()),
+            "timestamp": GENESIS_TIMESTAMP,
             "nonce": 0,
-            "difficulty": DIFFICULTY_PREFIX,
+            "bits": bits_from_target(POW_LIMIT),
         },
         "txs": [],
     }
-    genesis_hash = sha256(json.dumps(genesis["header"], sort_keys=True).encode())
+    genesis_hash = header_hash(genesis["header"])
     CHAIN.append({"hash": genesis_hash, "block": genesis})
+    index_chain()
+
+def block_work(header: Dict[str, Any]) -> int:
+    # expected hashes to find the block
+    return target_work(target_from_bits(header["bits"]))
+
+def next_bits(prev: BlockNode) -> int:
+    # compact target required of a block built on `prev`: a moving average
+    # over the last RETARGET_WINDOW blocks, leaving out the genesis block
+    # (its fixed timestamp says nothing about the hashrate)
+    n = min(RETARGET_WINDOW, prev.height - 1)
+    if not BLOCK_TIME or n < 1:
+        return prev.bits
+    window = prev.window(n + 1)
+    targets = [target_from_bits(node.bits) for node in window[1:]]
+    return bits_from_target(next_target(targets, [node.timestamp for node in window], BLOCK_TIME, POW_LIMIT))
+
+def index_chain():
+    # (re)build the block index from the active chain's headers
+    BLOCK_INDEX.clear()
+    headers = CHAIN.headers() if isinstance(CHAIN, BlockStore) else ((e["hash"], e["block"]["header"]) for e in CHAIN)
+    for block_hash, header in headers:
+        if "bits" not in header:
+            raise ValueError("the stored chain has leading-zero difficulty headers from an older node; "
+                             "delete the data directory to start a new chain")
+        BLOCK_INDEX.add(block_hash, header, block_work(header))
+
+def open_chain(datadir: str = DATA_DIR):
+    global CHAIN, UTXO_SET
+    CHAIN = BlockStore(datadir)
+    if UTXO_BACKEND == "sqlite":
+        UTXO_SET.backend.close()
+        UTXO_SET = UtxoSet(SqliteBackend(os.path.join(datadir, "utxo.sqlite")))
+    if len(CHAIN) == 0:
+        mk_genesis()
+    else:
+        index_chain()
+
+def keep_undo(block_hash: str, undo: BlockUndo):
+    # undo data for the tip block. Only the last SIDE_BRANCH_MARGIN + 1 blocks
+    # keep theirs (BLOCK_UNDO is in height order): deeper forks are not
+    # followed, and a deeper reorg falls back to rewind_chain()
+    BLOCK_UNDO[block_hash] = undo
+    while len(BLOCK_UNDO) > SIDE_BRANCH_MARGIN + 1:
+        del BLOCK_UNDO[next(iter(BLOCK_UNDO))]
+
+def replay_utxo(start: int):
+    # connect CHAIN[start:] to the UTXO set, committing as we go so a
+    # persistent backend flushes in batches instead of all at the end
+    for height in range(start, len(CHAIN)):
+        entry = CHAIN[height]
+        keep_undo(entry["hash"], UTXO_SET.connect_block(entry["block"]))
+        UTXO_SET.commit(entry["hash"], height)
+    if len(CHAIN):
+        UTXO_SET.commit(CHAIN[-1]["hash"], len(CHAIN) - 1, force=True)
 
 def rebuild_utxo():
-    global UTXO
-    UTXO = {}
+    # full replay from genesis: startup/recovery path only, blocks mined at
+    # runtime are applied incrementally by connect_block()
+    UTXO_SET.clear()
+    BLOCK_UNDO.clear()
+    replay_utxo(0)
+
+def load_utxo() -> int:
+    # fast startup: resume a persistent UTXO set, or load the newest snapshot
+    # still on our chain, and replay only the blocks after it; returns the
+    # height the set was loaded at (-1 = full replay)
+    best = UTXO_SET.best_block()
+    if best is not None:
+        tip_hash, height = best
+        if height < len(CHAIN) and CHAIN[height]["hash"] == tip_hash:
+            BLOCK_UNDO.clear()  # undo data before the stored tip is not kept
+            replay_utxo(height + 1)
+            return height
+    if isinstance(CHAIN, BlockStore) and not UTXO_SET.persistent:
+        for height, path in list_snapshots(CHAIN.datadir):
+            if height >= len(CHAIN):
+                continue
+            snap = read_snapshot(path)
+            if snap is None or snap[0]["tip_hash"] != CHAIN.hash_at(height):
+                continue
+            UTXO_SET.clear()
+            UTXO_SET.update(coins_from_json(snap[1]))
+            BLOCK_UNDO.clear()  # undo data before the snapshot is not kept
+            replay_utxo(height + 1)
+            return height
+    rebuild_utxo()
+    return -1
+
+def maybe_snapshot():
+    # caller holds STATE_LOCK
+    global SNAPSHOT_DUE
+    height = current_height()
+    # a persistent UTXO backend is its own snapshot
+    if isinstance(CHAIN, BlockStore) and SNAPSHOT_INTERVAL and height % SNAPSHOT_INTERVAL == 0 and not UTXO_SET.persistent:
+        if SNAPSHOTS_DEFERRED:
+            SNAPSHOT_DUE = True
+            return
+        start_snapshot(height)
+
+def start_snapshot(height: int):
+    # only the packed set is copied here (under STATE_LOCK), encoding and
+    # writing run on a background thread so the API and miner go on
+    global SNAPSHOT_WRITER
+    if SNAPSHOT_WRITER is not None and SNAPSHOT_WRITER.is_alive():
+        return  # still writing the previous one: skip this one
+    SNAPSHOT_WRITER = threading.Thread(target=snapshot_worker, daemon=True,
+                                       args=(CHAIN.datadir, UTXO_SET.packed(), CHAIN.hash_at(height), height))
+    SNAPSHOT_WRITER.start()
+
+@contextmanager
+def deferred_snapshots():
+    # a chain sync run: no snapshot every SNAPSHOT_INTERVAL blocks while
+    # catching up, one at the final tip if any fell due
+    global SNAPSHOTS_DEFERRED, SNAPSHOT_DUE
+    with STATE_LOCK:
+        SNAPSHOTS_DEFERRED += 1
+    try:
+        yield
+    finally:
+        with STATE_LOCK:
+            SNAPSHOTS_DEFERRED -= 1
+            if not SNAPSHOTS_DEFERRED and SNAPSHOT_DUE:
+                SNAPSHOT_DUE = False
+                start_snapshot(current_height())
+
+def snapshot_worker(datadir: str, coins: List[Tuple[bytes, Any]], tip_hash: str, height: int):
+    try:
+        write_snapshot(datadir, packed_to_json(coins), tip_hash, height)
+    except OSError as exc:
+        print("Snapshot at height %d failed: %s" % (height, exc))
+
+def utxo_consistent() -> bool:
+    # verification path: replay the chain into a scratch set and compare
+    fresh = UtxoSet()
     for entry in CHAIN:
-        block = entry["block"]
-        for tx in block["txs"]:
-            tid = txid_of(tx)
-            # consume inputs
-            for inp in tx.get("inputs", []):
-                key = f"{inp['txid']}:{inp['index']}"
-                if key in UTXO:
-                    del UTXO[key]
-            # add outputs
-            for i, out in enumerate(tx.get("outputs", [])):
-                key = f"{tid}:{i}"
-                UTXO[key] = {"amount": out["amount"], "pubkey_hash": out["pubkey_hash"]}
-
-def verify_sig(pubkey_hex: str, sig_hex: str, message: bytes) -> bool:
+        fresh.connect_block(entry["block"])
+    return fresh.backend.coins == dict(UTXO_SET.backend.items())
+
+def connect_block(entry: Dict[str, Any], txids: Optional[List[str]] = None, transactions: Optional[List[Transaction]] = None):
+    # append a valid block extending the tip, evict its txs from the mempool
+    # and announce it to peers; caller holds STATE_LOCK. The block is stored
+    # last, so a failure before that leaves the chain and the set at the old tip
+    height = len(CHAIN)
+    undo = UTXO_SET.connect_block(entry["block"], txids)
     try:
-        vk = VerifyingKey.from_string(bytes.fromhex(pubkey_hex), curve=SECP256k1)
-        return vk.verify(bytes.fromhex(sig_hex), message)
-    except Exception:
-        return False
+        UTXO_SET.commit(entry["hash"], height)
+        CHAIN.append(entry)
+    except BaseException:
+        UTXO_SET.disconnect_block(undo)
+        UTXO_SET.commit(CHAIN[-1]["hash"], height - 1, force=True)
+        raise
+    keep_undo(entry["hash"], undo)
+    BLOCK_INDEX.release(BLOCK_INDEX.add(entry["hash"], entry["block"]["header"], block_work(entry["block"]["header"])))
+    maybe_snapshot()
+    EVENTS.publish("block-connected", {"height": current_height(), "hash": entry["hash"], "block": entry["block"]})
+    for txid in MEMPOOL.remove_for_block((transactions or entry["block"]["txs"])[1:]):
+        EVENTS.publish("tx-removed", {"txid": txid, "block_hash": entry["hash"]})
+    PEERS.announce("block", entry["hash"])
+
+def block_height(block_hash: str) -> Optional[int]:
+    if isinstance(CHAIN, BlockStore):
+        return CHAIN.height_of(block_hash)
+    return next((h for h, e in enumerate(CHAIN) if e["hash"] == block_hash), None)
+
+def disconnect_tip() -> Dict[str, Any]:
+    # the block stays in the index as a side branch (it may be reconnected)
+    entry = CHAIN.pop()
+    UTXO_SET.disconnect_block(BLOCK_UNDO.pop(entry["hash"]))
+    UTXO_SET.commit(CHAIN[-1]["hash"], len(CHAIN) - 1)
+    BLOCK_INDEX.hold(BLOCK_INDEX.get(entry["hash"]), entry)
+    EVENTS.publish("block-disconnected", {"height": len(CHAIN), "hash": entry["hash"]})
+    return entry
+
+def rewind_chain(height: int) -> List[Dict[str, Any]]:
+    # disconnect down to `height` without undo data (it is not kept for
+    # blocks before a snapshot or a resumed UTXO set, or more than
+    # SIDE_BRANCH_MARGIN blocks below the tip): pop the blocks and
+    # replay the UTXO set from genesis. Startup/recovery cost; returns the
+    # popped entries, tip first
+    popped = []
+    while len(CHAIN) > height + 1:
+        entry = CHAIN.pop()
+        BLOCK_UNDO.pop(entry["hash"], None)
+        BLOCK_INDEX.hold(BLOCK_INDEX.get(entry["hash"]), entry)
+        EVENTS.publish("block-disconnected", {"height": len(CHAIN), "hash": entry["hash"]})
+        popped.append(entry)
+    rebuild_utxo()
+    return popped
+
+def add_to_mempool(tx: Transaction) -> str:
+    # caller has verified tx; raises MempoolError
+    txid = MEMPOOL.add(tx, fee=tx_fee(tx, MEMPOOL))
+    EVENTS.publish("tx-added", {"txid": txid, "tx": tx.to_json()})
+    PEERS.announce("tx", txid)
+    return txid
+
+def lookup_coin(txid: str, index: int, mempool: Optional[Mempool] = None) -> Optional[TxOut]:
+    # confirmed coin, or (with a mempool) an output of a pending tx
+    coin = UTXO_SET.get(OutPoint(txid, index))
+    if coin is None and mempool is not None:
+        coin = mempool.output(txid, index)
+    return coin
 
-def verify_tx(tx: Dict[str, Any]):
-    # simple checks
-    inputs = tx.get("inputs", [])
-    outputs = tx.get("outputs", [])
-    total_in = 0
-    for inp in inputs:
-        key = f"{inp['txid']}:{inp['index']}"
-        if key not in UTXO:
-            return False, f"input {key} not found"
-        ut = UTXO[key]
-        total_in += ut["amount"]
-        # verify signature covers serialized tx body (without sigs)
-        # For simplicity, participants sign the full tx with empty sigs
-        tx_copy = dict(tx)
-        tx_copy["inputs"] = [dict(i) for i in tx_copy["inputs"]]
-        # blank the sig in the matching input for verification
-        for ii in tx_copy["inputs"]:
-            ii["sig"] = ""
-        message = serialize_tx(tx_copy)
-        if not verify_sig(inp["pubkey"], inp.get("sig", ""), message):
-            return False, "bad signature"
-        # check pubkey hash matches referenced UTXO
-        if address_from_pubkey_hex(inp["pubkey"]) != ut["pubkey_hash"]:
-            return False, "pubkey hash mismatch"
-    total_out = sum(out["amount"] for out in outputs)
-    if total_out > total_in:
-        return False, "outputs exceed inputs"
-    return True, "ok"
-
-def create_coinbase(miner_pubkey_hash: str, amount: int) -> Dict[str, Any]:
-    # coinbase tx has no inputs; single output to miner
-    return {"inputs": [], "outputs": [{"amount": amount, "pubkey_hash": miner_pubkey_hash}], "timestamp": int(time.time())}
-
-def merkle_root(txs: List[Dict[str, Any]]) -> str:
-    if not txs:
-        return ""
-    hs = [txid_of(tx) for tx in txs]
-    while len(hs) > 1:
-        if len(hs) % 2 == 1:
-            hs.append(hs[-1])
-        new = []
-        for i in range(0, len(hs), 2):
-            new.append(sha256((hs[i] + hs[i + 1]).encode()))
-        hs = new
-    return hs[0]
+def tx_fee(tx: Any, mempool: Optional[Mempool] = None) -> int:
+    tx = as_transaction(tx)
+    total_in = sum(lookup_coin(i.txid, i.index, mempool).amount for i in tx.inputs)
+    return total_in - sum(out.amount for out in tx.outputs)
+
+def verify_txs(txs: List[Any], mempool: Optional[Mempool] = None) -> List[Tuple[bool, str]]:
+    # verify many txs (dicts or Transactions); all their signatures go through
+    # one verify_batch call. With `mempool`, inputs may also spend outputs of
+    # pending txs.
+    results: List[Optional[Tuple[bool, str]]] = [None] * len(txs)
+    items = []  # (pubkey, sig, sighash) for every input of every candidate
+    spans = []  # per tx: (first item, input count) or None if already failed
+    objs: List[Optional[Transaction]] = []
+    for n, tx in enumerate(txs):
+        try:
+            tx = as_transaction(tx)
+        except ValueError as exc:
+            results[n] = (False, str(exc))
+            spans.append(None)
+            objs.append(None)
+            continue
+        objs.append(tx)
+        if tx.is_coinbase():
+            # only a block's first tx may have no inputs (see check_block)
+            results[n] = (False, "tx has no inputs")
+            spans.append(None)
+            continue
+        if not amounts_ok(tx):
+            results[n] = (False, "bad output amount")
+            spans.append(None)
+            continue
+        spent = set()
+        for inp in tx.inputs:
+            key = inp.prevout
+            if lookup_coin(inp.txid, inp.index, mempool) is None:
+                results[n] = (False, f"input {key} not found")
+                break
+            if key in spent:
+                results[n] = (False, f"input {key} spent twice")
+                break
+            spent.add(key)
+        if results[n] is not None:
+            spans.append(None)
+            continue
+        # signatures cover the serialized tx body with all sigs blanked; the
+        # digest is identical for every input and cached on the Transaction
+        digest = tx.sighash
+        spans.append((len(items), len(tx.inputs)))
+        items.extend((inp.pubkey, inp.sig, digest) for inp in tx.inputs)
+    sig_ok = verify_batch(items)
+    for n, tx in enumerate(objs):
+        if spans[n] is None:
+            continue
+        start, count = spans[n]
+        if not all(sig_ok[start:start + count]):
+            results[n] = (False, "bad signature")
+            continue
+        total_in = 0
+        for inp in tx.inputs:
+            ut = lookup_coin(inp.txid, inp.index, mempool)
+            total_in += ut.amount
+            # check pubkey hash matches referenced UTXO
+            if address_from_pubkey_hex(inp.pubkey) != ut.pubkey_hash:
+                results[n] = (False, "pubkey hash mismatch")
+                break
+        if results[n] is not None:
+            continue
+        total_out = sum(out.amount for out in tx.outputs)
+        if total_out > total_in:
+            results[n] = (False, "outputs exceed inputs")
+            continue
+        results[n] = (True, "ok")
+    return results
+
+def verify_tx(tx: Any, mempool: Optional[Mempool] = None):
+    return verify_txs([tx], mempool)[0]
+
+def create_coinbase(miner_pubkey_hash: str, amount: int, height: int) -> Dict[str, Any]:
+    # coinbase tx has no inputs; single output to miner. The block height
+    # makes its txid unique (same miner, same second would otherwise collide)
+    return {"inputs": [], "outputs": [{"amount": amount, "pubkey_hash": miner_pubkey_hash}], "timestamp": int(time.time()),
+            "height": height}
 
 def current_height() -> int:
     return len(CHAIN) - 1
@@ -163,39 +443,380 @@ def block_reward(height: int) -> int:
     halvings = height // HALVING_INTERVAL
     return max(1, REWARD_INITIAL >> halvings)
 
-def mine_block(miner_address: str, max_txs: int = 100) -> Dict[str, Any]:
-    # pick pending txs that validate
-    selected = []
-    for tx in MEMPOOL[:]:
-        ok, reason = verify_tx(tx)
-        if ok:
+def template_version():
+    return (CHAIN[-1]["hash"], MEMPOOL.generation)
+
+def build_template(miner_address: str, max_txs: int = MAX_BLOCK_TXS, max_bytes: int = MAX_BLOCK_BYTES) -> Dict[str, Any]:
+    with STATE_LOCK:
+        # pick pending txs by ancestor fee rate (parents before children);
+        # they leave MEMPOOL only once the block is connected, so abandoned
+        # templates lose nothing
+        candidates = MEMPOOL.select(max_txs, max_bytes)
+        # re-check the picks (signatures come from the cache); drop any that
+        # fail together with picks spending their outputs
+        txs_in = [MEMPOOL.transaction(txid) for txid in candidates]
+        dropped = set()
+        selected = []
+        fees = 0
+        for txid, tx, (ok, reason) in zip(candidates, txs_in, verify_txs(txs_in, MEMPOOL)):
+            if not ok or any(inp.txid in dropped for inp in tx.inputs):
+                dropped.add(txid)
+                continue
             selected.append(tx)
-            MEMPOOL.remove(tx)
-        if len(selected) >= max_txs:
-            break
-    height = current_height()
-    reward = block_reward(height + 1)
-    coinbase = create_coinbase(miner_address, reward)
-    txs = [coinbase] + selected
-    root = merkle_root(txs)
-    header = {
-        "prev_hash": CHAIN[-1]["hash"],
-        "merkle_root": root,
-        "timestamp": int(time.time()),
-        "nonce": 0,
-        "difficulty": DIFFICULTY_PREFIX,
-    }
-    # simple PoW
+            fees += MEMPOOL.entry(txid).fee
+        height = current_height() + 1
+        reward = block_reward(height)
+        # coinbase claims the block reward plus the collected fees
+        coinbase = Transaction.from_json(create_coinbase(miner_address, reward + fees, height))
+        transactions = [coinbase] + selected
+        txids = [tx.txid for tx in transactions]  # cached on mempool txs
+        root = merkle_root_from_txids(txids)
+        header = {
+            "prev_hash": CHAIN[-1]["hash"],
+            "merkle_root": root,
+            # after the median time past even when blocks come fast
+            "timestamp": max(int(time.time()), BLOCK_INDEX.get(CHAIN[-1]["hash"]).median_time_past() + 1),
+            "nonce": 0,
+            "bits": next_bits(BLOCK_INDEX.get(CHAIN[-1]["hash"])),
+        }
+        return {"header": header, "txs": [tx.to_json() for tx in transactions], "transactions": transactions,
+                "txids": txids, "height": height, "fees": fees, "version": template_version()}
+
+def submit_block(template: Dict[str, Any], stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # connect a solved template; None if the tip moved while it was mined
+    with STATE_LOCK:
+        header = dict(template["header"], nonce=stats["nonce"])
+        if header["prev_hash"] != CHAIN[-1]["hash"]:
+            return None
+        entry = {"hash": stats["hash"], "block": {"header": header, "txs": template["txs"]}}
+        # the structure checks peers run first: never publish a block they reject
+        check_block(entry)
+        connect_block(entry, template["txids"], template["transactions"])
+        return entry
+
+def mine_block(miner_address: str, max_txs: int = MAX_BLOCK_TXS) -> Dict[str, Any]:
+    # synchronous mining (scripts/benchmarks); the API goes through MINER
     while True:
-        header["nonce"] += 1
-        h = sha256(json.dumps(header, sort_keys=True).encode())
-        if h.startswith(DIFFICULTY_PREFIX):
-            break
-    block = {"header": header, "txs": txs}
-    block_hash = sha256(json.dumps(header, sort_keys=True).encode())
-    CHAIN.append({"hash": block_hash, "block": block})
-    rebuild_utxo()
-    return {"hash": block_hash, "block": block}
+        template = build_template(miner_address, max_txs)
+        # PoW, nonce space split across MINER_WORKERS processes
+        stats = mine_header(template["header"], target_from_bits(template["header"]["bits"]), MINER_WORKERS)
+        entry = submit_block(template, stats)
+        if entry is not None:
+            return entry
+
+MINER = MiningScheduler(build_template, submit_block, template_version, MINER_WORKERS)
+
+class BlockError(Exception):
+    pass
+
+class OrphanBlockError(BlockError):
+    pass
+
+class BlockOutputs:
+    # outputs created by the txs of a block under validation, looked up by
+    # lookup_coin() in place of a mempool
+    def __init__(self):
+        self._outputs: Dict[OutPoint, TxOut] = {}
+
+    def add(self, tx: Transaction):
+        for i, out in enumerate(tx.outputs):
+            self._outputs[OutPoint(tx.txid, i)] = out
+
+    def output(self, txid: str, index: int) -> Optional[TxOut]:
+        return self._outputs.get(OutPoint(txid, index))
+
+def amounts_ok(tx: Transaction) -> bool:
+    # output amounts are non-negative integers (a bool is not an amount)
+    return all(type(out.amount) is int and out.amount >= 0 for out in tx.outputs)
+
+# Block validation runs in stages, cheapest first, so an invalid block costs
+# as little as possible: header and PoW, parent and timestamp, structure and
+# merkle root, input signatures, and last the sequential UTXO checks.
+
+def check_header(block_hash: str, header: Dict[str, Any]):
+    # stage 1, context-free: hash and proof of work (the hash as an integer
+    # is at most the header's target); raises BlockError
+    try:
+        if header_hash(header) != block_hash:
+            raise BlockError("block hash mismatch")
+        target = target_from_bits(header["bits"])
+    except (KeyError, TypeError, AttributeError, ValueError):
+        raise BlockError("malformed header")
+    if target > POW_LIMIT:
+        raise BlockError("target above the proof-of-work limit")
+    if not hash_meets_target(block_hash, target):
+        raise BlockError("insufficient proof of work")
+
+def check_header_context(header: Dict[str, Any], prev: BlockNode):
+    # stage 1, against the parent: the timestamp must be after the median
+    # time past and not too far in the future, and the target the one the
+    # retarget gives; raises BlockError
+    timestamp = header.get("timestamp")
+    if type(timestamp) is not int:
+        raise BlockError("malformed header")
+    if timestamp <= prev.median_time_past():
+        raise BlockError("timestamp not after median time past")
+    if timestamp > time.time() + MAX_FUTURE_BLOCK_TIME:
+        raise BlockError("timestamp too far in the future")
+    if header.get("bits") != next_bits(prev):
+        raise BlockError("wrong difficulty target")
+
+def check_block(entry: Dict[str, Any]) -> Block:
+    # stage 2: size limits, structure (one coinbase, first; valid amounts)
+    # and merkle root. With the header checks, enough to store a side-branch
+    # block
+    try:
+        if len(entry["block"]["txs"]) > MAX_BLOCK_TXS + 1:
+            raise BlockError("too many txs")
+        block = Block.from_entry(entry)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise BlockError("malformed block")
+    if sum(tx.size for tx in block.txs[1:]) > MAX_BLOCK_BYTES:
+        raise BlockError("block too large")
+    if not block.txs or not block.txs[0].is_coinbase():
+        raise BlockError("first tx must be the coinbase")
+    if any(tx.is_coinbase() for tx in block.txs[1:]):
+        raise BlockError("more than one coinbase")
+    if not all(amounts_ok(tx) for tx in block.txs):
+        raise BlockError("bad output amount")
+    if block.compute_merkle_root() != entry["block"]["header"]["merkle_root"]:
+        raise BlockError("bad merkle root")
+    return block
+
+def check_block_signatures(block: Block):
+    # stage 3: every input signature in one verify_batch call (spread over
+    # the verifier processes); needs no chain state
+    items = [(inp.pubkey, inp.sig, tx.sighash) for tx in block.txs[1:] for inp in tx.inputs]
+    if not all(verify_batch(items)):
+        raise BlockError("bad signature")
+
+def check_block_inputs(block: Block, height: int) -> int:
+    # stage 4, sequential against the UTXO set: inputs spend confirmed coins
+    # or outputs of earlier txs in the block, once, with the coin's pubkey,
+    # and cover the outputs; the coinbase carries the block height and claims
+    # at most the reward plus fees; no tx may share its txid with a tx that
+    # still has unspent outputs (it would overwrite them). Returns the fees.
+    # Caller holds STATE_LOCK
+    if block.txs[0].to_json().get("height") != height:
+        raise BlockError("coinbase height mismatch")
+    created = BlockOutputs()
+    spent = set()
+    fees = 0
+    for tx in block.txs:
+        if any(lookup_coin(tx.txid, i, created) is not None for i in range(len(tx.outputs))):
+            raise BlockError("tx %s overwrites unspent outputs" % tx.txid)
+        if tx.is_coinbase():
+            created.add(tx)
+            continue
+        total_in = 0
+        for inp in tx.inputs:
+            key = inp.prevout
+            coin = lookup_coin(inp.txid, inp.index, created) if key not in spent else None
+            if coin is None:
+                raise BlockError("input %s missing or spent" % (key,))
+            if address_from_pubkey_hex(inp.pubkey) != coin.pubkey_hash:
+                raise BlockError("pubkey hash mismatch")
+            spent.add(key)
+            total_in += coin.amount
+        total_out = sum(out.amount for out in tx.outputs)
+        if total_out > total_in:
+            raise BlockError("outputs exceed inputs")
+        fees += total_in - total_out
+        created.add(tx)
+    if sum(out.amount for out in block.txs[0].outputs) > block_reward(height) + fees:
+        raise BlockError("coinbase exceeds reward plus fees")
+    return fees
+
+def validate_block(entry: Dict[str, Any]) -> Block:
+    # all stages for a block that should extend our tip; raises BlockError.
+    # Caller holds STATE_LOCK.
+    try:
+        header = entry["block"]["header"]
+        check_header(entry["hash"], header)
+    except (KeyError, TypeError):
+        raise BlockError("malformed block")
+    if header["prev_hash"] != CHAIN[-1]["hash"]:
+        raise BlockError("block does not extend the tip")
+    check_header_context(header, BLOCK_INDEX.get(CHAIN[-1]["hash"]))
+    block = check_block(entry)
+    check_block_signatures(block)
+    check_block_inputs(block, current_height() + 1)
+    return block
+
+def accept_block(entry: Dict[str, Any]) -> bool:
+    # take a block received from a peer: connect it if it extends our tip,
+    # otherwise keep it on its side branch and reorganize if that branch now
+    # has the most work. False if we already have it; raises BlockError if it
+    # is invalid (OrphanBlockError if its parent is unknown). Only the parent
+    # lookup and the UTXO stage hold STATE_LOCK
+    try:
+        entry = {"hash": entry["hash"], "block": entry["block"]}
+        header = entry["block"]["header"]
+        if entry["hash"] in BLOCK_INDEX:
+            return False
+    except (KeyError, TypeError):
+        raise BlockError("malformed block")
+    check_header(entry["hash"], header)
+    with STATE_LOCK:
+        prev = BLOCK_INDEX.get(header["prev_hash"])
+        if prev is None:
+            raise OrphanBlockError("unknown parent block %s" % header["prev_hash"])
+        if prev.invalid:
+            raise BlockError("block builds on an invalid block")
+        check_header_context(header, prev)
+        if prev.hash != CHAIN[-1]["hash"] and prev.chain_work + block_work(header) < side_branch_min_work():
+            raise BlockError("side branch too far behind the tip")
+    block = check_block(entry)
+    check_block_signatures(block)
+    with STATE_LOCK:
+        if entry["hash"] in BLOCK_INDEX:
+            return False
+        if prev.hash == CHAIN[-1]["hash"]:
+            check_block_inputs(block, current_height() + 1)
+            connect_block(entry, [tx.txid for tx in block.txs], block.txs)
+            return True
+        BLOCK_INDEX.add(entry["hash"], header, block_work(header), entry)
+        activate_best_chain()
+        BLOCK_INDEX.prune(side_branch_min_work(), MAX_SIDE_BRANCH_BLOCKS)
+        return True
+
+def side_branch_min_work() -> int:
+    # least chain work a side-branch block must have to be kept: the tip's
+    # minus SIDE_BRANCH_MARGIN blocks at the tip's target. Caller holds STATE_LOCK
+    tip = BLOCK_INDEX.get(CHAIN[-1]["hash"])
+    return tip.chain_work - SIDE_BRANCH_MARGIN * target_work(target_from_bits(tip.bits))
+
+def activate_best_chain():
+    # reorganize onto the most-work valid branch if it has more work than
+    # the active chain; caller holds STATE_LOCK
+    while True:
+        tip = BLOCK_INDEX.get(CHAIN[-1]["hash"])
+        best = BLOCK_INDEX.best
+        if best is None or best.chain_work <= tip.chain_work:
+            return
+        try:
+            reorganize(best)
+            return
+        except BlockError:
+            continue  # the bad block is marked invalid: go for the next best
+
+def reorganize(target: BlockNode) -> Dict[str, int]:
+    # switch the active chain to end at `target`: disconnect back to the fork
+    # point with the undo data, then validate and connect the new branch.
+    # Txs of the disconnected blocks go back to the mempool, which is rebuilt
+    # against the new chain. If a block of the branch is invalid it is marked
+    # and BlockError raised, leaving the chain at the last good block (the
+    # caller picks the next best tip). Caller holds STATE_LOCK
+    tip = BLOCK_INDEX.get(CHAIN[-1]["hash"])
+    fork = BLOCK_INDEX.fork_point(tip, target)
+    old = BLOCK_INDEX.branch(fork, tip)
+    pending = [MEMPOOL.transaction(txid) for txid in MEMPOOL.txids()]
+    MEMPOOL.clear()
+    if all(node.hash in BLOCK_UNDO for node in old):
+        disconnected = [disconnect_tip() for _ in old]
+    else:
+        disconnected = rewind_chain(fork.height)
+    # the disconnected txs are older than the pending ones: parents first
+    restored = [tx for entry in reversed(disconnected) for tx in Block.from_entry(entry).txs[1:]]
+    connected = 0
+    try:
+        for node in BLOCK_INDEX.branch(fork, target):
+            try:
+                block = validate_block(node.entry)
+            except BlockError:
+                BLOCK_INDEX.invalidate(node)
+                raise
+            connect_block(node.entry, [tx.txid for tx in block.txs], block.txs)
+            connected += 1
+    finally:
+        readmitted = restore_mempool(restored, pending)
+    return {"fork_height": fork.height, "disconnected": len(disconnected), "connected": connected, "readmitted": readmitted}
+
+def restore_mempool(restored: List[Transaction], pending: List[Transaction]) -> int:
+    # after a reorg: re-admit txs of disconnected blocks and the txs that were
+    # pending, dropping those now confirmed, conflicting or invalid; returns
+    # how many of `restored` made it back
+    readmitted = 0
+    for tx in restored:
+        if verify_tx(tx, MEMPOOL)[0]:
+            try:
+                add_to_mempool(tx)
+                readmitted += 1
+            except MempoolError:
+                pass
+    for tx in pending:
+        # already announced and published: re-add quietly
+        if verify_tx(tx, MEMPOOL)[0]:
+            try:
+                MEMPOOL.add(tx, fee=tx_fee(tx, MEMPOOL))
+                continue
+            except MempoolError:
+                pass
+        EVENTS.publish("tx-removed", {"txid": tx.txid, "reason": "reorg"})
+    return readmitted
+
+def chain_tip() -> Tuple[int, str, int]:
+    with STATE_LOCK:
+        return current_height(), CHAIN[-1]["hash"], BLOCK_INDEX.get(CHAIN[-1]["hash"]).chain_work
+
+def has_block(block_hash: str) -> bool:
+    # in the block index: on the active chain or a side branch
+    return block_hash in BLOCK_INDEX
+
+def chain_batch():
+    # group block store writes of a sync run (one fsync per run)
+    return CHAIN.batch() if isinstance(CHAIN, BlockStore) else nullcontext()
+
+def sync_with_peers(first: Optional[str] = None) -> int:
+    # headers-first catch-up from our peers (and `first`, which may not be
+    # one of them yet); returns blocks connected
+    urls = [p["url"] for p in PEERS.peers()]
+    if first is not None:
+        urls = [first] + [u for u in urls if u != first]
+    try:
+        return SYNC.sync(urls)
+    except (SyncError, BlockError, PeerError):
+        return 0
+
+def has_inventory(kind: str, h: str) -> bool:
+    with STATE_LOCK:
+        if kind == "block":
+            return h in BLOCK_INDEX
+        return h in MEMPOOL
+
+def receive_from_peer(peer: str, data: Dict[str, Any]):
+    # getdata reply from a peer (runs on the peer fetch thread)
+    for entry in data.get("blocks", []):
+        with STATE_LOCK:
+            orphan = entry["hash"] not in BLOCK_INDEX and entry["block"]["header"]["prev_hash"] not in BLOCK_INDEX
+        if orphan:
+            # parent unknown: we are behind this peer or it is on another branch
+            sync_with_peers(peer)
+            continue
+        try:
+            accept_block(entry)
+        except BlockError:
+            pass
+    txs = data.get("txs", [])
+    with STATE_LOCK:
+        retry = []
+        for tx, (ok, _reason) in zip(txs, verify_txs(txs, MEMPOOL)):
+            if not ok:
+                retry.append(tx)  # may spend an output of a tx later in the batch
+                continue
+            try:
+                add_to_mempool(as_transaction(tx))
+            except MempoolError:
+                pass
+        for tx in retry:
+            if verify_tx(tx, MEMPOOL)[0]:
+                try:
+                    add_to_mempool(as_transaction(tx))
+                except MempoolError:
+                    pass
+
+PEERS = PeerManager(NODE_URL, has_inventory, receive_from_peer, sync_with_peers, api_key=API_KEY)
+SYNC = ChainSync(PEERS, chain_tip, has_block, check_header, accept_block, chain_batch, deferred_snapshots)
 
 @app.route("/new_wallet", methods=["GET"]) 
 def new_wallet():
@@ -208,17 +829,82 @@ def new_wallet():
 
 @app.route("/chain", methods=["GET"]) 
 def get_chain():
-    return jsonify({"chain": CHAIN})
+    # without arguments: the whole chain (old behaviour). With ?cursor= and/or
+    # ?limit= one page of blocks; "next_cursor" is None once the tip is reached
+    if "cursor" not in request.args and "limit" not in request.args:
+        return cached_response("chain", lambda: (CHAIN[-1]["hash"], len(CHAIN)), lambda: {"chain": CHAIN[:]})
+    cursor = request.args.get("cursor", 0, type=int)
+    limit = max(1, min(request.args.get("limit", MAX_BLOCKS_PER_REQUEST, type=int), MAX_BLOCKS_PER_REQUEST))
+    with STATE_LOCK:
+        start = max(0, cursor)
+        end = min(start + limit, len(CHAIN))
+        chain = CHAIN[start:end]
+        height = current_height()
+    return jsonify({"chain": chain, "next_cursor": end if end <= height else None, "height": height})
+
+@app.route("/tip", methods=["GET"])
+def get_tip():
+    with STATE_LOCK:
+        entry = CHAIN[-1]
+        height = current_height()
+        work = BLOCK_INDEX.get(entry["hash"]).chain_work
+    return jsonify({"height": height, "hash": entry["hash"], "header": entry["block"]["header"], "chain_work": "%x" % work})
+
+@app.route("/blocks", methods=["GET"])
+def get_blocks():
+    # ?from=&to= inclusive heights, at most MAX_BLOCKS_PER_REQUEST blocks
+    with STATE_LOCK:
+        height = current_height()
+        start = max(0, request.args.get("from", 0, type=int))
+        end = min(request.args.get("to", height, type=int), height, start + MAX_BLOCKS_PER_REQUEST - 1)
+        entries = CHAIN[start:end + 1]
+    if wants_binary():
+        return binary_response(encode_entries(entries), {"X-From": start, "X-To": end, "X-Height": height})
+    blocks = [dict(e, height=h) for h, e in zip(range(start, end + 1), entries)]
+    return jsonify({"blocks": blocks, "from": start, "to": end, "height": height})
+
+@app.route("/block/<block_hash>", methods=["GET"])
+def get_block(block_hash):
+    with STATE_LOCK:
+        height = block_height(block_hash)
+        entry = CHAIN[height] if height is not None else None
+    if entry is None:
+        return jsonify({"ok": False, "reason": "unknown block"}), 404
+    if wants_binary():
+        return binary_response(encode_entry(entry), {"X-Height": height})
+    return jsonify(dict(entry, height=height))
+
+@app.route("/block/height/<int:height>", methods=["GET"])
+def get_block_at(height):
+    with STATE_LOCK:
+        entry = CHAIN[height] if height < len(CHAIN) else None
+    if entry is None:
+        return jsonify({"ok": False, "reason": "no block at height"}), 404
+    if wants_binary():
+        return binary_response(encode_entry(entry), {"X-Height": height})
+    return jsonify(dict(entry, height=height))
+
+@app.route("/headers", methods=["GET"])
+def get_headers():
+    # ?from=&count=, at most MAX_HEADERS_PER_REQUEST headers
+    with STATE_LOCK:
+        start = max(0, request.args.get("from", 0, type=int))
+        count = max(0, min(request.args.get("count", MAX_HEADERS_PER_REQUEST, type=int), MAX_HEADERS_PER_REQUEST))
+        entries = CHAIN[start:start + count]
+        height = current_height()
+    headers = [{"height": start + i, "hash": e["hash"], "header": e["block"]["header"]} for i, e in enumerate(entries)]
+    return jsonify({"headers": headers, "height": height})
 
 
 @app.route("/mempool", methods=["GET"]) 
 def get_mempool():
-    return jsonify({"mempool": MEMPOOL})
+    return cached_response("mempool", lambda: MEMPOOL.generation, lambda: {"mempool": list(MEMPOOL)})
 
 
 @app.route("/unsigned", methods=["GET"])
 def get_unsigned():
-    return jsonify({"unsigned": UNSIGNED_MEMPOOL})
+    # the proposal list is append-only, so its length is its version
+    return cached_response("unsigned", lambda: len(UNSIGNED_MEMPOOL), lambda: {"unsigned": UNSIGNED_MEMPOOL[:]})
 
 
 @app.route("/unsigned", methods=["POST"])
@@ -230,56 +916,274 @@ def post_unsigned():
     # add timestamp if missing
     if "timestamp" not in data:
         data["timestamp"] = int(time.time())
-    # Authorization: require either valid API key header (if API_KEY configured) or request Origin in ALLOWED_ORIGINS
-    origin = request.headers.get('Origin')
-    key = request.headers.get('X-API-Key')
-    if API_KEY:
-        if not key or key != API_KEY:
-            return jsonify({"ok": False, "reason": "missing or invalid API key"}), 403
-    else:
-        # no API key configured: allow only from allowed origins
-        if origin not in ALLOWED_ORIGINS:
-            return jsonify({"ok": False, "reason": "origin not allowed"}), 403
+    denied = check_authorized()
+    if denied is not None:
+        return denied
 
-    UNSIGNED_MEMPOOL.append(data)
-    return jsonify({"ok": True, "index": len(UNSIGNED_MEMPOOL)-1})
+    with STATE_LOCK:
+        UNSIGNED_MEMPOOL.append(data)
+        index = len(UNSIGNED_MEMPOOL) - 1
+    EVENTS.publish("unsigned-added", {"index": index, "tx": data})
+    return jsonify({"ok": True, "index": index})
 
 @app.route("/tx", methods=["POST"]) 
 def submit_tx():
-    tx = request.get_json()
-    ok, reason = verify_tx(tx)
-    if not ok:
-        return jsonify({"ok": False, "reason": reason}), 400
-    MEMPOOL.append(tx)
-    return jsonify({"ok": True, "txid": txid_of(tx)})
+    if request.mimetype == BINARY_MIMETYPE:
+        try:
+            tx = decode_tx(request.get_data())
+        except CodecError as exc:
+            return jsonify({"ok": False, "reason": "bad binary tx: %s" % exc}), 400
+    else:
+        tx = request.get_json()
+    with STATE_LOCK:
+        ok, reason = verify_tx(tx, MEMPOOL)
+        if not ok:
+            return jsonify({"ok": False, "reason": reason}), 400
+        try:
+            txid = add_to_mempool(as_transaction(tx))
+        except MempoolError as exc:
+            return jsonify({"ok": False, "reason": str(exc)}), 400
+    return jsonify({"ok": True, "txid": txid})
+
+@app.route("/txs", methods=["POST"])
+def submit_txs():
+    # batch admission: {"txs": [...]}, signatures verified as one batch
+    data = request.get_json() or {}
+    txs = data.get("txs") if isinstance(data, dict) else None
+    if not isinstance(txs, list):
+        return jsonify({"ok": False, "reason": "txs list required"}), 400
+    results: List[Dict[str, Any]] = [{}] * len(txs)
+    todo = list(range(len(txs)))
+    with STATE_LOCK:
+        # a failed tx spending an output of one admitted in this round (its
+        # parent, anywhere in the batch) gets another round
+        while todo:
+            admitted = set()
+            for n, (ok, reason) in zip(todo, verify_txs([txs[n] for n in todo], MEMPOOL)):
+                if ok:
+                    try:
+                        txid = add_to_mempool(as_transaction(txs[n]))
+                        results[n] = {"ok": True, "txid": txid}
+                        admitted.add(txid)
+                        continue
+                    except MempoolError as exc:
+                        reason = str(exc)
+                results[n] = {"ok": False, "reason": reason}
+            todo = [n for n in range(len(txs)) if not results[n]["ok"] and spends_any(txs[n], admitted)]
+    return jsonify({"ok": all(r["ok"] for r in results), "results": results})
+
+def spends_any(tx: Any, txids: set) -> bool:
+    try:
+        return any(inp.txid in txids for inp in as_transaction(tx).inputs)
+    except ValueError:
+        return False
 
 @app.route("/mine", methods=["POST"]) 
 def mine():
-    data = request.get_json() or {}
-    miner = data.get("miner")
+    # enqueue a background mining job; poll /mine/<job_id> for the result.
+    # {"continuous": true} keeps mining until cancelled, {"wait": true}
+    # blocks until a one-shot job finishes (old synchronous behaviour).
+    data = request.get_json(silent=True) or {}
+    miner = data.get("miner") if isinstance(data, dict) else None
     if not miner:
         return jsonify({"ok": False, "reason": "miner address required"}), 400
-    block = mine_block(miner)
-    return jsonify({"ok": True, "block_hash": block["hash"]})
+    if not is_address(miner):
+        return jsonify({"ok": False, "reason": "invalid miner address"}), 400
+    continuous = bool(data.get("continuous"))
+    job = MINER.submit(miner, continuous=continuous)
+    if data.get("wait") and not continuous:
+        job = MINER.wait(job["job_id"])
+        if job["status"] != "done":
+            return jsonify({"ok": False, "reason": "mining job %s" % job["status"], "job": job}), 500
+        return jsonify({"ok": True, "job_id": job["job_id"], "block_hash": job["result"]["block_hash"], "job": job})
+    return jsonify({"ok": True, "job_id": job["job_id"], "job": job}), 202
+
+@app.route("/mine/<job_id>", methods=["GET"])
+def mine_status(job_id):
+    job = MINER.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "reason": "unknown job"}), 404
+    return jsonify({"ok": True, "job": job})
+
+@app.route("/mine/<job_id>/cancel", methods=["POST"])
+def mine_cancel(job_id):
+    if not MINER.cancel(job_id):
+        return jsonify({"ok": False, "reason": "job not active"}), 404
+    return jsonify({"ok": True, "job": MINER.get(job_id)})
+
+@app.route("/peer", methods=["POST"])
+def add_peer():
+    # {"url": "http://host:port"}; the new peer is asked to add us back.
+    # Authorized like POST /unsigned, except for our configured seeds (their
+    # handshake when they start)
+    data = request.get_json(silent=True) or {}
+    try:
+        url = normalize_url(data.get("url") if isinstance(data, dict) else None)
+        if url not in {u.rstrip("/") for u in BOOTSTRAP_PEERS}:
+            denied = check_authorized()
+            if denied is not None:
+                return denied
+        added = PEERS.add(url)
+    except PeerError as exc:
+        return jsonify({"ok": False, "reason": str(exc)}), 400
+    return jsonify({"ok": True, "added": added, "peers": len(PEERS)})
+
+@app.route("/peers", methods=["GET"])
+def get_peers():
+    return jsonify({"peers": PEERS.peers()})
+
+@app.route("/inv", methods=["POST"])
+def post_inv():
+    # inventory announcement {"from": url, "inv": [{"type", "hash"}]}; the
+    # items we lack are fetched from the sender in the background
+    data = request.get_json(silent=True) or {}
+    try:
+        wanted = PEERS.on_inv(data.get("from"), parse_inv(data.get("inv")))
+    except PeerError as exc:
+        return jsonify({"ok": False, "reason": str(exc)}), 400
+    return jsonify({"ok": True, "wanted": wanted})
+
+@app.route("/getdata", methods=["POST"])
+def post_getdata():
+    # {"inv": [...]} -> the requested blocks (chain entries) and mempool txs we have
+    data = request.get_json(silent=True) or {}
+    try:
+        inv = parse_inv(data.get("inv"))
+    except PeerError as exc:
+        return jsonify({"ok": False, "reason": str(exc)}), 400
+    blocks, txs = [], []
+    with STATE_LOCK:
+        for kind, h in inv:
+            if kind == "block":
+                height = block_height(h)
+                if height is not None:
+                    blocks.append(CHAIN[height])
+                elif h in BLOCK_INDEX and BLOCK_INDEX.get(h).entry is not None:
+                    blocks.append(BLOCK_INDEX.get(h).entry)  # side branch
+            else:
+                tx = MEMPOOL.get(h)
+                if tx is not None:
+                    txs.append(tx)
+    return jsonify({"blocks": blocks, "txs": txs})
 
 @app.route("/balance/<address>", methods=["GET"]) 
 def balance(address):
+    with STATE_LOCK:
+        return jsonify(address_balance(address))
+
+@app.route("/balances", methods=["POST"])
+def balances():
+    # batch lookup: {"addresses": [...], "utxos": false} skips the utxo lists
+    data = request.get_json() or {}
+    addresses = data.get("addresses") if isinstance(data, dict) else None
+    if not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses):
+        return jsonify({"ok": False, "reason": "addresses list of strings required"}), 400
+    with_utxos = data.get("utxos", True)
+    with STATE_LOCK:
+        result = {a: address_balance(a, with_utxos) for a in addresses}
+    return jsonify({"ok": True, "balances": result})
+
+@app.route("/events", methods=["GET"])
+def get_events():
+    # long-poll: ?since=<event id> waits up to ?timeout= seconds for events
+    # after it. "reset" means events were missed (buffer overrun or node
+    # restart) and the client should refetch its state. Without since,
+    # returns the current event id to start from.
+    if "since" not in request.args:
+        return jsonify({"events": [], "last_id": EVENTS.event_id(EVENTS.last_seq), "reset": False})
+    since = EVENTS.parse_id(request.args["since"])
+    timeout = max(0.0, min(request.args.get("timeout", EVENTS_LONG_POLL, type=float), EVENTS_LONG_POLL))
+    events, reset = EVENTS.wait(since, timeout)
+    last = events[-1]["seq"] if events else (EVENTS.last_seq if reset else since)
+    return jsonify({"events": events, "last_id": EVENTS.event_id(last), "reset": reset})
+
+@app.route("/events/stream", methods=["GET"])
+def event_stream():
+    # server-sent events; browsers resume from Last-Event-ID after reconnecting
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("since")
+    since = EVENTS.last_seq if cursor is None else EVENTS.parse_id(cursor)
+
+    def stream(seq):
+        yield "retry: 3000\n\n"
+        while True:
+            events, reset = EVENTS.wait(seq, EVENTS_KEEPALIVE)
+            if reset:
+                seq = events[-1]["seq"] if events else EVENTS.last_seq
+                yield "id: %s\nevent: reset\ndata: {}\n\n" % EVENTS.event_id(seq)
+                continue
+            if not events:
+                yield ": keepalive\n\n"  # lets us notice clients that went away
+            for ev in events:
+                seq = ev["seq"]
+                yield "id: %s\nevent: %s\ndata: %s\n\n" % (ev["id"], ev["type"], json.dumps(ev, separators=(",", ":")))
+
+    return Response(stream(since), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({"caches": cache_stats(), "height": current_height(), "mempool": len(MEMPOOL), "utxo": len(UTXO_SET),
+                    "peers": len(PEERS), "side_branch_blocks": BLOCK_INDEX.held})
+
+def wants_binary() -> bool:
+    # opt-in binary mode: the client must prefer application/octet-stream
+    return request.accept_mimetypes.best_match(["application/json", BINARY_MIMETYPE]) == BINARY_MIMETYPE
+
+def binary_response(body: bytes, headers: Dict[str, Any]) -> Response:
+    resp = Response(body, mimetype=BINARY_MIMETYPE)
+    for name, value in headers.items():
+        resp.headers[name] = str(value)
+    return resp
+
+def cached_response(name: str, version: Callable[[], Any], build: Callable[[], Dict[str, Any]]) -> Response:
+    # Serve a read endpoint from RESPONSE_CACHE. version() identifies the
+    # state the body is built from (tip hash, mempool generation, ...); the
+    # body is encoded once per version, and clients sending a matching
+    # If-None-Match get a 304 without any encoding at all.
+    with STATE_LOCK:
+        etag = sha256(("%s:%s:%r" % (name, ETAG_NONCE, version())).encode())[:32]
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+            resp.set_etag(etag)
+            return resp
+        cached = RESPONSE_CACHE.get(name)
+        data = None if cached and cached[0] == etag else build()
+    if data is None:
+        body = cached[1]
+    else:
+        body = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+        RESPONSE_CACHE[name] = (etag, body)
+    resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"  # always revalidate
+    return resp
+
+def address_balance(address: str, with_utxos: bool = True) -> Dict[str, Any]:
+    # O(outputs of address) through the UTXO set's address index
     bal = 0
     outs = []
-    for k, v in UTXO.items():
-        if v["pubkey_hash"] == address:
-            bal += v["amount"]
-            outs.append({"utxo": k, "amount": v["amount"]})
-    return jsonify({"address": address, "balance": bal, "utxos": outs})
+    for k, v in UTXO_SET.address_coins(address):
+        bal += v.amount
+        if with_utxos:
+            outs.append({"utxo": str(k), "amount": v.amount})
+    result = {"address": address, "balance": bal}
+    if with_utxos:
+        result["utxos"] = outs
+    return result
 
-def run_api(port=5001):
-    app.run(port=port)
+def run_api(port=API_PORT):
+    app.run(port=port, threaded=True)
 
 def main():
-    mk_genesis()
-    rebuild_utxo()
-    print("PMVP reference node (demo) — starting HTTP API on port 5001")
-    run_api(5001)
+    open_chain()
+    utxo_height = load_utxo()
+    print("Loaded %d blocks from %s (UTXO set loaded at height %d, %s backend)" % (len(CHAIN), DATA_DIR, utxo_height, UTXO_BACKEND))
+    for url in BOOTSTRAP_PEERS:
+        try:
+            PEERS.add(url)
+        except PeerError as exc:
+            print("Skipping peer %s: %s" % (url, exc))
+    print("PMVP reference node (demo) — starting HTTP API on port %d" % API_PORT)
+    run_api(API_PORT)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,63 @@
+"""PMVP consensus primitives shared by the reference node and its helper modules.
+
+Hashing and serialization rules live here so that modules such as the UTXO
+engine can compute txids without importing `pmvp_node` (which usually runs
+as `__main__`). `pmvp_node` re-exports everything defined here.
+"""
+
+import json
+import hashlib
+from typing import List, Dict, Any
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def address_from_pubkey_hex(pubkey_hex: str) -> str:
+    # Address = first 40 chars of sha256(pubkey_hex)
+    return sha256(bytes.fromhex(pubkey_hex))[:40]
+
+def is_address(value: Any) -> bool:
+    # an address (output pubkey_hash) is 40 lowercase hex chars
+    if type(value) is not str or len(value) != 40:
+        return False
+    try:
+        return bytes.fromhex(value).hex() == value
+    except ValueError:
+        return False
+
+def serialize_tx(tx: Dict[str, Any]) -> bytes:
+    # deterministic JSON serialization
+    return json.dumps(tx, sort_keys=True, separators=(",", ":")).encode()
+
+def signing_message(tx: Dict[str, Any]) -> bytes:
+    # every input signs the serialized tx with all sigs blanked (the sighash
+    # preimage); it is the same for all inputs, so compute it once per tx
+    tx_copy = dict(tx)
+    tx_copy["inputs"] = [dict(i, sig="") for i in tx.get("inputs", [])]
+    return serialize_tx(tx_copy)
+
+def txid_of(tx: Dict[str, Any]) -> str:
+    return sha256(serialize_tx(tx))
+
+def header_hash(header: Dict[str, Any]) -> str:
+    # block_hash = sha256 of the sorted-key JSON header (default separators)
+    return sha256(json.dumps(header, sort_keys=True).encode())
+
+def outpoint_key(txid: str, index: int) -> str:
+    return f"{txid}:{index}"
+
+def merkle_root(txs: List[Dict[str, Any]]) -> str:
+    return merkle_root_from_txids([txid_of(tx) for tx in txs])
+
+def merkle_root_from_txids(txids: List[str]) -> str:
+    if not txids:
+        return ""
+    hs = list(txids)
+    while len(hs) > 1:
+        if len(hs) % 2 == 1:
+            hs.append(hs[-1])
+        new = []
+        for i in range(0, len(hs), 2):
+            new.append(sha256((hs[i] + hs[i + 1]).encode()))
+        hs = new
+    return hs[0]
@@ -0,0 +1,227 @@
+"""Signature verification helpers for the PMVP reference node.
+
+The same public keys show up again and again (hot wallets, change outputs,
+mempool txs re-verified at block assembly), so parsed `VerifyingKey`
+objects are kept in a bounded LRU cache keyed by the pubkey hex string.
+Once a key has verified PRECOMPUTE_AFTER valid signatures it is re-parsed
+with precomputed multiplication tables, which roughly halves the cost of
+each further verification in pure-Python ecdsa; one-off keys skip that
+setup cost, which is several verifications' worth. The tables take about
+48 KB per key, so precomputed keys live in a smaller LRU of their own
+(PMVP_PRECOMPUTED_KEYS), and only valid signatures count towards them.
+
+Signatures are checked against the message digest (`sighash`): ecdsa's
+default sha1 of the signing message, which is what clients sign with. A
+transaction computes it once and reuses it for every input, so verifying
+an N-input transaction hashes its (N-sized) message once rather than N
+times.
+
+Successful verifications are also remembered in a second LRU keyed by a
+digest of (pubkey, signature, sighash), shared by mempool
+admission, block assembly and block validation, so each valid signature
+goes through ecdsa at most once while it stays cached. Failures are not
+cached: an attacker could otherwise fill the cache with garbage.
+
+`verify_batch()` checks many (pubkey, sig, sighash) triples at once: cached
+items are answered directly and the rest are split into chunks verified by
+a pool of PMVP_VERIFY_WORKERS processes (small batches stay in-process,
+where the pool's overhead would dominate). Pool processes are started with
+forkserver (spawn where it is missing), not fork: the node is threaded, and
+a forked child could inherit a lock some other thread was holding.
+"""
+
+import os
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from ecdsa import SECP256k1, VerifyingKey
+from ecdsa.ellipticcurve import PointJacobi
+
+VK_CACHE_SIZE = int(os.environ.get("PMVP_VK_CACHE_SIZE", "10000"))
+# Keys kept with precomputed tables (about 48 KB each)
+PRECOMPUTED_KEYS_SIZE = int(os.environ.get("PMVP_PRECOMPUTED_KEYS", "256"))
+SIG_CACHE_SIZE = int(os.environ.get("PMVP_SIG_CACHE_SIZE", "100000"))
+# Processes used by verify_batch (0 = one per CPU)
+VERIFY_WORKERS = int(os.environ.get("PMVP_VERIFY_WORKERS", "1"))
+# Uncached items below which verify_batch does not use the pool
+PARALLEL_MIN_BATCH = 64
+# Message hash used for signatures (ecdsa's default, used by SigningKey.sign)
+SIG_HASHFUNC = hashlib.sha1
+# Valid signatures of a cached key after which it is rebuilt with precomputed tables
+PRECOMPUTE_AFTER = 4
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with least-recently-used eviction and hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+VK_CACHE = LRUCache(VK_CACHE_SIZE)  # pubkey hex -> [VerifyingKey, valid signatures]
+PRECOMPUTED_KEYS = LRUCache(PRECOMPUTED_KEYS_SIZE)  # pubkey hex -> VerifyingKey with tables
+SIG_CACHE = LRUCache(SIG_CACHE_SIZE)
+
+
+def _precomputed_key(raw: bytes) -> VerifyingKey:
+    # generator=True makes ecdsa build (and keep) a multiplication table for the point
+    point = PointJacobi.from_bytes(SECP256k1.curve, raw, order=SECP256k1.order, generator=True)
+    return VerifyingKey.from_public_point(point, curve=SECP256k1)
+
+
+def _key_entry(pubkey_hex: str) -> list:
+    # [parsed key, valid signatures]; raises on malformed keys (not cached)
+    entry: Optional[list] = VK_CACHE.get(pubkey_hex)
+    if entry is None:
+        entry = [VerifyingKey.from_string(bytes.fromhex(pubkey_hex), curve=SECP256k1), 0]
+        VK_CACHE.put(pubkey_hex, entry)
+    return entry
+
+
+def get_verifying_key(pubkey_hex: str) -> VerifyingKey:
+    """Parsed VerifyingKey for `pubkey_hex`, precomputed if it has been; raises on malformed keys."""
+    vk = PRECOMPUTED_KEYS.get(pubkey_hex)
+    return vk if vk is not None else _key_entry(pubkey_hex)[0]
+
+
+def _count_valid(pubkey_hex: str, entry: list):
+    entry[1] += 1
+    if entry[1] >= PRECOMPUTE_AFTER:
+        PRECOMPUTED_KEYS.put(pubkey_hex, _precomputed_key(entry[0].to_string()))
+
+
+def sighash(message: bytes) -> bytes:
+    return SIG_HASHFUNC(message).digest()
+
+
+def sig_cache_key(pubkey_hex: str, sig_hex: str, digest: bytes) -> bytes:
+    return hashlib.sha256(b"%s:%s:%s" % (pubkey_hex.encode(), sig_hex.encode(), digest)).digest()
+
+
+def verify_sig_digest(pubkey_hex: str, sig_hex: str, digest: bytes) -> bool:
+    if type(pubkey_hex) is not str or type(sig_hex) is not str:
+        return False  # malformed, not a signature
+    key = sig_cache_key(pubkey_hex, sig_hex, digest)
+    if SIG_CACHE.get(key):
+        return True
+    entry = None
+    try:
+        vk = PRECOMPUTED_KEYS.get(pubkey_hex)
+        if vk is None:
+            entry = _key_entry(pubkey_hex)
+            vk = entry[0]
+        ok = vk.verify_digest(bytes.fromhex(sig_hex), digest, allow_truncate=True)
+    except Exception:
+        return False
+    if ok:
+        SIG_CACHE.put(key, True)
+        if entry is not None:
+            _count_valid(pubkey_hex, entry)
+    return ok
+
+
+def verify_sig(pubkey_hex: str, sig_hex: str, message: bytes) -> bool:
+    return verify_sig_digest(pubkey_hex, sig_hex, sighash(message))
+
+
+SigItem = Tuple[str, str, bytes]  # pubkey hex, sig hex, sighash
+
+MP_CONTEXT = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _verify_chunk(items: List[SigItem]) -> List[bool]:
+    # runs in a pool process (with its own key cache)
+    return [verify_sig_digest(pub, sig, digest) for pub, sig, digest in items]
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown(wait=False)
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=MP_CONTEXT)
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def verify_batch(items: List[SigItem], workers: Optional[int] = None) -> List[bool]:
+    """Verify (pubkey, sig, sighash) triples; returns one bool per item, in order."""
+    workers = VERIFY_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    results: List[Optional[bool]] = [None] * len(items)
+    todo = []
+    for i, (pub, sig, digest) in enumerate(items):
+        if type(pub) is not str or type(sig) is not str:
+            results[i] = False
+        elif SIG_CACHE.get(sig_cache_key(pub, sig, digest)):
+            results[i] = True
+        else:
+            todo.append(i)
+    if workers == 1 or len(todo) < PARALLEL_MIN_BATCH:
+        for i in todo:
+            results[i] = verify_sig_digest(*items[i])
+        return results
+    # a few chunks per worker evens out uneven chunk costs
+    n_chunks = min(len(todo), workers * 4)
+    chunks = [todo[c::n_chunks] for c in range(n_chunks)]
+    futures = [_pool(workers).submit(_verify_chunk, [items[i] for i in chunk]) for chunk in chunks]
+    for chunk, fut in zip(chunks, futures):
+        for i, ok in zip(chunk, fut.result()):
+            results[i] = ok
+            if ok:
+                SIG_CACHE.put(sig_cache_key(*items[i]), True)
+    return results
+
+
+def clear_caches():
+    VK_CACHE.clear()
+    PRECOMPUTED_KEYS.clear()
+    SIG_CACHE.clear()
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {"verifying_keys": VK_CACHE.stats(), "precomputed_keys": PRECOMPUTED_KEYS.stats(),
+            "signatures": SIG_CACHE.stats()}
@@ -5,6 +5,7 @@ Requires the reference node to be running at http://127.0.0.1:5001
 """
 import json
 import sys
+import time
 import urllib.request
 
 BASE = "http://127.0.0.1:5001"
@@ -19,6 +20,19 @@ def http_post(path, data):
     with urllib.request.urlopen(req, timeout=10) as r:
         return json.loads(r.read().decode())
 
+def mine(miner):
+    # /mine returns a job id immediately; poll the job until it finishes
+    job = http_post("/mine", {"miner": miner})
+    if not job.get("ok"):
+        return job
+    while True:
+        st = http_get(f"/mine/{job['job_id']}")["job"]
+        if st["status"] == "done":
+            return {"ok": True, "block_hash": st["result"]["block_hash"]}
+        if st["status"] in ("failed", "cancelled"):
+            return {"ok": False, "job": st}
+        time.sleep(0.2)
+
 def fail(msg):
     print("FAIL:", msg)
     sys.exit(2)
@@ -42,7 +56,7 @@ def main():
     print(b0.get("balance", 0))
 
     print("Mining a block (this may take a second)...", end=" ")
-    m = http_post("/mine", {"miner": miner})
+    m = mine(miner)
     if not m.get("ok"):
         fail("mine failed: %s" % m)
     print("OK (block=%s)" % m.get("block_hash"))
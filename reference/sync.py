@@ -0,0 +1,188 @@
+"""Headers-first chain synchronization for the PMVP reference node.
+
+Catching up with peers happens in two phases:
+
+1. Headers: the peer with the most chain work is picked and the last
+   block of its chain that we also know is located by probing its headers
+   backwards from our height in exponentially growing steps (this is our
+   tip unless the peer is on another branch). The header chain above that
+   block is downloaded (`GET /headers`, 2000 per request) and each header
+   is checked on arrival: it must link to the previous one and pass the
+   node's cheap header check (hash recomputation and proof of work), so a
+   peer cannot make us download bodies for a bogus chain.
+2. Bodies: the validated headers fix the hash expected at every height.
+   Bodies are requested in segments (`GET /blocks` in the binary codec)
+   from all peers in parallel, at most `window` blocks ahead of the next
+   block to connect so memory stays bounded. Segments arrive in any order;
+   blocks are validated and connected strictly in height order as soon as
+   the next one is available. A segment that fails or does not match the
+   headers is requested again from another peer, and peers that keep
+   failing are dropped from the sync.
+
+`ChainSync` only drives the download; the node supplies `tip()`, `known()`,
+`check_header()`, `accept()` (validation, and connect or reorganize onto
+the branch once it has the most work), `batch()`, a context wrapped
+around each run of blocks connected together (the block store defers its
+fsyncs to the end of the run), and `session()`, one wrapped around a whole
+sync (the node defers UTXO snapshots to its end).
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Callable, Tuple, ContextManager
+
+from peers import PeerManager, PeerError
+
+# Blocks past the next one to connect that may be downloaded ahead
+SYNC_WINDOW = int(os.environ.get("PMVP_SYNC_WINDOW", "1024"))
+# Parallel body requests
+SYNC_WORKERS = int(os.environ.get("PMVP_SYNC_WORKERS", "8"))
+# Blocks per body request (the /blocks page limit)
+SEGMENT_SIZE = 100
+HEADERS_PER_REQUEST = 2000
+# Failed segment requests after which a peer is left out of this sync
+MAX_SEGMENT_FAILURES = 3
+
+Header = Tuple[str, Dict[str, Any]]  # (hash, header)
+
+
+class SyncError(Exception):
+    pass
+
+
+class ChainSync:
+    """Headers-first download with a bounded parallel block window."""
+
+    def __init__(self, peers: PeerManager, tip: Callable[[], Tuple[int, str, int]], known: Callable[[str], bool],
+                 check_header: Callable[[str, Dict[str, Any]], None], accept: Callable[[Dict[str, Any]], Any],
+                 batch: Callable[[], ContextManager] = nullcontext, session: Callable[[], ContextManager] = nullcontext,
+                 window: int = SYNC_WINDOW, workers: int = SYNC_WORKERS):
+        self.peers = peers
+        self._tip = tip  # () -> (height, hash, chain work) of our tip
+        self._known = known  # block hash -> do we have the block
+        self._check_header = check_header  # raises on a bad header
+        self._accept = accept  # validate and connect an entry; raises if invalid
+        self._batch = batch  # wraps each run of connected blocks
+        self._session = session  # wraps a whole sync
+        self.window = window
+        self.workers = workers
+        self._running = threading.Lock()
+        self.last: Dict[str, Any] = {}  # stats of the last sync
+
+    def sync(self, urls: List[str]) -> int:
+        """Catch up with the best of `urls`; returns blocks connected (0 if a sync is already running)."""
+        if not self._running.acquire(blocking=False):
+            return 0
+        try:
+            with self._session():
+                return self._sync(urls)
+        finally:
+            self._running.release()
+
+    def _sync(self, urls: List[str]) -> int:
+        height, _tip_hash, work = self._tip()
+        tips = {}
+        for url in urls:
+            try:
+                reply = self.peers.request(url, "/tip")
+                tips[url] = (int(reply["chain_work"], 16), reply["height"])
+            except (PeerError, KeyError, TypeError, ValueError):
+                continue
+        ahead = [url for url in tips if tips[url][0] > work]
+        if not ahead:
+            return 0
+        best = max(ahead, key=lambda url: tips[url][0])
+        t0 = time.perf_counter()
+        fork_height, fork_hash = self.find_fork(best, min(height, tips[best][1]))
+        headers = self.download_headers(best, fork_height + 1, fork_hash)
+        t1 = time.perf_counter()
+        sources = sorted(ahead, key=lambda url: url != best)
+        connected = self.download_blocks(fork_height + 1, [h for h, _ in headers], sources)
+        self.last = {"peer": best, "peers": len(sources), "fork_height": fork_height, "headers": len(headers),
+                     "blocks": connected, "headers_time": t1 - t0, "blocks_time": time.perf_counter() - t1}
+        return connected
+
+    def find_fork(self, url: str, height: int) -> Tuple[int, str]:
+        """(height, hash) of the highest block of `url`'s chain we know, probing down from `height`."""
+        step = 1
+        while True:
+            reply = self.peers.request(url, "/headers?from=%d&count=1" % height)
+            try:
+                block_hash = reply["headers"][0]["hash"]
+            except (KeyError, IndexError, TypeError):
+                raise SyncError("%s sent no header at height %d" % (url, height))
+            if self._known(block_hash):
+                return height, block_hash
+            if height == 0:
+                raise SyncError("%s has a different genesis block" % url)
+            height = max(0, height - step)
+            step *= 2
+
+    def download_headers(self, url: str, start: int, prev_hash: str) -> List[Header]:
+        """Validated headers from `url` above height start - 1 (whose hash is prev_hash)."""
+        headers: List[Header] = []
+        while True:
+            reply = self.peers.request(url, "/headers?from=%d&count=%d" % (start + len(headers), HEADERS_PER_REQUEST))
+            page = reply.get("headers", [])
+            for item in page:
+                block_hash, header = item["hash"], item["header"]
+                if header.get("prev_hash") != prev_hash:
+                    raise SyncError("header at height %d does not link to %s" % (item["height"], prev_hash))
+                self._check_header(block_hash, header)
+                headers.append((block_hash, header))
+                prev_hash = block_hash
+            if len(page) < HEADERS_PER_REQUEST or start + len(headers) > reply["height"]:
+                return headers
+
+    def _fetch_segment(self, url: str, start: int, hashes: List[str]) -> List[Dict[str, Any]]:
+        entries = self.peers.fetch_blocks(url, start, start + len(hashes) - 1)
+        if [e["hash"] for e in entries] != hashes:
+            raise SyncError("%s sent blocks that do not match the headers" % url)
+        return entries
+
+    def download_blocks(self, start: int, hashes: List[str], urls: List[str]) -> int:
+        """Fetch the blocks with `hashes` (heights start...) from `urls` and connect them in order."""
+        end = start + len(hashes)
+        segments = deque((s, min(s + SEGMENT_SIZE, end)) for s in range(start, end, SEGMENT_SIZE))
+        ready: Dict[int, Dict[str, Any]] = {}
+        failures = {url: 0 for url in urls}
+        inflight: Dict[Any, Tuple[Tuple[int, int], str]] = {}
+        turn = 0
+        next_height = start
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sync") as pool:
+            try:
+                while next_height < end:
+                    live = [url for url in urls if failures[url] < MAX_SEGMENT_FAILURES]
+                    if not live:
+                        raise SyncError("no peer could serve blocks from height %d" % next_height)
+                    # keep the workers busy, but only within the window
+                    while segments and len(inflight) < self.workers and segments[0][0] < next_height + self.window:
+                        seg = segments.popleft()
+                        url = live[turn % len(live)]
+                        turn += 1
+                        future = pool.submit(self._fetch_segment, url, seg[0], hashes[seg[0] - start:seg[1] - start])
+                        inflight[future] = (seg, url)
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        seg, url = inflight.pop(future)
+                        try:
+                            entries = future.result()
+                        except (PeerError, SyncError, KeyError, TypeError):
+                            failures[url] += 1
+                            segments.appendleft(seg)
+                            continue
+                        for i, entry in enumerate(entries):
+                            ready[seg[0] + i] = entry
+                    if next_height in ready:
+                        with self._batch():
+                            while next_height in ready:
+                                self._accept(ready.pop(next_height))
+                                next_height += 1
+            finally:
+                for future in inflight:
+                    future.cancel()
+        return next_height - start
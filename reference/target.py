@@ -0,0 +1,70 @@
+"""Proof-of-work targets and retargeting for the PMVP reference node.
+
+A block header carries its target in compact form ("bits", a u32 as in
+Bitcoin): the top byte is a length in bytes, the low three bytes the
+leading digits of the target, so target = mantissa * 256 ** (length - 3).
+Unlike Bitcoin the mantissa has no sign bit. The encoding keeps 24 bits of
+precision, so `bits_from_target()` rounds down (a slightly harder target)
+and consensus compares bits, not raw targets. A header meets its target
+when its hash, read as a 256-bit big-endian integer, is <= the target; a
+block's work is the expected number of hashes to find it,
+2**256 // (target + 1).
+
+Retargeting is a linearly weighted moving average (`next_target()`): the
+target of the next block is the mean target of the last `n` blocks scaled
+by their weighted mean solve time against the wanted block spacing, with
+recent blocks weighted most. Adjusting every block keeps intervals close
+to the spacing when hashrate jumps, where a fixed per-window adjustment
+lags a whole window behind.
+"""
+
+from typing import List
+
+MAX_TARGET = (1 << 256) - 1
+# Solve times are clamped to [1, MAX_SOLVETIME_FACTOR * spacing] so a few
+# bad timestamps cannot swing the target
+MAX_SOLVETIME_FACTOR = 6
+
+
+def target_from_bits(bits: int) -> int:
+    """Target encoded by compact `bits`; raises ValueError if out of range."""
+    if type(bits) is not int or not 0 <= bits < 1 << 32:
+        raise ValueError("bits must be a u32")
+    size, mantissa = bits >> 24, bits & 0xffffff
+    target = mantissa >> 8 * (3 - size) if size <= 3 else mantissa << 8 * (size - 3)
+    if target > MAX_TARGET:
+        raise ValueError("target above 2**256")
+    return target
+
+def bits_from_target(target: int) -> int:
+    """Compact form of `target`, rounded down to 24 bits of precision."""
+    if not 0 <= target <= MAX_TARGET:
+        raise ValueError("target out of range")
+    size = (target.bit_length() + 7) // 8
+    mantissa = target >> 8 * (size - 3) if size > 3 else target << 8 * (3 - size)
+    return size << 24 | mantissa
+
+def zeros_target(zeros: int) -> int:
+    """Largest target whose hashes start with `zeros` hex zeros."""
+    return (1 << (256 - 4 * zeros)) - 1
+
+def hash_meets_target(block_hash: str, target: int) -> bool:
+    return int(block_hash, 16) <= target
+
+def target_work(target: int) -> int:
+    return (1 << 256) // (target + 1)
+
+def next_target(targets: List[int], timestamps: List[int], spacing: int, limit: int = MAX_TARGET) -> int:
+    """Target for the block after a window of len(targets) blocks (oldest first).
+
+    `timestamps` has one more entry: the block before the window, then the
+    window's blocks. The result is capped at `limit`, the easiest target
+    allowed.
+    """
+    n = len(targets)
+    weighted = 0
+    for i in range(1, n + 1):
+        solvetime = min(max(timestamps[i] - timestamps[i - 1], 1), MAX_SOLVETIME_FACTOR * spacing)
+        weighted += i * solvetime
+    target = sum(targets) // n * weighted // (spacing * n * (n + 1) // 2)
+    return max(1, min(target, limit))
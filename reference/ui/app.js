@@ -6,36 +6,110 @@ function fetchJson(path){
   return fetch(API + path).then(r=>r.json());
 }
 
+// Fetch blocks [from, tip] page by page through /blocks
+async function fetchBlocks(from, tipHeight){
+  let blocks = [];
+  while(from <= tipHeight){
+    const page = await fetchJson(`/blocks?from=${from}&to=${tipHeight}`);
+    if(!page.blocks || page.blocks.length === 0) break;
+    blocks = blocks.concat(page.blocks);
+    from = page.to + 1;
+  }
+  return blocks;
+}
+
+// Bring a cached chain up to date with the node's tip, fetching only new
+// blocks; falls back to a full refetch if our last block is no longer on it
+async function syncChain(chain){
+  const tip = await fetchJson('/tip');
+  const last = chain[chain.length - 1];
+  if(last && last.hash === tip.hash) return chain;
+  if(last && tip.height >= chain.length - 1){
+    const fresh = await fetchBlocks(chain.length - 1, tip.height);
+    if(fresh.length && fresh[0].hash === last.hash) return chain.concat(fresh.slice(1));
+  }
+  return fetchBlocks(0, tip.height);
+}
+
 function App(){
   const [chain, setChain] = React.useState([]);
+  const chainRef = React.useRef([]);
   const [mempool, setMempool] = React.useState([]);
+  const [unsigned, setUnsigned] = React.useState([]);
   const [address, setAddress] = React.useState('');
   const [balance, setBalance] = React.useState(null);
 
-  // initial load and periodic polling
+  const addressRef = React.useRef('');
+  addressRef.current = address;
+
+  // initial load, then live updates pushed over /events/stream (SSE)
   React.useEffect(()=>{
     let mounted = true;
-    async function poll(){
+
+    function setChainState(c){
+      chainRef.current = c;
+      setChain(c);
+    }
+    async function refreshBalance(){
+      const addr = addressRef.current;
+      if(!addr) return;
+      const b = await fetchJson(`/balance/${addr}`);
+      if(mounted && addr === addressRef.current) setBalance(b);
+    }
+    async function refreshMempool(){
+      const m = await fetchJson('/mempool');
+      if(mounted) setMempool(m.mempool || []);
+    }
+    // full resync: on (re)connect and when the node says we missed events
+    async function resync(){
       try{
-        const c = await fetchJson('/chain');
-        const m = await fetchJson('/mempool');
+        const c = await syncChain(chainRef.current);
         const u = await fetchJson('/unsigned');
         if(!mounted) return;
-        setChain(c.chain || []);
-        setMempool(m.mempool || []);
+        if(c !== chainRef.current) setChainState(c);
         setUnsigned(u.unsigned || []);
-        if(address){
-          const b = await fetchJson(`/balance/${address}`);
-          if(mounted) setBalance(b);
-        }
+        await refreshMempool();
+        await refreshBalance();
       }catch(err){
         console.error(err);
       }
     }
-    poll();
-    const iv = setInterval(poll, 3000);
-    return ()=>{ mounted = false; clearInterval(iv); };
-  }, [address]);
+
+    const source = new EventSource(API + '/events/stream');
+    source.onopen = resync;
+    source.addEventListener('reset', resync);
+    source.addEventListener('block-connected', ev=>{
+      const {data} = JSON.parse(ev.data);
+      const c = chainRef.current;
+      if(data.height === c.length && (c.length === 0 || c[c.length - 1].hash === data.block.header.prev_hash)){
+        setChainState(c.concat([{hash: data.hash, block: data.block, height: data.height}]));
+      }else{
+        resync();
+        return;
+      }
+      refreshBalance().catch(console.error);
+    });
+    source.addEventListener('block-disconnected', ev=>{
+      const {data} = JSON.parse(ev.data);
+      setChainState(chainRef.current.slice(0, data.height));
+      refreshBalance().catch(console.error);
+    });
+    // /mempool is served from the node's response cache, so refetching it
+    // on tx events is cheap; coalesce bursts into one request
+    let mempoolTimer = null;
+    function mempoolChanged(){
+      if(mempoolTimer) return;
+      mempoolTimer = setTimeout(()=>{ mempoolTimer = null; refreshMempool().catch(console.error); }, 200);
+    }
+    source.addEventListener('tx-added', mempoolChanged);
+    source.addEventListener('tx-removed', mempoolChanged);
+    source.addEventListener('unsigned-added', ev=>{
+      const {data} = JSON.parse(ev.data);
+      setUnsigned(u=> u.length === data.index ? u.concat([data.tx]) : u);
+    });
+
+    return ()=>{ mounted = false; source.close(); if(mempoolTimer) clearTimeout(mempoolTimer); };
+  }, []);
 
   function lookup(){
     // force immediate fetch of balance
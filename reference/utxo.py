@@ -0,0 +1,278 @@
+"""Incremental UTXO engine for the PMVP reference node.
+
+Blocks are connected one at a time: only the block's own spends and creates
+touch the set, so the cost of applying a block does not depend on chain
+height. Every connect returns an undo record that lets the block be
+disconnected again later (reorgs, recovery).
+
+Callers see coins as `model.TxOut` objects keyed by `model.OutPoint`;
+`to_json()` and `coins_from_json()` convert to and from the "txid:index"
+-> dict form used by snapshots and the API. Internally entries are packed
+to keep a multi-million-coin set small: the key is the 32 raw txid bytes
+plus the index as u32 (36 bytes), the value the amount as u64 plus the
+20 raw pubkey-hash bytes (28 bytes), each a single bytes object. A coin
+whose address or amount does not fit that layout (e.g. a coinbase paying a
+non-hex "address") is kept as its TxOut instead, so the set behaves
+exactly like the dict it replaces.
+
+An undo record is a list of `(key, previous_value)` entries (packed form)
+in the order the set was modified; `previous_value` is None when the key
+did not exist before. Disconnecting replays the list backwards, which also
+correctly handles outputs created and spent inside the same block and
+(rare) duplicate txids.
+
+Storage is pluggable: `UtxoSet` implements connect/disconnect on top of a
+backend holding the packed entries. `MemoryBackend` (the default) is a
+dict; `utxodb.SqliteBackend` keeps the set on disk so it can outgrow RAM
+and survive restarts.
+
+Backends also keep a secondary index address -> outpoint keys, updated on
+every add/remove, so balance and UTXO listings cost O(outputs of that
+address) instead of a scan of the whole set. In memory, most addresses
+hold a single coin, so the index maps an address to its one key directly
+and only switches to a dict of keys for addresses with several coins.
+"""
+
+import struct
+from typing import Dict, Any, List, Tuple, Optional, Union, Iterator, Iterable
+
+from model import OutPoint, TxOut
+from primitives import txid_of
+
+_KEY = struct.Struct("<32sI")  # txid, index
+_COIN = struct.Struct("<Q20s")  # amount, pubkey hash
+
+Coin = TxOut
+Value = Union[bytes, TxOut]  # packed coin, or the TxOut itself if it does not pack
+BlockUndo = List[Tuple[bytes, Optional[Value]]]
+
+
+def pack_outpoint(txid: str, index: int) -> Optional[bytes]:
+    """36-byte key for an outpoint; None if no coin can have it (not a txid)."""
+    try:
+        raw = bytes.fromhex(txid)
+    except (ValueError, TypeError):
+        return None
+    if len(raw) != 32 or type(index) is not int or not 0 <= index <= 0xFFFFFFFF or raw.hex() != txid:
+        return None
+    return _KEY.pack(raw, index)
+
+def unpack_outpoint(key: bytes) -> OutPoint:
+    raw, index = _KEY.unpack(key)
+    return OutPoint(raw.hex(), index)
+
+def pack_coin(coin: TxOut) -> Value:
+    amount, pubkey_hash = coin.amount, coin.pubkey_hash
+    if type(amount) is int and 0 <= amount < 1 << 64 and type(pubkey_hash) is str and len(pubkey_hash) == 40:
+        try:
+            raw = bytes.fromhex(pubkey_hash)
+        except ValueError:
+            return coin
+        if raw.hex() == pubkey_hash:
+            return _COIN.pack(amount, raw)
+    return coin
+
+def unpack_coin(value: Value) -> TxOut:
+    if type(value) is bytes:
+        amount, raw = _COIN.unpack(value)
+        return TxOut(amount, raw.hex())
+    return value
+
+def address_key(address: str) -> Union[bytes, str]:
+    # the address index is keyed by the raw 20-byte hash where there is one
+    if type(address) is not str:
+        raise TypeError("address must be a string, not %s" % type(address).__name__)
+    if len(address) == 40:
+        try:
+            raw = bytes.fromhex(address)
+        except ValueError:
+            return address
+        if raw.hex() == address:
+            return raw
+    return address
+
+def value_address_key(value: Value) -> Union[bytes, str]:
+    return value[8:] if type(value) is bytes else address_key(value.pubkey_hash)
+
+def packed_to_json(items: Iterable[Tuple[bytes, Value]]) -> Dict[str, Dict[str, Any]]:
+    """(packed key, packed value) pairs, e.g. a `UtxoSet.packed()` copy -> snapshot/API form."""
+    return {str(unpack_outpoint(key)): unpack_coin(value).to_json() for key, value in items}
+
+
+def coins_from_json(coins: Dict[str, Dict[str, Any]]) -> Dict[OutPoint, Coin]:
+    """{"txid:index": {amount, pubkey_hash}} (snapshot/API form) -> set contents."""
+    return {OutPoint.parse(key): TxOut.from_json(coin) for key, coin in coins.items()}
+
+
+class MemoryBackend:
+    """In-memory UTXO storage: a dict of packed entries plus the address index.
+
+    Backends store packed keys/values (see module docstring) and keep the
+    address index themselves; `UtxoSet` implements the block logic on top.
+    put() and delete() return the previous value (None if there was none).
+    A backend may buffer writes until commit(); MemoryBackend has nothing
+    to write and is not persistent.
+    """
+
+    persistent = False
+
+    def __init__(self, coins: Optional[Dict[bytes, Value]] = None):
+        self.coins: Dict[bytes, Value] = coins if coins is not None else {}
+        # address key -> packed outpoint, or {packed outpoint: None} (in
+        # insertion order) once the address has more than one coin
+        self.by_address: Dict[Union[bytes, str], Union[bytes, Dict[bytes, None]]] = {}
+        for key, value in self.coins.items():
+            self._index(key, value_address_key(value))
+
+    def _index(self, key: bytes, address: Union[bytes, str]):
+        slot = self.by_address.get(address)
+        if slot is None:
+            self.by_address[address] = key
+        elif type(slot) is dict:
+            slot[key] = None
+        elif slot != key:
+            self.by_address[address] = {slot: None, key: None}
+
+    def _unindex(self, key: bytes, address: Union[bytes, str]):
+        slot = self.by_address.get(address)
+        if type(slot) is dict:
+            slot.pop(key, None)
+            if len(slot) == 1:
+                self.by_address[address] = next(iter(slot))
+        elif slot == key:
+            del self.by_address[address]
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    def get(self, key: bytes) -> Optional[Value]:
+        return self.coins.get(key)
+
+    def put(self, key: bytes, value: Value) -> Optional[Value]:
+        address = value_address_key(value)  # before any change: may raise
+        old = self.coins.get(key)
+        if old is not None:
+            self._unindex(key, value_address_key(old))
+        self.coins[key] = value
+        self._index(key, address)
+        return old
+
+    def delete(self, key: bytes) -> Optional[Value]:
+        value = self.coins.pop(key, None)
+        if value is not None:
+            self._unindex(key, value_address_key(value))
+        return value
+
+    def items(self) -> Iterator[Tuple[bytes, Value]]:
+        return iter(list(self.coins.items()))
+
+    def address_keys(self, address: Union[bytes, str]) -> List[bytes]:
+        slot = self.by_address.get(address)
+        if slot is None:
+            return []
+        return list(slot) if type(slot) is dict else [slot]
+
+    def clear(self):
+        self.coins.clear()
+        self.by_address.clear()
+
+    def best_block(self) -> Optional[Tuple[str, int]]:
+        return None
+
+    def commit(self, tip_hash: str, height: int, force: bool = False):
+        pass
+
+    def close(self):
+        pass
+
+
+class UtxoSet:
+    """UTXO set with per-block connect/disconnect over a storage backend."""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+
+    @property
+    def persistent(self) -> bool:
+        return self.backend.persistent
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+    def __contains__(self, outpoint: OutPoint) -> bool:
+        key = pack_outpoint(*outpoint)
+        return key is not None and self.backend.get(key) is not None
+
+    def get(self, outpoint: OutPoint) -> Optional[Coin]:
+        key = pack_outpoint(*outpoint)
+        value = self.backend.get(key) if key is not None else None
+        return unpack_coin(value) if value is not None else None
+
+    def items(self) -> Iterator[Tuple[OutPoint, Coin]]:
+        for key, value in self.backend.items():
+            yield unpack_outpoint(key), unpack_coin(value)
+
+    def clear(self):
+        self.backend.clear()
+
+    def update(self, coins: Dict[OutPoint, Coin]):
+        # bulk load (snapshots, benchmarks)
+        for outpoint, coin in coins.items():
+            self.backend.put(_KEY.pack(bytes.fromhex(outpoint.txid), outpoint.index), pack_coin(coin))
+
+    def to_json(self) -> Dict[str, Dict[str, Any]]:
+        return packed_to_json(self.backend.items())
+
+    def packed(self) -> List[Tuple[bytes, Value]]:
+        # copy of the packed entries, cheap enough to take under the node lock
+        return list(self.backend.items())
+
+    def address_coins(self, address: str) -> List[Tuple[OutPoint, Coin]]:
+        """(outpoint, coin) pairs paying `address`."""
+        backend = self.backend
+        return [(unpack_outpoint(key), unpack_coin(backend.get(key))) for key in backend.address_keys(address_key(address))]
+
+    def best_block(self) -> Optional[Tuple[str, int]]:
+        """(hash, height) of the last block committed to a persistent backend."""
+        return self.backend.best_block()
+
+    def commit(self, tip_hash: str, height: int, force: bool = False):
+        """Tell the backend the set now matches block `tip_hash` (it may write)."""
+        self.backend.commit(tip_hash, height, force)
+
+    def connect_tx(self, tx: Dict[str, Any], undo: BlockUndo, txid: Optional[str] = None):
+        backend = self.backend
+        raw_txid = bytes.fromhex(txid or txid_of(tx))
+        # consume inputs
+        for inp in tx.get("inputs", []):
+            key = pack_outpoint(inp["txid"], inp["index"])
+            value = backend.delete(key) if key is not None else None
+            if value is not None:
+                undo.append((key, value))
+        # add outputs
+        for i, out in enumerate(tx.get("outputs", [])):
+            key = _KEY.pack(raw_txid, i)
+            undo.append((key, backend.put(key, pack_coin(TxOut(out["amount"], out["pubkey_hash"])))))
+
+    def connect_block(self, block: Dict[str, Any], txids: Optional[List[str]] = None) -> BlockUndo:
+        """Apply a block; `txids` (if the caller has them) saves rehashing its txs.
+
+        If a tx cannot be applied, the txs before it are undone and the
+        error propagates, so the set is left as it was.
+        """
+        undo: BlockUndo = []
+        try:
+            for n, tx in enumerate(block["txs"]):
+                self.connect_tx(tx, undo, txids[n] if txids else None)
+        except BaseException:
+            self.disconnect_block(undo)
+            raise
+        return undo
+
+    def disconnect_block(self, undo: BlockUndo):
+        backend = self.backend
+        for key, prev in reversed(undo):
+            if prev is None:
+                backend.delete(key)
+            else:
+                backend.put(key, prev)
@@ -0,0 +1,181 @@
+"""On-disk UTXO backend for the PMVP reference node.
+
+`SqliteBackend` implements the `utxo.MemoryBackend` interface on a sqlite
+database in WAL mode, so the UTXO set can outgrow RAM and survives
+restarts without a replay:
+
+    coins(key BLOB PRIMARY KEY, value, address)   -- packed entries
+    meta(name TEXT PRIMARY KEY, value)            -- tip_hash, height, count
+
+Values are the packed 28-byte coin (BLOB), or the JSON of a coin that
+does not pack (TEXT); `address` is the address index key (see utxo.py)
+with a secondary index for balance queries.
+
+Writes go to a write-back cache: put()/delete() only record the new value
+(None = deleted) in a dirty map, and commit() writes the dirty entries and
+the new tip in one sqlite transaction every FLUSH_BLOCKS blocks. The
+database therefore always holds the set as of some block on the chain;
+after a crash the node replays the blocks after that tip. Lookups read the
+dirty map, then an LRU cache of clean entries, then the database, so
+`verify_tx()` on recently created or spent coins does not touch disk.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Iterator, Union
+
+from model import TxOut
+from utxo import Value, value_address_key
+
+FLUSH_BLOCKS = int(os.environ.get("PMVP_UTXO_FLUSH_BLOCKS", "10"))
+CACHE_SIZE = int(os.environ.get("PMVP_UTXO_CACHE", "200000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS coins (key BLOB PRIMARY KEY, value NOT NULL, address NOT NULL) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS coins_address ON coins (address);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value);
+"""
+
+
+def _encode(value: Value) -> Union[bytes, str]:
+    return value if type(value) is bytes else json.dumps(value.to_json(), sort_keys=True)
+
+def _decode(stored: Union[bytes, str]) -> Value:
+    return stored if type(stored) is bytes else TxOut.from_json(json.loads(stored))
+
+
+class SqliteBackend:
+    """UTXO entries in sqlite behind a write-back cache flushed per block batch."""
+
+    persistent = True
+
+    def __init__(self, path: str, cache_size: int = CACHE_SIZE, flush_blocks: int = FLUSH_BLOCKS):
+        self.path = path
+        self.cache_size = cache_size
+        self.flush_blocks = max(1, flush_blocks)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        meta = dict(self._db.execute("SELECT name, value FROM meta"))
+        self._count = meta.get("count", 0)  # entries in the database
+        self._tip: Optional[Tuple[str, int]] = (meta["tip_hash"], meta["height"]) if "tip_hash" in meta else None
+        self._dirty: Dict[bytes, Optional[Value]] = {}  # key -> new value, None = deleted
+        self._delta = 0  # entry count change held in _dirty
+        self._cache: "OrderedDict[bytes, Optional[Value]]" = OrderedDict()  # clean entries, None = absent
+        self._pending_blocks = 0
+
+    def _load(self, key: bytes) -> Optional[Value]:
+        # current value of key; caller holds _lock
+        if key in self._dirty:
+            return self._dirty[key]
+        cache = self._cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        row = self._db.execute("SELECT value FROM coins WHERE key = ?", (key,)).fetchone()
+        value = _decode(row[0]) if row else None
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def _set(self, key: bytes, value: Optional[Value]) -> Optional[Value]:
+        with self._lock:
+            old = self._load(key)
+            self._dirty[key] = value
+            self._cache.pop(key, None)
+            self._delta += (value is not None) - (old is not None)
+            return old
+
+    def __len__(self) -> int:
+        return self._count + self._delta
+
+    def get(self, key: bytes) -> Optional[Value]:
+        with self._lock:
+            return self._load(key)
+
+    def put(self, key: bytes, value: Value) -> Optional[Value]:
+        value_address_key(value)  # a coin that cannot be indexed would fail every flush
+        return self._set(key, value)
+
+    def delete(self, key: bytes) -> Optional[Value]:
+        return self._set(key, None)
+
+    def items(self) -> Iterator[Tuple[bytes, Value]]:
+        with self._lock:
+            dirty = dict(self._dirty)
+            rows = self._db.execute("SELECT key, value FROM coins").fetchall()
+        for key, stored in rows:
+            if key not in dirty:
+                yield key, _decode(stored)
+        for key, value in dirty.items():
+            if value is not None:
+                yield key, value
+
+    def address_keys(self, address: Union[bytes, str]) -> List[bytes]:
+        with self._lock:
+            keys = [row[0] for row in self._db.execute("SELECT key FROM coins WHERE address = ?", (address,))]
+            dirty = self._dirty
+            if not dirty:
+                return keys
+            # overlay unflushed writes: O(dirty entries), bounded by the flush interval
+            keys = [key for key in keys if key not in dirty]
+            keys += [key for key, value in dirty.items() if value is not None and value_address_key(value) == address]
+            return keys
+
+    def clear(self):
+        # drops the tip too: the caller rebuilds and commits a new one
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM coins")
+            self._db.execute("DELETE FROM meta")
+            self._db.execute("COMMIT")
+            self._count = self._delta = self._pending_blocks = 0
+            self._tip = None
+            self._dirty.clear()
+            self._cache.clear()
+
+    def best_block(self) -> Optional[Tuple[str, int]]:
+        return self._tip
+
+    def commit(self, tip_hash: str, height: int, force: bool = False):
+        """Record that the set matches `tip_hash`; writes every flush_blocks calls."""
+        with self._lock:
+            self._pending_blocks += 1
+            if not force and self._pending_blocks < self.flush_blocks:
+                return
+            self._flush(tip_hash, height)
+
+    def _flush(self, tip_hash: str, height: int):
+        db = self._db
+        puts = [(key, _encode(value), value_address_key(value)) for key, value in self._dirty.items() if value is not None]
+        deletes = [(key,) for key, value in self._dirty.items() if value is None]
+        count = self._count + self._delta
+        db.execute("BEGIN")
+        try:
+            db.executemany("DELETE FROM coins WHERE key = ?", deletes)
+            db.executemany("INSERT OR REPLACE INTO coins (key, value, address) VALUES (?, ?, ?)", puts)
+            db.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                           [("tip_hash", tip_hash), ("height", height), ("count", count)])
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        # flushed entries stay readable from the clean cache
+        cache = self._cache
+        for key, value in self._dirty.items():
+            cache[key] = value
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        self._dirty.clear()
+        self._count, self._delta, self._pending_blocks = count, 0, 0
+        self._tip = (tip_hash, height)
+
+    def close(self):
+        with self._lock:
+            self._db.close()